@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+"""
+性能基准测试
+使用合成的日线数据对比优化前后的实现，并校验结果一致
+
+用法：
+    python benchmark.py crossover              # 均线交叉检测
+    python benchmark.py crossover --years 20   # 指定数据长度（年）
+    python benchmark.py indicators             # 技术指标计算
+    python benchmark.py incremental            # 增量指标更新
+    python benchmark.py timeframes             # 周线、月线重采样
+    python benchmark.py plot --workers 4       # 图表渲染（标准模式 vs 快速模式，并行渲染）
+    python benchmark.py report --symbols 30    # HTML 报告生成（耗时与峰值内存）
+    python benchmark.py excel --symbols 30     # Excel 报告导出
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from utils.alerts import generate_alerts
+from utils.analysis import calculate_indicators, detect_ema_crosses, detect_price_ema_crosses
+from utils.constants import TIMEFRAMES, Colors
+from utils.indicator_state import INDICATOR_COLUMNS, IndicatorState, IndicatorStore, calculate_indicators_incremental
+from utils.timeframes import OHLCV_AGGREGATIONS, resample_ohlcv
+from utils.report import (PLOT_DPI, format_value, generate_excel_report, remove_ansi_colors, save_analysis_plot,
+                          write_html_report)
+
+EMA_PAIRS = [(5, 10), (10, 20), (20, 50)]
+PRICE_EMA_PERIODS = [5, 10]
+
+def make_sample_data(years=10, symbol='TEST', seed=0, drift=0.0005, volatility=0.02):
+    """生成与 yfinance 下载结果结构相同的合成日线数据
+    Args:
+        years (int): 数据长度（年）
+        symbol (str): 股票代码
+        seed (int): 随机种子
+        drift (float): 日均收益率
+        volatility (float): 日波动率，为 0 时价格单调变化
+    Returns:
+        pd.DataFrame: 两级列名 (Price, Ticker) 的 OHLCV 数据
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-05-30', periods=years * 252, name='Date')
+    close = 100 * np.exp(np.cumsum(drift + volatility * rng.standard_normal(len(dates))))
+    spread = np.abs(rng.standard_normal(len(dates))) * volatility * close / 2
+    frame = pd.DataFrame({
+        'Close': close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Open': close + rng.uniform(-1, 1, len(dates)) * spread,
+        'Volume': rng.integers(1_000_000, 50_000_000, len(dates)),
+    }, index=dates)
+    frame.columns = pd.MultiIndex.from_product([frame.columns, [symbol]], names=['Price', 'Ticker'])
+    return frame
+
+def best_time(func, repeat):
+    """多次运行取最短耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def report(name, baseline, optimized):
+    """打印一组对比结果"""
+    print(f"{name:<32} 原实现 {baseline * 1000:9.2f} ms   新实现 {optimized * 1000:9.2f} ms   加速 {baseline / optimized:6.1f}x")
+
+# ---------------------------------------------------------------------------
+# 均线交叉检测
+# ---------------------------------------------------------------------------
+
+def legacy_detect_ema_cross(data, short_period=5, long_period=20):
+    """原逐行实现（用于对比）"""
+    if len(data) < max(short_period, long_period) + 1:
+        return None, None
+    short_ema = data[f'EMA_{short_period}']
+    long_ema = data[f'EMA_{long_period}']
+    for i in range(len(data) - 1, 0, -1):
+        curr_short = short_ema.iloc[i].item()
+        curr_long = long_ema.iloc[i].item()
+        prev_short = short_ema.iloc[i-1].item()
+        prev_long = long_ema.iloc[i-1].item()
+        if prev_short < prev_long and curr_short > curr_long:
+            return "golden_cross", data.index[i]
+        elif prev_short > prev_long and curr_short < curr_long:
+            return "death_cross", data.index[i]
+    return None, None
+
+def legacy_detect_price_ema_cross(data, period=5):
+    """原逐行实现（用于对比）"""
+    if len(data) < period + 1:
+        return None, None
+    close_prices = data['Close']
+    ema = data[f'EMA_{period}']
+    for i in range(len(data) - 1, 0, -1):
+        curr_price = close_prices.iloc[i].item()
+        curr_ema = ema.iloc[i].item()
+        prev_price = close_prices.iloc[i-1].item()
+        prev_ema = ema.iloc[i-1].item()
+        if prev_price < prev_ema and curr_price > curr_ema:
+            return "price_up_cross", data.index[i]
+        elif prev_price > prev_ema and curr_price < curr_ema:
+            return "price_down_cross", data.index[i]
+    return None, None
+
+def bench_crossover(args):
+    """均线交叉检测：逐行 .iloc 循环 vs 向量化"""
+    scenarios = {
+        '随机游走': make_sample_data(args.years),
+        '单边上涨（无交叉，最坏情况）': make_sample_data(args.years, volatility=0.0),
+    }
+    print(f"均线交叉检测，{args.years} 年日线数据，{len(EMA_PAIRS)} 组均线 + {len(PRICE_EMA_PERIODS)} 条价格均线")
+    for name, data in scenarios.items():
+        data = calculate_indicators(data)
+
+        def legacy():
+            return ({pair: legacy_detect_ema_cross(data, *pair) for pair in EMA_PAIRS},
+                    {period: legacy_detect_price_ema_cross(data, period) for period in PRICE_EMA_PERIODS})
+
+        def vectorized():
+            return detect_ema_crosses(data, EMA_PAIRS), detect_price_ema_crosses(data, PRICE_EMA_PERIODS)
+
+        assert legacy() == vectorized(), f"结果不一致：{name}"
+        report(name, best_time(legacy, args.repeat), best_time(vectorized, args.repeat))
+
+# ---------------------------------------------------------------------------
+# 技术指标计算
+# ---------------------------------------------------------------------------
+
+def bench_indicators(args):
+    """技术指标计算：pandas 路径 vs 融合计算路径"""
+    print(f"技术指标计算（EMA×7、RSI、MACD、布林带）")
+    for years in (1, args.years):
+        data = make_sample_data(years)
+        expected = calculate_indicators(data.copy(), engine='pandas')
+        actual = calculate_indicators(data.copy(), engine='fused')
+        assert expected.columns.equals(actual.columns), "列不一致"
+        np.testing.assert_allclose(actual.to_numpy(dtype=np.float64), expected.to_numpy(dtype=np.float64),
+                                   rtol=1e-9, atol=1e-9)
+        report(f"{years} 年日线数据",
+               best_time(lambda: calculate_indicators(data.copy(), engine='pandas'), args.repeat),
+               best_time(lambda: calculate_indicators(data.copy(), engine='fused'), args.repeat))
+
+# ---------------------------------------------------------------------------
+# 增量指标更新
+# ---------------------------------------------------------------------------
+
+def bench_incremental(args):
+    """增量指标更新：全量重算 vs 从持久化状态更新新增K线，并校验结果逐位一致"""
+    data = make_sample_data(args.years)
+    # 包含连续相同收盘价的场景（停牌等），覆盖滚动统计的边界情况
+    flat = make_sample_data(args.years, seed=1)
+    flat.iloc[100:130, flat.columns.get_loc(('Close', 'TEST'))] = flat['Close'].iloc[99].item()
+
+    print(f"增量指标更新，{args.years} 年日线数据，每次新增 {args.bars} 根K线")
+    for name, frame in (('随机游走', data), ('含连续相同收盘价', flat)):
+        expected = calculate_indicators(frame.copy(), engine='pandas')
+        with tempfile.TemporaryDirectory() as cache_dir:
+            store = IndicatorStore(cache_dir, backend=args.backend)
+            end = len(frame) - 20 * args.bars
+            actual = calculate_indicators_incremental(frame.iloc[:end], 'TEST', store)
+            while end < len(frame):
+                end += args.bars
+                actual = calculate_indicators_incremental(frame.iloc[:end], 'TEST', store)
+        assert expected.columns.equals(actual.columns), "列不一致"
+        assert np.array_equal(expected[INDICATOR_COLUMNS].to_numpy(dtype=np.float64),
+                              actual[INDICATOR_COLUMNS].to_numpy(dtype=np.float64), equal_nan=True), \
+            f"增量结果与全量重算不一致：{name}"
+        print(f"{name}：增量结果与全量重算逐位一致")
+
+    # 实际运行的方式：指标在起点固定的完整历史上增量计算，再截取最近 252 根K线用于展示（窗口随日期向后移动）。
+    # 每天只应计算新增的K线，截取后的结果与对完整历史全量重算再截取逐位一致
+    window = 252
+    computed = []
+    update_many = IndicatorState.update_many
+
+    def counting_update(state, dates, closes):
+        computed.append(len(dates))
+        return update_many(state, dates, closes)
+
+    with tempfile.TemporaryDirectory() as cache_dir, mock.patch.object(IndicatorState, 'update_many', counting_update):
+        store = IndicatorStore(cache_dir, backend=args.backend)
+        first = len(data) - 10 * args.bars
+        for end in range(first, len(data) + 1, args.bars):
+            history = data.iloc[:end]
+            expected = calculate_indicators(history.copy(), engine='pandas').iloc[-window:]
+            actual = calculate_indicators_incremental(history, 'TEST', store).iloc[-window:]
+            assert np.array_equal(expected[INDICATOR_COLUMNS].to_numpy(dtype=np.float64),
+                                  actual[INDICATOR_COLUMNS].to_numpy(dtype=np.float64), equal_nan=True), \
+                f"移动窗口的增量结果与全量重算不一致：{actual.index[0].date()} ~ {actual.index[-1].date()}"
+    assert sum(computed) == len(data), f"增量路径未复用状态：共计算 {sum(computed)} 根K线，数据只有 {len(data)} 根"
+    print(f"{window} 根K线的移动窗口：增量结果与全量重算逐位一致，首次之后每天只计算新增的 {args.bars} 根K线")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        store = IndicatorStore(cache_dir, backend=args.backend)
+        calculate_indicators_incremental(data.iloc[:-args.bars], 'TEST', store)
+        state = store.load('TEST')
+        timings = []
+        for _ in range(args.repeat):
+            # 每次计时前恢复到新增K线之前的状态
+            store.save('TEST', *state)
+            start = time.perf_counter()
+            calculate_indicators_incremental(data, 'TEST', store)
+            timings.append(time.perf_counter() - start)
+
+        report(f"新增 {args.bars} 根K线",
+               best_time(lambda: calculate_indicators(data.copy(), engine='pandas'), args.repeat),
+               min(timings))
+
+# ---------------------------------------------------------------------------
+# 多周期重采样
+# ---------------------------------------------------------------------------
+
+def legacy_resample_ohlcv(data, interval):
+    """逐列 pandas groupby 聚合的重采样（对照实现）"""
+    periods = data.index.to_period(TIMEFRAMES[interval]['rule'])
+    how = {column: OHLCV_AGGREGATIONS.get(column[0], 'last') for column in data.columns}
+    bars = data.groupby(periods).agg(how)
+    bars.index = data.index.to_series().groupby(periods).last().to_numpy()
+    bars.index.name = data.index.name
+    return bars
+
+def bench_timeframes(args):
+    """周线、月线重采样：pandas groupby 聚合 vs 按周期边界 reduceat，并校验结果一致"""
+    data = make_sample_data(args.years)
+    # 含缺失值的日线（批量下载时不同市场的交易日不一致等）
+    gappy = data.copy()
+    gappy.iloc[::17, 0] = np.nan
+    gappy.iloc[5:9] = np.nan
+    print(f"周线、月线重采样，{args.years} 年日线数据")
+    for interval in ('1wk', '1mo'):
+        expected = legacy_resample_ohlcv(data, interval)
+        pd.testing.assert_frame_equal(expected, resample_ohlcv(data, interval), check_freq=False)
+        pd.testing.assert_frame_equal(legacy_resample_ohlcv(gappy, interval), resample_ohlcv(gappy, interval),
+                                      check_freq=False, check_dtype=False)
+        print(f"{interval}：与 groupby 聚合结果一致（含缺失值），共 {len(expected)} 根K线")
+        report(f"{interval} 重采样", best_time(lambda: legacy_resample_ohlcv(data, interval), args.repeat),
+               best_time(lambda: resample_ohlcv(data, interval), args.repeat))
+
+# ---------------------------------------------------------------------------
+# 图表渲染
+# ---------------------------------------------------------------------------
+
+def _render_charts(mode, frames, output_dir):
+    """依次渲染一组图表，返回每张图的耗时（秒）"""
+    timings = []
+    for symbol, data in frames:
+        start = time.perf_counter()
+        save_analysis_plot(data, symbol, output_dir, mode=mode)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def bench_plot(args):
+    """图表渲染：标准模式 vs 快速模式（单张耗时）以及快速模式的多进程并行吞吐"""
+    frames = [(f'TEST{i}', calculate_indicators(make_sample_data(1, symbol=f'TEST{i}', seed=i), engine='fused'))
+              for i in range(args.charts)]
+    with tempfile.TemporaryDirectory() as output_dir:
+        standard = _render_charts('standard', frames, output_dir)
+        fast = _render_charts('fast', frames, output_dir)
+        # 快速模式的第一张图包含创建模板的开销，单独列出
+        print(f"\n图表渲染，{args.charts} 张图，两种模式均为 {PLOT_DPI} dpi")
+        report("单张图（稳态）", min(standard), min(fast[1:] or fast))
+        report("首张图", standard[0], fast[0])
+
+        chunks = [frames[i::args.workers] for i in range(args.workers)]
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(_render_charts, ['fast'] * args.workers, chunks, [output_dir] * args.workers))
+        parallel = time.perf_counter() - start
+        report(f"{args.workers} 进程并行（总耗时，CPU {os.cpu_count()}）", sum(standard), parallel)
+
+# ---------------------------------------------------------------------------
+# HTML 报告
+# ---------------------------------------------------------------------------
+
+def legacy_write_html_report(results, output_dir):
+    """原实现：拼接整个HTML字符串后一次写入（用于对比，不含Excel导出）"""
+    try:
+        # 导入样式模块
+        from utils.styles import get_css_styles
+        
+        # 获取当前日期
+        from datetime import datetime
+        current_date = datetime.now().strftime("%Y年%m月%d日")
+        
+        # HTML头部
+        html = f"""
+        <!DOCTYPE html>
+        <html lang="zh-CN">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>股票分析报告</title>
+            <link rel="preconnect" href="https://fonts.googleapis.com">
+            <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+            <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
+            <style>
+                {get_css_styles()}
+            </style>
+        </head>
+        <body>
+            <h1>股票分析报告 <span style="font-weight: 400; font-size: 1.2rem; color: #8A919E; margin-left: 12px;">{current_date}</span></h1>
+            
+            <div class="card">
+                <div class="card-header">
+                    <h2 style="margin: 0;">市场概览</h2>
+                </div>
+                <div class="card-body">
+                    <p>详细数据已保存到 <a href="stock_analysis.xlsx">stock_analysis.xlsx</a></p>
+                    <table>
+                        <thead>
+                            <tr>
+                                <th>股票代码</th>
+                                <th>当前价格</th>
+                                <th>价格变化</th>
+                                <th>RSI</th>
+                                <th>警报数量</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+        """
+        
+        # 添加概览表格数据
+        for result in results:
+            if result.get('error'):
+                html += f"""
+                <tr>
+                    <td>{result['symbol']}</td>
+                    <td colspan="4" style="color: #D82C0D;">Error: {result['error']}</td>
+                </tr>
+                """
+                continue
+                
+            price_change = float(format_value(result['price_change']))
+            price_change_class = 'up' if price_change > 0 else 'down'
+            rsi_value = float(format_value(result['rsi']))
+            rsi_class = ""
+            if rsi_value >= 70:
+                rsi_class = "down"  # 超买
+            elif rsi_value <= 30:
+                rsi_class = "up"    # 超卖
+            
+            alert_count = len(result.get('alert_details', []))
+            
+            html += f"""
+            <tr>
+                <td><strong>{result['symbol']}</strong></td>
+                <td>{format_value(result['price'])}</td>
+                <td class="{price_change_class}">{format_value(result['price_change'])} ({format_value(result['price_change_pct'])} %)</td>
+                <td class="{rsi_class}">{format_value(result['rsi'])}</td>
+                <td>{alert_count} {f'<span class="alert">{"警报" if alert_count > 0 else ""}</span>' if alert_count > 0 else ""}</td>
+            </tr>
+            """
+        
+        html += """
+                        </tbody>
+                    </table>
+                </div>
+            </div>
+            
+            <div class="card">
+                <div class="card-header">
+                    <h2 style="margin: 0;">详细分析</h2>
+                </div>
+            </div>
+        """
+        
+        # 添加每个股票的详细分析
+        for result in results:
+            if result.get('error'):
+                continue
+                
+            # 获取主要指标
+            price = format_value(result['price'])
+            price_change = format_value(result['price_change'])
+            price_change_pct = format_value(result['price_change_pct'])
+            rsi = format_value(result['rsi'])
+            change_class = 'up' if float(price_change) > 0 else 'down'
+
+            # 嵌入图表
+            plot_data = ''
+            plot_filename = os.path.join(output_dir, f"{result['symbol']}_analysis_plot.png")
+            if os.path.exists(plot_filename):
+                with open(plot_filename, "rb") as image_file:
+                    plot_data = base64.b64encode(image_file.read()).decode()
+            
+            html += f"""
+            <div class="card stock-detail">
+                <div class="card-header">
+                    <h3 style="margin: 0;">{result['symbol']} 详细分析</h3>
+                </div>
+                <div class="card-body">
+                    <!-- 关键指标部分 -->
+                    <div class="metrics-container">
+                        <div class="metric-card">
+                            <div class="metric-name">价格</div>
+                            <div class="metric-value">{price}</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-name">变化</div>
+                            <div class="metric-value {change_class}">{price_change}</div>
+                            <div class="metric-change {change_class}">({price_change_pct} %)</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-name">RSI</div>
+                            <div class="metric-value">{rsi}</div>
+                            <div class="metric-change">{"超买" if float(rsi) >= 70 else "超卖" if float(rsi) <= 30 else "正常"}</div>
+                        </div>
+                        <div class="metric-card">
+                            <div class="metric-name">警报</div>
+                            <div class="metric-value">{len(result.get('alert_details', []))}</div>
+                        </div>
+                    </div>
+                    
+                    <!-- 分析图表 -->
+                    <img src="data:image/png;base64,{plot_data}" alt="{result['symbol']} 分析图表">
+            """
+            
+            # 添加警报信息
+            if result.get('alert_details', []):
+                html += """<div class="card" style="margin-top: 24px;">
+                    <div class="card-header">
+                        <h4 style="margin: 0;">警报信息</h4>
+                    </div>
+                    <div class="card-body">
+                        <ul>"""
+                for alert in result['alert_details']:
+                    # 从字典中获取消息
+                    alert_message = alert.get('message', '')
+
+                    # 提取日期并检查是否在最近10天内
+                    import re
+                    from datetime import datetime, timedelta
+                    date_match = re.search(r'发生于：(\d{4}-\d{2}-\d{2})', alert_message)
+                    is_recent = False
+                    if date_match:
+                        alert_date = datetime.strptime(date_match.group(1), '%Y-%m-%d')
+                        current_date = datetime.now()
+                        days_diff = (current_date - alert_date).days
+                        is_recent = days_diff <= 10
+                    
+                    # 清除ANSI颜色代码
+                    clean_alert = remove_ansi_colors(alert_message)
+                    
+                    # 替换常见的中英文混排情况，添加空格
+                    import re
+                    # 在英文字母/数字和中文之间添加空格
+                    clean_alert = re.sub(r'([a-zA-Z0-9])([\u4e00-\u9fff])', r'\1 \2', clean_alert)
+                    clean_alert = re.sub(r'([\u4e00-\u9fff])([a-zA-Z0-9])', r'\1 \2', clean_alert)
+                    # 确保数字与百分号之间有空格
+                    clean_alert = re.sub(r'([0-9])%', r'\1 %', clean_alert)
+                    
+                    # 根据警报类型和时间添加不同的样式
+                    if '金叉' in clean_alert or '上穿' in clean_alert or '买入' in clean_alert or '看涨' in clean_alert:
+                        html += f'<li class="golden-cross">{clean_alert}</li>'
+                    elif '死叉' in clean_alert or '下穿' in clean_alert or '卖出' in clean_alert or '看跌' in clean_alert:
+                        html += f'<li class="death-cross">{clean_alert}</li>'
+                    elif 'RSI 超买' in clean_alert or 'RSI超买' in clean_alert or '突破上轨' in clean_alert:
+                        html += f'<li class="death-cross">{clean_alert}</li>'
+                    elif 'RSI 超卖' in clean_alert or 'RSI超卖' in clean_alert or '跌破下轨' in clean_alert:
+                        html += f'<li class="golden-cross">{clean_alert}</li>'
+                    elif '布林带收口' in clean_alert:
+                        html += f'<li class="golden-cross" style="color: #F39C12;">{clean_alert}</li>'
+                    else:
+                        # 如果不是交叉信号，使用普通样式
+                        html += f'<li>{clean_alert}</li>'
+                html += """</ul>
+                    </div>
+                </div>"""
+            
+            html += "</div>\n</div>"
+        
+        # HTML尾部
+        html += """
+            <footer style="margin-top: 40px; padding-top: 20px; border-top: 1px solid #E4E7EC; text-align: center; color: #8A919E; font-size: 0.9rem;">
+                <p>EMA 股票分析工具 © 版权所有</p>
+            </footer>
+        </body>
+        </html>
+        """
+        
+        # 保存HTML报告
+        with open(os.path.join(output_dir, 'analysis_results.html'), 'w', encoding='utf-8') as f:
+            f.write(html)
+            
+    except Exception as e:
+        print(f"{Colors.RED}Error saving results to HTML: {str(e)}{Colors.END}")
+
+def measure(func):
+    """运行一次，返回 (耗时秒数, Python 分配的峰值内存字节数)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+def bench_report(args):
+    """HTML 报告：字符串拼接 + 内存中 base64 vs 逐段写入文件（三种图表引用方式）"""
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for i in range(args.symbols):
+            symbol = f'TEST{i}'
+            data = calculate_indicators(make_sample_data(1, symbol=symbol, seed=i), engine='fused')
+            save_analysis_plot(data, symbol, output_dir, mode=args.plot_mode)
+            close = data['Close']
+            results.append({
+                'symbol': symbol,
+                'price': close.iloc[-1].item(),
+                'price_change': close.iloc[-1].item() - close.iloc[-2].item(),
+                'price_change_pct': (close.iloc[-1].item() / close.iloc[-2].item() - 1) * 100,
+                'rsi': data['RSI'].iloc[-1].item(),
+                'alert_details': generate_alerts(symbol, data, use_colors=False),
+            })
+        report_path = os.path.join(output_dir, 'analysis_results.html')
+
+        legacy_time, legacy_peak = measure(lambda: legacy_write_html_report(results, output_dir))
+        with open(report_path, encoding='utf-8') as f:
+            expected = f.read()
+        print(f"\nHTML 报告，{args.symbols} 个股票（原实现报告 {len(expected.encode()) / 1024 ** 2:.1f} MB）")
+        for image_mode in ('inline', 'link', 'lazy'):
+            elapsed, peak = measure(lambda: write_html_report(results, output_dir, image_mode=image_mode))
+            size = os.path.getsize(report_path)
+            if image_mode == 'inline':
+                with open(report_path, encoding='utf-8') as f:
+                    assert f.read() == expected, "内嵌模式的报告与原实现不一致"
+            report(f"{image_mode}（{size / 1024 ** 2:.1f} MB）", legacy_time, elapsed)
+            print(f"{'':<32} 峰值内存 原实现 {legacy_peak / 1024 ** 2:7.2f} MB   新实现 {peak / 1024 ** 2:7.2f} MB")
+
+# ---------------------------------------------------------------------------
+# Excel 报告
+# ---------------------------------------------------------------------------
+
+def bench_excel(args):
+    """Excel 报告：openpyxl 逐单元格着色 vs xlsxwriter 流式写入 + 原生条件格式"""
+    results = []
+    for i in range(args.symbols):
+        symbol = f'TEST{i}'
+        data = calculate_indicators(make_sample_data(args.years, symbol=symbol, seed=i), engine='fused')
+        close = data['Close']
+        results.append({
+            'symbol': symbol,
+            'data': data,
+            'price': close.iloc[-1].item(),
+            'price_change': close.iloc[-1].item() - close.iloc[-2].item(),
+            'price_change_pct': (close.iloc[-1].item() / close.iloc[-2].item() - 1) * 100,
+            'rsi': data['RSI'].iloc[-1].item(),
+            'alert_details': [],
+        })
+    print(f"Excel 报告，{args.symbols} 个股票，每个 {args.years * 252} 行")
+    with tempfile.TemporaryDirectory() as output_dir:
+        standard = best_time(lambda: generate_excel_report(results, output_dir, mode='standard'), 1)
+        fast = best_time(lambda: generate_excel_report(results, output_dir, mode='fast'), args.repeat)
+        report("全部行", standard, fast)
+        if args.max_rows:
+            limited = best_time(lambda: generate_excel_report(results, output_dir, mode='fast',
+                                                              max_rows=args.max_rows), args.repeat)
+            report(f"最近 {args.max_rows} 行", standard, limited)
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='性能基准测试')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数（取最短耗时）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    crossover = subparsers.add_parser('crossover', help='均线交叉检测')
+    crossover.add_argument('--years', type=int, default=10, help='数据长度（年）')
+    crossover.set_defaults(func=bench_crossover)
+
+    indicators = subparsers.add_parser('indicators', help='技术指标计算')
+    indicators.add_argument('--years', type=int, default=10, help='数据长度（年）')
+    indicators.set_defaults(func=bench_indicators)
+
+    incremental = subparsers.add_parser('incremental', help='增量指标更新')
+    incremental.add_argument('--years', type=int, default=10, help='数据长度（年）')
+    incremental.add_argument('--bars', type=int, default=1, help='每次新增的K线数量')
+    incremental.add_argument('--backend', default='feather', help='状态存储后端')
+    incremental.set_defaults(func=bench_incremental)
+
+    timeframes = subparsers.add_parser('timeframes', help='周线、月线重采样')
+    timeframes.add_argument('--years', type=int, default=10, help='数据长度（年）')
+    timeframes.set_defaults(func=bench_timeframes)
+
+    plot = subparsers.add_parser('plot', help='图表渲染')
+    plot.add_argument('--charts', type=int, default=8, help='渲染的图表数量')
+    plot.add_argument('--workers', type=int, default=os.cpu_count(), help='并行渲染的进程数')
+    plot.set_defaults(func=bench_plot)
+
+    report_parser = subparsers.add_parser('report', help='HTML 报告生成')
+    report_parser.add_argument('--symbols', type=int, default=30, help='股票数量')
+    report_parser.add_argument('--plot-mode', default='standard', help='生成测试图表的渲染模式')
+    report_parser.set_defaults(func=bench_report)
+
+    excel = subparsers.add_parser('excel', help='Excel 报告导出')
+    excel.add_argument('--symbols', type=int, default=30, help='股票数量')
+    excel.add_argument('--years', type=int, default=1, help='每个股票的数据长度（年）')
+    excel.add_argument('--max-rows', type=int, default=60, help='只保留最近的行数（0 表示不测试）')
+    excel.set_defaults(func=bench_excel)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -6,58 +6,133 @@
 - RSI (相对强弱指标)
 - 均线交叉信号
 - 价格与均线关系
+- 由日线缓存重采样得到的周线、月线指标与警报
 """
 
 import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-from collections import Counter # 引入Counter
+import time
+from collections import Counter, defaultdict # 引入Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 
-from utils.constants import Colors
+from utils.constants import Colors, TIMEFRAMES
 from utils.config import load_config
 from utils.analysis import calculate_indicators
 from utils.alerts import generate_alerts
-from utils.report import save_analysis_plot, generate_report
+from utils.report import (save_analysis_plot, generate_report, plot_fingerprint, load_previous_plot_cache,
+                          reuse_cached_plot, save_plot_cache)
+from utils.data_fetcher import DataFetcher
+from utils.indicator_state import IndicatorStore, calculate_indicators_incremental
+from utils.timeframes import resample_ohlcv
 
-def analyze_stock(symbol, start_date, end_date, output_dir):
+# 各阶段名称（用于耗时统计）
+STAGE_NAMES = {
+    'fetch': '数据获取',
+    'indicators': '指标计算',
+    'alerts': '警报生成',
+    'timeframes': '多周期分析',
+    'plot': '图表渲染',
+    'report': '报告生成',
+}
+
+def fetch_stock_data(fetcher, symbol, start_date, end_date):
     """
-    分析单个股票
+    获取单个股票数据并计时（线程池中执行）
     
     Args:
+        fetcher (DataFetcher): 数据获取器
         symbol (str): 股票代码
         start_date (str): 开始日期
         end_date (str): 结束日期
-        output_dir (str): 输出目录
     
     Returns:
-        dict: 分析结果
+        tuple: (股票数据或None, 耗时秒数)
     """
+    start = time.perf_counter()
     try:
-        print(f"\n\n分析股票 {symbol}...")
-
-        # 使用DataFetcher获取股票数据
-        from utils.data_fetcher import DataFetcher
-        fetcher = DataFetcher()
         data = fetcher.fetch_data(symbol, start_date, end_date)
+    except Exception as e:
+        print(f"{Colors.RED}Error fetching {symbol}: {str(e)}{Colors.END}")
+        data = None
+    return data, time.perf_counter() - start
+
+def analyze_timeframes(symbol, history, options):
+    """
+    由日线重采样得到周线、月线，计算技术指标并生成警报
+    
+    Args:
+        symbol (str): 股票代码
+        history (pd.DataFrame): 日线数据
+        options (dict): 分析选项（见 build_analysis_options）
+    
+    Returns:
+        dict: 周期到 {'data': 带指标的K线, 'terminal_alerts': 带颜色的警报, 'report_alerts': 不带颜色的警报} 的字典
+    """
+    # 周线、月线K线数量少，且最后一根K线在周期结束前每天都会变化，不使用增量指标状态
+    engine = 'pandas' if options.get('indicator_engine', 'pandas') == 'pandas' else 'fused'
+    results = {}
+    for interval in options.get('timeframes') or []:
+        bars = resample_ohlcv(history, interval)
+        if len(bars) < 2:
+            continue
+        bars = calculate_indicators(bars, engine=engine)
+        results[interval] = {
+            'data': bars,
+            'terminal_alerts': generate_alerts(symbol, bars, use_colors=True, interval=interval),
+            'report_alerts': generate_alerts(symbol, bars, use_colors=False, interval=interval),
+        }
+    return results
+
+def process_stock_data(symbol, data, output_dir, options=None):
+    """
+    计算指标、生成警报并渲染图表（可在进程池中执行）
+    
+    Args:
+        symbol (str): 股票代码
+        data (pd.DataFrame): 股票数据；设置了 options['daily_start'] 时可以包含更早的历史，
+                             技术指标在完整的数据上计算（起点固定，增量指标状态可以跨日复用），
+                             完整的数据也用于重采样周线、月线，日线的警报、图表和报告只使用 daily_start 之后的部分
+        output_dir (str): 输出目录
+        options (dict): 分析选项（见 build_analysis_options）
+    
+    Returns:
+        dict: 分析结果，包含 'terminal_alerts'（带颜色的警报）和 'timings'（各阶段耗时）
+    """
+    options = options or {}
+    timings = {}
+    try:
+        history = data
         
-        if data is None:
-            return {
-                'symbol': symbol,
-                'error': '无法获取股票数据'
-            }
-        
-        # 计算技术指标
-        data = calculate_indicators(data)
+        # 计算技术指标（在完整的历史上计算，再截取日线分析的区间）
+        start = time.perf_counter()
+        engine = options.get('indicator_engine', 'pandas')
+        if engine == 'incremental':
+            store = IndicatorStore(backend=options.get('cache_backend', 'feather'))
+            data = calculate_indicators_incremental(history, symbol, store)
+        else:
+            # pandas 路径直接在传入的数据上添加指标列，history 需保持原样用于重采样
+            data = calculate_indicators(history.copy(), engine=engine)
+        if options.get('daily_start'):
+            data = data[data.index >= pd.Timestamp(options['daily_start'], tz=data.index.tz)]
+        timings['indicators'] = time.perf_counter() - start
         
-        # 生成警报（用于终端显示）
+        # 生成警报（带颜色用于终端显示，不带颜色用于报告）
+        start = time.perf_counter()
         terminal_alerts = generate_alerts(symbol, data, use_colors=True)
-        # 打印带颜色的警报
-        for alert in terminal_alerts:
-            print(alert['message']) # 打印消息本身
-            
-        # 生成不带颜色的警报（用于报告）
         report_alerts = generate_alerts(symbol, data, use_colors=False)
+        timings['alerts'] = time.perf_counter() - start
+        
+        # 周线、月线（由日线重采样，不额外下载）
+        timeframes = {}
+        if options.get('timeframes'):
+            start = time.perf_counter()
+            for interval, timeframe in analyze_timeframes(symbol, history, options).items():
+                terminal_alerts.extend(timeframe['terminal_alerts'])
+                report_alerts.extend(timeframe['report_alerts'])
+                timeframes[interval] = timeframe['data']
+            timings['timeframes'] = time.perf_counter() - start
         
         # 统计警报类型
         alert_counts = Counter(alert['type'] for alert in report_alerts)
@@ -69,7 +144,15 @@ def analyze_stock(symbol, start_date, end_date, output_dir):
         price_change_pct = (price_change / prev_close) * 100
         
         # 保存分析图表
-        save_analysis_plot(data, symbol, output_dir)
+        start = time.perf_counter()
+        plot_mode = options.get('plot_mode', 'standard')
+        fingerprint = plot_fingerprint(data, symbol, plot_mode)
+        if reuse_cached_plot(symbol, fingerprint, output_dir, options.get('plot_cache')):
+            plot_status = 'cached'
+        else:
+            save_analysis_plot(data, symbol, output_dir, mode=plot_mode)
+            plot_status = 'rendered'
+        timings['plot'] = time.perf_counter() - start
         
         return {
             'symbol': symbol,
@@ -80,6 +163,11 @@ def analyze_stock(symbol, start_date, end_date, output_dir):
             'rsi': data['RSI'].iloc[-1].item(),
             'alert_details': report_alerts,  # 使用不带颜色的警报
             'alert_counts': dict(alert_counts), # 添加警报统计
+            'terminal_alerts': terminal_alerts,
+            'timeframes': timeframes,  # 周期到带指标的K线
+            'plot_fingerprint': fingerprint,
+            'plot_status': plot_status,
+            'timings': timings,
             'error': None
         }
         
@@ -87,11 +175,196 @@ def analyze_stock(symbol, start_date, end_date, output_dir):
         print(f"{Colors.RED}Error analyzing {symbol}: {str(e)}{Colors.END}")
         return {
             'symbol': symbol,
-            'error': str(e)
+            'error': str(e),
+            'timings': timings
         }
 
+def analyze_stock(symbol, start_date, end_date, output_dir, fetcher=None, options=None):
+    """
+    分析单个股票
+    
+    Args:
+        symbol (str): 股票代码
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        output_dir (str): 输出目录
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认配置
+        options (dict): 分析选项（见 build_analysis_options）
+    
+    Returns:
+        dict: 分析结果
+    """
+    print(f"\n\n分析股票 {symbol}...")
+
+    # 使用DataFetcher获取股票数据
+    data, fetch_time = fetch_stock_data(fetcher or DataFetcher(), symbol, start_date, end_date)
+    
+    if data is None:
+        return {
+            'symbol': symbol,
+            'error': '无法获取股票数据',
+            'timings': {'fetch': fetch_time}
+        }
+    
+    result = process_stock_data(symbol, data, output_dir, options)
+    result['timings']['fetch'] = fetch_time
+    
+    # 打印带颜色的警报
+    for alert in result.get('terminal_alerts', []):
+        print(alert['message']) # 打印消息本身
+    
+    return result
+
+def fetch_stock_data_batch(fetcher, symbols, start_date, end_date):
+    """
+    通过一次批量下载获取多个股票数据
+    
+    Args:
+        fetcher (DataFetcher): 数据获取器
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+    
+    Returns:
+        dict: 股票代码到 (股票数据或None, 均摊耗时秒数) 的字典
+    """
+    start = time.perf_counter()
+    try:
+        data_map = fetcher.fetch_many(symbols, start_date, end_date)
+    except Exception as e:
+        print(f"{Colors.RED}Error fetching batch: {str(e)}{Colors.END}")
+        data_map = {}
+    elapsed = (time.perf_counter() - start) / max(len(symbols), 1)
+    return {symbol: (data_map.get(symbol), elapsed) for symbol in symbols}
+
+def analyze_stocks_parallel(symbols, start_date, end_date, output_dir, fetch_workers=8, process_workers=None,
+                            batch_download=False, fetcher=None, options=None):
+    """
+    并发分析多个股票
+    
+    网络请求在线程池中执行，指标计算和图表渲染在进程池中执行。
+    某个股票的数据一旦获取完成即提交到进程池，两个阶段流水线式重叠。
+    启用批量下载时，所有缓存未命中的股票通过一次请求获取。
+    
+    Args:
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        output_dir (str): 输出目录
+        fetch_workers (int): 数据获取线程数
+        process_workers (int): 计算进程数，None 表示使用 CPU 核心数
+        batch_download (bool): 是否批量下载缓存未命中的股票
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认配置
+        options (dict): 分析选项（见 build_analysis_options）
+    
+    Returns:
+        list: 分析结果列表，顺序与 symbols 一致
+    """
+    fetcher = fetcher or DataFetcher()
+    results = [None] * len(symbols)
+    
+    with ThreadPoolExecutor(max_workers=fetch_workers) as io_pool, \
+            ProcessPoolExecutor(max_workers=process_workers) as cpu_pool:
+        if batch_download:
+            batch = fetch_stock_data_batch(fetcher, symbols, start_date, end_date)
+            fetched = ((index, batch[symbol]) for index, symbol in enumerate(symbols))
+        else:
+            fetch_futures = {
+                io_pool.submit(fetch_stock_data, fetcher, symbol, start_date, end_date): index
+                for index, symbol in enumerate(symbols)
+            }
+            fetched = ((fetch_futures[future], future.result()) for future in as_completed(fetch_futures))
+        
+        process_futures = {}
+        for index, (data, fetch_time) in fetched:
+            symbol = symbols[index]
+            if data is None:
+                results[index] = {
+                    'symbol': symbol,
+                    'error': '无法获取股票数据',
+                    'timings': {'fetch': fetch_time}
+                }
+                continue
+            process_futures[cpu_pool.submit(process_stock_data, symbol, data, output_dir, options)] = (index, fetch_time)
+        
+        for future, (index, fetch_time) in process_futures.items():
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"{Colors.RED}Error analyzing {symbols[index]}: {str(e)}{Colors.END}")
+                result = {'symbol': symbols[index], 'error': str(e), 'timings': {}}
+            result['timings']['fetch'] = fetch_time
+            results[index] = result
+    
+    # 按配置顺序打印各股票的警报
+    for result in results:
+        print(f"\n\n分析股票 {result['symbol']}...")
+        for alert in result.get('terminal_alerts', []):
+            print(alert['message'])
+    
+    return results
+
+def history_start(lookback_days):
+    """
+    日线历史的起始日期：回溯 lookback_days 天后所在年份的 1 月 1 日
+    
+    起点在一年之内保持不变，增量指标状态（要求数据的第一根K线不变）才能跨日复用，
+    每年只在 1 月 1 日全量重算一次。
+    
+    Args:
+        lookback_days (int): 至少回溯的天数
+    
+    Returns:
+        str: 起始日期
+    """
+    return (datetime.now() - timedelta(days=lookback_days)).strftime('%Y-01-01')
+
+def build_analysis_options(config):
+    """
+    从配置文件中提取分析选项
+    
+    Args:
+        config (dict): 配置信息
+    
+    Returns:
+        dict: 分析选项
+    """
+    analysis = config.get('analysis') or {}
+    timeframes = analysis.get('timeframes') or {}
+    return {
+        'indicator_engine': analysis.get('indicator_engine', 'pandas'),
+        'timeframes': [interval for interval in timeframes.get('intervals') or [] if interval in TIMEFRAMES
+                       and interval != '1d'],
+        'timeframe_lookback_days': timeframes.get('lookback_days', 365),
+        'cache_backend': (config.get('cache') or {}).get('backend', 'feather'),
+        'plot_mode': ((config.get('output') or {}).get('plot') or {}).get('mode', 'standard'),
+    }
+
+def print_stage_timings(results, report_time, wall_time):
+    """
+    打印各阶段耗时统计
+    
+    Args:
+        results (list): 分析结果列表
+        report_time (float): 报告生成耗时（秒）
+        wall_time (float): 总耗时（秒）
+    """
+    totals = defaultdict(float)
+    for result in results:
+        for stage, seconds in result.get('timings', {}).items():
+            totals[stage] += seconds
+    totals['report'] += report_time
+    
+    print("\n各阶段耗时统计（各股票累计）:")
+    for stage, name in STAGE_NAMES.items():
+        if stage in totals:
+            print(f"- {name}: {totals[stage]:.2f} 秒")
+    print(f"- 总耗时（墙钟）: {wall_time:.2f} 秒")
+
 def main():
     """主函数"""
+    run_start = time.perf_counter()
+    
     # 读取配置文件
     config = load_config()
     if not config:
@@ -101,26 +374,63 @@ def main():
     output_dir = os.path.join('output', datetime.now().strftime('%Y%m%d_%H%M%S'))
     os.makedirs(output_dir, exist_ok=True)
     
+    start_date = (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d')
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    
+    # 数据获取器（缓存格式见配置文件 cache.backend）
+    fetcher = DataFetcher(backend=(config.get('cache') or {}).get('backend', 'feather'))
+    
     # 分析所有股票
-    results = []
+    options = build_analysis_options(config)
+    if options['timeframes'] or options['indicator_engine'] == 'incremental':
+        # 周线、月线由同一份日线缓存重采样得到，增量指标需要固定的起点：日线的起始日期提前并固定到年初，
+        # 日线分析仍使用最近一年
+        lookback = max(365, options['timeframe_lookback_days']) if options['timeframes'] else 365
+        options['daily_start'] = start_date
+        start_date = history_start(lookback)
+    if ((config.get('output') or {}).get('plot') or {}).get('cache', True):
+        # 数据未变化的图表直接从上次的输出目录复用
+        options['plot_cache'] = load_previous_plot_cache(output_dir)
+    execution = config.get('execution') or {}
+    if execution.get('mode', 'serial') == 'parallel':
+        results = analyze_stocks_parallel(
+            config['stocks'],
+            start_date,
+            end_date,
+            output_dir,
+            fetch_workers=execution.get('fetch_workers', 8),
+            process_workers=execution.get('process_workers'),
+            batch_download=execution.get('batch_download', False),
+            fetcher=fetcher,
+            options=options
+        )
+    else:
+        results = [
+            analyze_stock(symbol, start_date, end_date, output_dir, fetcher=fetcher, options=options)
+            for symbol in config['stocks']
+        ]
+    
     success_count = 0
     total_alert_counts = Counter() # 用于汇总所有股票的警报统计
-    
-    for symbol in config['stocks']:
-        result = analyze_stock(
-            symbol,
-            (datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'),
-            datetime.now().strftime('%Y-%m-%d'),
-            output_dir
-        )
-        results.append(result)
+    for result in results:
         if not result.get('error'):
             success_count += 1
             if 'alert_counts' in result: # 累加警报统计
                 total_alert_counts.update(result['alert_counts'])
     
+    # 记录图表指纹供下次运行复用
+    save_plot_cache(results, output_dir)
+    plot_counts = Counter(result['plot_status'] for result in results if result.get('plot_status'))
+    
     # 生成HTML报告
-    generate_report(results, output_dir) # 传递包含警报统计的results
+    report_start = time.perf_counter()
+    report_options = (config.get('output') or {}).get('report') or {}
+    excel_options = (config.get('output') or {}).get('excel') or {}
+    generate_report(results, output_dir, # 传递包含警报统计的results
+                    image_mode=report_options.get('image_mode', 'inline'),
+                    excel_mode=excel_options.get('mode', 'standard'),
+                    excel_max_rows=excel_options.get('max_rows'))
+    report_time = time.perf_counter() - report_start
     
     # 打印分析完成信息
     print(f"\n分析完成！")
@@ -128,12 +438,16 @@ def main():
     print(f"分析结果已保存到目录: {output_dir}")
     print("生成的文件：")
     print("- analysis_results.html：完整分析结果（包含图表和详细信息）")
+    print(f"图表：重新渲染 {plot_counts['rendered']} 张，复用缓存 {plot_counts['cached']} 张")
 
     # 打印警报统计
     if total_alert_counts:
         print("\n警报类型统计:")
         for alert_type, count in total_alert_counts.items():
             print(f"- {alert_type}: {count}")
+    
+    # 打印各阶段耗时
+    print_stage_timings(results, report_time, time.perf_counter() - run_start)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+缓存迁移工具
+将 data_cache/ 中的旧缓存（按日期窗口命名的 pickle 文件，或其他格式的缓存）
+一次性转换为指定的缓存格式
+
+用法：
+    python migrate_cache.py                      # 转换为 Feather 格式
+    python migrate_cache.py --backend parquet    # 转换为 Parquet 格式
+    python migrate_cache.py --remove-old         # 转换后删除旧文件
+"""
+
+import argparse
+
+from utils.cache_backends import BACKENDS
+from utils.data_fetcher import DataFetcher
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='将旧缓存转换为列式存储格式')
+    parser.add_argument('--cache-dir', default='data_cache', help='缓存目录路径')
+    parser.add_argument('--backend', default='feather', choices=list(BACKENDS), help='目标缓存格式')
+    parser.add_argument('--remove-old', action='store_true', help='转换成功后删除旧文件')
+    args = parser.parse_args()
+
+    fetcher = DataFetcher(cache_dir=args.cache_dir, backend=args.backend)
+    converted = fetcher.migrate_cache(remove_old=args.remove_old)
+    print(f"已将 {converted} 个股票的缓存转换为 {fetcher.backend.name} 格式，目录: {args.cache_dir}")
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
 """警报生成模块"""
 
-from .constants import Colors
-from .analysis import detect_ema_cross, get_rsi_signal, detect_price_ema_cross, detect_macd_signals, detect_bollinger_signals
+from .constants import Colors, TIMEFRAMES
+from .analysis import detect_ema_crosses, get_rsi_signal, detect_price_ema_crosses, detect_macd_signals, detect_bollinger_signals
 
-def generate_alerts(symbol, data, use_colors=True):
+def generate_alerts(symbol, data, use_colors=True, interval='1d'):
     """
     生成股票警报
     
@@ -11,6 +11,7 @@ def generate_alerts(symbol, data, use_colors=True):
         symbol (str): 股票代码
         data (pd.DataFrame): 股票数据
         use_colors (bool): 是否使用颜色标记，默认为True
+        interval (str): K线周期（见 TIMEFRAMES），非日线的警报类型和消息带有周期名称前缀
     
     Returns:
         list: 警报列表，每个元素是一个包含 'type' 和 'message' 的字典
@@ -27,11 +28,11 @@ def generate_alerts(symbol, data, use_colors=True):
         
         # 检查价格与均线关系
         latest_close = data['Close'].iloc[-1].item()
-        price_alerts = get_price_alerts(data, latest_close, use_colors)
+        price_alerts = get_price_alerts(data, latest_close, use_colors, interval)
         alerts.extend(price_alerts)
         
         # 检查价格与EMA5/EMA10的交叉
-        price_ema_alerts = get_price_ema_cross_alerts(data, use_colors)
+        price_ema_alerts = get_price_ema_cross_alerts(data, use_colors, interval)
         alerts.extend(price_ema_alerts)
         
         # 检查MACD信号
@@ -42,6 +43,12 @@ def generate_alerts(symbol, data, use_colors=True):
         bollinger_alerts = get_bollinger_alerts(data, use_colors)
         alerts.extend(bollinger_alerts)
         
+        # 区分不同周期的警报（如 "周线_RSI超买"）
+        if interval != '1d':
+            name = TIMEFRAMES[interval]['name']
+            alerts = [{'type': f"{name}_{alert['type']}", 'message': f"[{name}] {alert['message']}"}
+                      for alert in alerts]
+        
         return alerts
         
     except Exception as e:
@@ -100,7 +107,7 @@ def get_bollinger_alerts(data, use_colors=True):
         print(f"{Colors.RED}Error generating Bollinger alerts: {str(e)}{Colors.END}")
         return []
 
-def get_price_alerts(data, latest_close, use_colors=True):
+def get_price_alerts(data, latest_close, use_colors=True, interval='1d'):
     """
     根据价格和均线生成警报
     
@@ -108,24 +115,27 @@ def get_price_alerts(data, latest_close, use_colors=True):
         data (pd.DataFrame): 股票数据
         latest_close (float): 最新收盘价
         use_colors (bool): 是否使用颜色标记，默认为True
+        interval (str): K线周期，决定均线名称（日/周/月均线）和“最近”交叉的天数
     
     Returns:
         list: 警报列表，每个元素是一个包含 'type' 和 'message' 的字典
     """
     alerts = []
+    unit = TIMEFRAMES[interval]['unit']
+    recent_days = TIMEFRAMES[interval]['recent_days']
     
     # 检查是否跌破各条均线
     for period in [5, 10, 20, 50]:
         ema = data[f'EMA_{period}'].iloc[-1].item()
         if latest_close < ema:
-            alerts.append({'type': f'价格跌破{period}日均线', 'message': f"价格 ({latest_close:.2f}) 跌破 {period}日均线 ({ema:.2f})"})
+            alerts.append({'type': f'价格跌破{period}{unit}均线', 'message': f"价格 ({latest_close:.2f}) 跌破 {period}{unit}均线 ({ema:.2f})"})
     
     # 获取最新日期
     latest_date = data.index[-1]
     
-    # 检查是否形成金叉或死叉
-    for short_period, long_period in [(5, 10), (10, 20), (20, 50)]:
-        cross_signal, cross_date = detect_ema_cross(data, short_period, long_period)
+    # 检查是否形成金叉或死叉（所有均线组合一次向量化检测）
+    ema_crosses = detect_ema_crosses(data, [(5, 10), (10, 20), (20, 50)])
+    for (short_period, long_period), (cross_signal, cross_date) in ema_crosses.items():
         if cross_signal is not None and cross_date is not None:
             # 计算交叉日期与最新日期的天数差
             days_diff = (latest_date - cross_date).days
@@ -134,13 +144,13 @@ def get_price_alerts(data, latest_close, use_colors=True):
             # 构建基本消息
             if cross_signal == "golden_cross":
                 alert_type = f'{short_period}-{long_period}金叉'
-                base_msg = f"{short_period}日均线突破{long_period}日均线，形成金叉，发生于：{cross_date.strftime('%Y-%m-%d')}"
+                base_msg = f"{short_period}{unit}均线突破{long_period}{unit}均线，形成金叉，发生于：{cross_date.strftime('%Y-%m-%d')}"
             else:  # death_cross
                 alert_type = f'{short_period}-{long_period}死叉'
-                base_msg = f"{short_period}日均线跌破{long_period}日均线，形成死叉，发生于：{cross_date.strftime('%Y-%m-%d')}"
+                base_msg = f"{short_period}{unit}均线跌破{long_period}{unit}均线，形成死叉，发生于：{cross_date.strftime('%Y-%m-%d')}"
             
-            # 只有最近 10 天的交叉才添加颜色
-            if use_colors and days_diff <= 10:
+            # 只有最近的交叉才添加颜色（日线为 10 天，其他周期约 10 根K线）
+            if use_colors and days_diff <= recent_days:
                 if cross_signal == "golden_cross":
                     alerts.append({'type': alert_type, 'message': f"{Colors.GREEN}{base_msg}{Colors.END}"})
                 else:  # death_cross
@@ -150,35 +160,38 @@ def get_price_alerts(data, latest_close, use_colors=True):
     
     return alerts
 
-def get_price_ema_cross_alerts(data, use_colors=True):
+def get_price_ema_cross_alerts(data, use_colors=True, interval='1d'):
     """
     检测价格与EMA的交叉并生成警报
     
     Args:
         data (pd.DataFrame): 股票数据
         use_colors (bool): 是否使用颜色标记，默认为True
+        interval (str): K线周期，决定均线名称（日/周/月均线）和“最近”交叉的天数
     
     Returns:
         list: 警报列表，每个元素是一个包含 'type' 和 'message' 的字典
     """
     alerts = []
     latest_date = data.index[-1]
+    unit = TIMEFRAMES[interval]['unit']
+    recent_days = TIMEFRAMES[interval]['recent_days']
     
     # 检查价格与EMA5/EMA10的交叉
-    for period in [5, 10]:
-        cross_signal, cross_date = detect_price_ema_cross(data, period)
+    price_crosses = detect_price_ema_crosses(data, [5, 10])
+    for period, (cross_signal, cross_date) in price_crosses.items():
         if cross_signal is not None and cross_date is not None:
             days_diff = (latest_date - cross_date).days
             
             alert_type = ""
             if cross_signal == "price_up_cross":
-                alert_type = f'价格上穿{period}日均线'
-                base_msg = f"价格上穿{period}日均线，发生于：{cross_date.strftime('%Y-%m-%d')}"
+                alert_type = f'价格上穿{period}{unit}均线'
+                base_msg = f"价格上穿{period}{unit}均线，发生于：{cross_date.strftime('%Y-%m-%d')}"
             else:  # price_down_cross
-                alert_type = f'价格下穿{period}日均线'
-                base_msg = f"价格下穿{period}日均线，发生于：{cross_date.strftime('%Y-%m-%d')}"
+                alert_type = f'价格下穿{period}{unit}均线'
+                base_msg = f"价格下穿{period}{unit}均线，发生于：{cross_date.strftime('%Y-%m-%d')}"
             
-            if use_colors and days_diff <= 10:
+            if use_colors and days_diff <= recent_days:
                 if cross_signal == "price_up_cross":
                     alerts.append({'type': alert_type, 'message': f"{Colors.GREEN}{base_msg}{Colors.END}"})
                 else:  # price_down_cross
@@ -1,5 +1,6 @@
 """技术分析模块"""
 
+import numpy as np
 import pandas as pd
 from .constants import Colors
 
@@ -41,6 +42,118 @@ def get_rsi_signal(data):
         print(f"{Colors.RED}Error getting RSI signal: {str(e)}{Colors.END}")
         return "N/A"
 
+def _column_values(data, column):
+    """获取单列数据的 float64 数组（兼容 yfinance 两级列名下返回 DataFrame 的情况）
+    Args:
+        data (pd.DataFrame): 股票数据
+        column (str): 列名
+    Returns:
+        np.ndarray: 一维数组
+    """
+    values = data[column].to_numpy(dtype=np.float64)
+    return values.reshape(len(values), -1)[:, 0]
+
+def detect_crosses(data, pairs, up_signal="golden_cross", down_signal="death_cross", history=False):
+    """向量化检测多组序列的交叉
+    
+    将所有 (快线, 慢线) 组合拼成二维数组，一次比较得到每一天快线与慢线的相对位置，
+    相对位置由下方变为上方即为上穿，由上方变为下方即为下穿。
+    判断条件与逐行比较完全一致：前一天 快线 < 慢线 且 当天 快线 > 慢线（反之亦然）。
+    
+    Args:
+        data (pd.DataFrame): 股票数据
+        pairs (list): (快线列名, 慢线列名) 组合列表
+        up_signal (str): 上穿信号名称
+        down_signal (str): 下穿信号名称
+        history (bool): 是否返回全部历史交叉
+    Returns:
+        dict: {(快线列名, 慢线列名): {'signal': 最近交叉信号, 'index': 行号, 'date': 日期,
+               'history': [(日期, 信号), ...]（仅当 history=True）}}，没有交叉时 signal/index/date 为 None
+    """
+    if len(data) < 2:
+        return {pair: {'signal': None, 'index': None, 'date': None, **({'history': []} if history else {})}
+                for pair in pairs}
+    
+    results = {}
+    if not pairs:
+        return results
+    
+    fast = np.column_stack([_column_values(data, fast_col) for fast_col, _ in pairs])
+    slow = np.column_stack([_column_values(data, slow_col) for _, slow_col in pairs])
+    below = fast < slow
+    above = fast > slow
+    
+    # 第 i 行的交叉由第 i-1 行和第 i 行比较得到
+    up = below[:-1] & above[1:]
+    down = above[:-1] & below[1:]
+    crossed = up | down
+    
+    # 每列最后一次交叉的位置
+    has_cross = crossed.any(axis=0)
+    last = len(crossed) - 1 - np.argmax(crossed[::-1], axis=0)
+    
+    for col, pair in enumerate(pairs):
+        result = {'signal': None, 'index': None, 'date': None}
+        if has_cross[col]:
+            index = int(last[col]) + 1
+            result['signal'] = up_signal if up[last[col], col] else down_signal
+            result['index'] = index
+            result['date'] = data.index[index]
+        if history:
+            positions = np.flatnonzero(crossed[:, col])
+            result['history'] = [
+                (data.index[pos + 1], up_signal if up[pos, col] else down_signal)
+                for pos in positions
+            ]
+        results[pair] = result
+    
+    return results
+
+def detect_ema_crosses(data, period_pairs, history=False):
+    """一次检测多组EMA交叉
+    Args:
+        data (pd.DataFrame): 股票数据
+        period_pairs (list): (短期EMA周期, 长期EMA周期) 组合列表
+        history (bool): 是否返回全部历史交叉
+    Returns:
+        dict: {(短期周期, 长期周期): (交叉信号类型, 交叉日期)}，没有交叉信号时为 (None, None)；
+              history=True 时值为 detect_crosses 返回的完整字典
+    """
+    valid = [(short, long) for short, long in period_pairs if len(data) >= max(short, long) + 1]
+    crosses = detect_crosses(data, [(f'EMA_{short}', f'EMA_{long}') for short, long in valid], history=history)
+    
+    results = {}
+    for short, long in period_pairs:
+        cross = crosses.get((f'EMA_{short}', f'EMA_{long}'))
+        if history:
+            results[(short, long)] = cross or {'signal': None, 'index': None, 'date': None, 'history': []}
+        else:
+            results[(short, long)] = (cross['signal'], cross['date']) if cross else (None, None)
+    return results
+
+def detect_price_ema_crosses(data, periods, history=False):
+    """一次检测价格与多条EMA的交叉
+    Args:
+        data (pd.DataFrame): 股票数据
+        periods (list): EMA周期列表
+        history (bool): 是否返回全部历史交叉
+    Returns:
+        dict: {周期: (交叉信号类型, 交叉日期)}，没有交叉信号时为 (None, None)；
+              history=True 时值为 detect_crosses 返回的完整字典
+    """
+    valid = [period for period in periods if len(data) >= period + 1]
+    crosses = detect_crosses(data, [('Close', f'EMA_{period}') for period in valid],
+                             up_signal="price_up_cross", down_signal="price_down_cross", history=history)
+    
+    results = {}
+    for period in periods:
+        cross = crosses.get(('Close', f'EMA_{period}'))
+        if history:
+            results[period] = cross or {'signal': None, 'index': None, 'date': None, 'history': []}
+        else:
+            results[period] = (cross['signal'], cross['date']) if cross else (None, None)
+    return results
+
 def detect_ema_cross(data, short_period=5, long_period=20):
     """检测EMA交叉
     Args:
@@ -50,35 +163,7 @@ def detect_ema_cross(data, short_period=5, long_period=20):
     Returns:
         tuple: (交叉信号类型, 交叉日期), 如果没有交叉信号则返回 (None, None)
     """
-    if len(data) < max(short_period, long_period) + 1:
-        return None, None
-        
-    short_ema = data[f'EMA_{short_period}']
-    long_ema = data[f'EMA_{long_period}']
-    
-    # 确保有足够的数据进行比较
-    if len(short_ema) < 2 or len(long_ema) < 2:
-        return None, None
-    
-    # 计算所有的交叉点
-    cross_dates = []
-    cross_types = []
-    
-    # 从最新的数据向前查找最近的交叉点
-    for i in range(len(data) - 1, 0, -1):
-        curr_short = short_ema.iloc[i].item()
-        curr_long = long_ema.iloc[i].item()
-        prev_short = short_ema.iloc[i-1].item()
-        prev_long = long_ema.iloc[i-1].item()
-        
-        # 检测金叉
-        if prev_short < prev_long and curr_short > curr_long:
-            return "golden_cross", data.index[i]
-        # 检测死叉
-        elif prev_short > prev_long and curr_short < curr_long:
-            return "death_cross", data.index[i]
-    
-    return None, None
+    return detect_ema_crosses(data, [(short_period, long_period)])[(short_period, long_period)]
 
 def detect_price_ema_cross(data, period=5):
     """检测价格与EMA交叉
@@ -88,31 +173,7 @@ def detect_price_ema_cross(data, period=5):
     Returns:
         tuple: (交叉信号类型, 交叉日期), 如果没有交叉信号则返回 (None, None)
     """
-    if len(data) < period + 1:
-        return None, None
-        
-    close_prices = data['Close']
-    ema = data[f'EMA_{period}']
-    
-    # 确保有足够的数据进行比较
-    if len(close_prices) < 2 or len(ema) < 2:
-        return None, None
-    
-    # 从最新的数据向前查找最近的交叉点
-    for i in range(len(data) - 1, 0, -1):
-        curr_price = close_prices.iloc[i].item()
-        curr_ema = ema.iloc[i].item()
-        prev_price = close_prices.iloc[i-1].item()
-        prev_ema = ema.iloc[i-1].item()
-        
-        # 检测价格上穿EMA
-        if prev_price < prev_ema and curr_price > curr_ema:
-            return "price_up_cross", data.index[i]
-        # 检测价格下穿EMA
-        elif prev_price > prev_ema and curr_price < curr_ema:
-            return "price_down_cross", data.index[i]
-    
-    return None, None
+    return detect_price_ema_crosses(data, [period])[period]
 
 def calculate_macd(data, fast_period=12, slow_period=26, signal_period=9):
     """计算MACD指标
@@ -299,16 +360,154 @@ def detect_bollinger_signals(data):
         print(f"{Colors.RED}Error detecting Bollinger signals: {str(e)}{Colors.END}")
         return signals
 
-def calculate_indicators(data):
+# 指标参数
+INDICATOR_EMA_PERIODS = [5, 10, 20, 50, 60, 120, 200]
+MACD_PERIODS = (12, 26, 9)   # 快线、慢线、信号线
+RSI_PERIOD = 14
+BOLLINGER_PERIOD = 20
+BOLLINGER_STD_DEV = 2
+
+# 指标计算路径：pandas（逐个指标调用 pandas）、fused（融合的 NumPy 计算）
+# 或 incremental（基于持久化状态的增量计算，见 indicator_state 模块）
+INDICATOR_ENGINES = ('pandas', 'fused', 'incremental')
+
+# 分块EMA的块大小
+_EWM_BLOCK_SIZE = 64
+
+def ewm_block_scan(values, spans):
+    """同时计算多个周期的EMA（与 pandas ewm(span, adjust=False) 一致）
+    
+    递推式 y[i] = (1-a)·y[i-1] + a·x[i] 按块展开：块内部分是一个下三角权重矩阵与输入的乘积，
+    所有周期、所有块一次矩阵乘法完成；块之间只需把上一块的最后一个值按 (1-a)^(k+1) 衰减后加上。
+    
+    Args:
+        values (np.ndarray): 一维 float64 数组（不含 NaN）
+        spans (list): EMA周期列表
+    Returns:
+        np.ndarray: 形状为 (len(spans), len(values)) 的EMA数组
+    """
+    n = len(values)
+    alphas = 2.0 / (np.asarray(spans, dtype=np.float64) + 1.0)
+    decay = 1.0 - alphas
+    block = min(_EWM_BLOCK_SIZE, n)
+    n_blocks = -(-n // block)
+    
+    padded = np.zeros(n_blocks * block)
+    padded[:n] = values
+    blocks = padded.reshape(n_blocks, block)
+    
+    # kernel[s, c, b] = a·(1-a)^(c-b)，b <= c
+    lag = np.arange(block)[:, None] - np.arange(block)[None, :]
+    kernel = np.where(lag >= 0, alphas[:, None, None] * decay[:, None, None] ** np.maximum(lag, 0), 0.0)
+    local = np.matmul(kernel, blocks.T)                            # (周期, 块内位置, 块)
+    carry = decay[:, None] ** (np.arange(block) + 1)               # 上一块末值的权重
+    
+    # adjust=False 时 y[0] = x[0]，相当于在序列之前有一个值为 x[0] 的初始状态
+    result = np.empty((len(spans), n_blocks, block))
+    previous = np.full(len(spans), values[0])
+    for k in range(n_blocks):
+        result[:, k, :] = local[:, :, k] + carry * previous[:, None]
+        previous = result[:, k, -1]
+    result[:, 0, 0] = values[0]
+    return result.reshape(len(spans), -1)[:, :n]
+
+def _rolling_windows(values, window):
+    """返回长度为 window 的滑动窗口视图，数据不足时返回None"""
+    if len(values) < window:
+        return None
+    return np.lib.stride_tricks.sliding_window_view(values, window)
+
+def calculate_indicators_fused(data):
+    """融合计算所有技术指标
+    
+    在连续的 float64 收盘价数组上计算：所有EMA（包括MACD的12/26日EMA）一次分块扫描完成，
+    MACD信号线第二次扫描，RSI和布林带使用滑动窗口视图；结果一次性批量添加到数据中。
+    收盘价包含缺失值时回退到 pandas 计算路径。
+    
+    Args:
+        data (pd.DataFrame): 股票数据
+    Returns:
+        pd.DataFrame: 添加了技术指标的股票数据
+    """
+    try:
+        close = _column_values(data, 'Close')
+        if len(close) < 2 or np.isnan(close).any():
+            return calculate_indicators(data, engine='pandas')
+        n = len(close)
+        
+        # 第一遍：所有EMA
+        fast_period, slow_period, signal_period = MACD_PERIODS
+        spans = INDICATOR_EMA_PERIODS + [fast_period, slow_period]
+        emas = ewm_block_scan(close, spans)
+        
+        # 第二遍：MACD信号线
+        macd_line = emas[-2] - emas[-1]
+        signal_line = ewm_block_scan(macd_line, [signal_period])[0]
+        
+        # RSI（与 pandas 路径一致：第一天的涨跌幅按 0 计入窗口）
+        delta = np.empty(n)
+        delta[0] = 0.0
+        np.subtract(close[1:], close[:-1], out=delta[1:])
+        rsi = np.full(n, np.nan)
+        gain_windows = _rolling_windows(np.where(delta > 0, delta, 0.0), RSI_PERIOD)
+        loss_windows = _rolling_windows(np.where(delta < 0, -delta, 0.0), RSI_PERIOD)
+        if gain_windows is not None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = gain_windows.mean(axis=1) / loss_windows.mean(axis=1)
+                rsi[RSI_PERIOD - 1:] = 100 - (100 / (1 + rs))
+        
+        # 布林带
+        middle = np.full(n, np.nan)
+        std = np.full(n, np.nan)
+        close_windows = _rolling_windows(close, BOLLINGER_PERIOD)
+        if close_windows is not None:
+            middle[BOLLINGER_PERIOD - 1:] = close_windows.mean(axis=1)
+            std[BOLLINGER_PERIOD - 1:] = close_windows.std(axis=1, ddof=1)
+        upper = middle + std * BOLLINGER_STD_DEV
+        lower = middle - std * BOLLINGER_STD_DEV
+        with np.errstate(divide='ignore', invalid='ignore'):
+            width = (upper - lower) / middle
+            percent = (close - lower) / (upper - lower)
+        
+        columns = {f'EMA_{period}': emas[i] for i, period in enumerate(INDICATOR_EMA_PERIODS)}
+        columns.update({
+            'RSI': rsi,
+            'MACD_line': macd_line,
+            'MACD_signal': signal_line,
+            'MACD_hist': macd_line - signal_line,
+            'BB_upper': upper,
+            'BB_middle': middle,
+            'BB_lower': lower,
+            'BB_width': width,
+            'BB_percent': percent,
+        })
+        
+        # 一次性批量添加所有指标列（逐列 assign 在两级列名下会逐列复制数据）
+        indicators = pd.DataFrame(columns, index=data.index)
+        if isinstance(data.columns, pd.MultiIndex):
+            indicators.columns = pd.MultiIndex.from_tuples(
+                [(name,) + ('',) * (data.columns.nlevels - 1) for name in indicators.columns],
+                names=data.columns.names
+            )
+        return pd.concat([data.drop(columns=list(columns), errors='ignore'), indicators], axis=1)
+    except Exception as e:
+        print(f"{Colors.RED}Error calculating fused indicators: {str(e)}{Colors.END}")
+        return calculate_indicators(data, engine='pandas')
+
+def calculate_indicators(data, engine='pandas'):
     """计算技术指标
     Args:
         data (pd.DataFrame): 股票数据
+        engine (str): 计算路径，'pandas' 或 'fused'（见 calculate_indicators_fused）
     Returns:
         pd.DataFrame: 添加了技术指标的股票数据
     """
+    if engine == 'fused':
+        return calculate_indicators_fused(data)
+    
     try:
         # 计算各种EMA
-        for period in [5, 10, 20, 50, 60, 120, 200]:
+        for period in INDICATOR_EMA_PERIODS:
             data[f'EMA_{period}'] = data['Close'].ewm(span=period, adjust=False).mean()
         
         # 计算RSI
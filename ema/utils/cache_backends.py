@@ -0,0 +1,163 @@
+"""
+缓存存储后端模块
+提供 Pickle、Feather (Arrow IPC) 和 Parquet 三种行情数据存储格式
+
+列式格式按列存储，读取时可以只选择需要的列（例如只读取 Close），
+Feather 不压缩存储，读取时通过内存映射按需加载，降低同时打开多个股票时的内存占用。
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 写入 Arrow schema 元数据的键，用于还原 yfinance 的 (Price, Ticker) 两级列名
+TICKER_META_KEY = b'stock_analysis.ticker'
+INDEX_META_KEY = b'stock_analysis.index'
+
+def select_columns(data: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """按价格列名（两级列名的第一级）选择列，None 表示全部"""
+    if columns is None:
+        return data
+    return data.loc[:, data.columns.get_level_values(0).isin(columns)]
+
+class CacheBackend:
+    """缓存后端基类"""
+    name = ''
+    extension = ''
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        """写入数据"""
+        raise NotImplementedError
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取数据
+        Args:
+            path: 文件路径
+            columns: 需要读取的价格列（如 ['Close']），None 表示全部
+        """
+        raise NotImplementedError
+
+class PickleBackend(CacheBackend):
+    """Pickle 后端（无额外依赖，读取时加载整个文件）"""
+    name = 'pickle'
+    extension = '.pkl'
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        data.to_pickle(path)
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return select_columns(pd.read_pickle(path), columns)
+
+class ArrowBackend(CacheBackend):
+    """基于 pyarrow 的列式存储后端基类"""
+
+    def _to_table(self, data: pd.DataFrame):
+        """将 DataFrame 转换为 Arrow 表，两级列名压平为价格列名，股票代码写入元数据"""
+        import pyarrow as pa
+
+        metadata = {INDEX_META_KEY: str(data.index.name or 'Date').encode()}
+        flat = data.copy(deep=False)
+        if isinstance(flat.columns, pd.MultiIndex):
+            metadata[TICKER_META_KEY] = str(flat.columns.get_level_values(1)[0]).encode()
+            flat.columns = flat.columns.get_level_values(0)
+        flat.index.name = metadata[INDEX_META_KEY].decode()
+        table = pa.Table.from_pandas(flat.reset_index(), preserve_index=False)
+        return table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+    def _from_table(self, table) -> pd.DataFrame:
+        """将 Arrow 表还原为与 yfinance 下载结果相同结构的 DataFrame"""
+        metadata = table.schema.metadata or {}
+        index_name = metadata.get(INDEX_META_KEY, b'Date').decode()
+        data = table.to_pandas().set_index(index_name)
+        if TICKER_META_KEY in metadata:
+            ticker = metadata[TICKER_META_KEY].decode()
+            data.columns = pd.MultiIndex.from_tuples(
+                [(column, ticker) for column in data.columns], names=['Price', 'Ticker']
+            )
+        return data
+
+    @staticmethod
+    def _select(schema_names: List[str], index_name: str, columns: Optional[List[str]]) -> Optional[List[str]]:
+        """计算需要读取的物理列（始终包含日期索引列）"""
+        if columns is None:
+            return None
+        return [index_name] + [name for name in schema_names if name in columns]
+
+class FeatherBackend(ArrowBackend):
+    """Feather (Arrow IPC) 后端，不压缩存储以支持内存映射读取"""
+    name = 'feather'
+    extension = '.feather'
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        from pyarrow import feather
+        feather.write_feather(self._to_table(data), path, compression='uncompressed')
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        import pyarrow as pa
+        from pyarrow import feather
+
+        with pa.memory_map(path, 'r') as source:
+            schema = pa.ipc.open_file(source).schema
+        index_name = (schema.metadata or {}).get(INDEX_META_KEY, b'Date').decode()
+        table = feather.read_table(path, columns=self._select(schema.names, index_name, columns), memory_map=True)
+        # read_table 选择列后会丢失自定义元数据，这里重新附加
+        return self._from_table(table.replace_schema_metadata(schema.metadata))
+
+class ParquetBackend(ArrowBackend):
+    """Parquet 后端，压缩存储，文件最小"""
+    name = 'parquet'
+    extension = '.parquet'
+
+    def write(self, data: pd.DataFrame, path: str) -> None:
+        import pyarrow.parquet as pq
+        pq.write_table(self._to_table(data), path)
+
+    def read(self, path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        import pyarrow.parquet as pq
+
+        schema = pq.read_schema(path, memory_map=True)
+        index_name = (schema.metadata or {}).get(INDEX_META_KEY, b'Date').decode()
+        table = pq.read_table(path, columns=self._select(schema.names, index_name, columns), memory_map=True)
+        return self._from_table(table.replace_schema_metadata(schema.metadata))
+
+BACKENDS = {backend.name: backend for backend in (PickleBackend, FeatherBackend, ParquetBackend)}
+
+def get_backend(name: str = 'feather') -> CacheBackend:
+    """
+    根据名称获取缓存后端
+    列式后端依赖 pyarrow，未安装时回退到 Pickle 后端
+    Args:
+        name: 后端名称，pickle / feather / parquet
+    Returns:
+        缓存后端实例
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown cache backend: {name} (available: {', '.join(BACKENDS)})")
+    if name != PickleBackend.name:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logger.warning(f"pyarrow is not installed, falling back to pickle cache backend")
+            name = PickleBackend.name
+    return BACKENDS[name]()
+
+def find_cache_file(base_path: str) -> Optional[str]:
+    """查找任意后端格式保存的缓存文件（base_path 不含扩展名）"""
+    for backend in BACKENDS.values():
+        path = base_path + backend.extension
+        if os.path.exists(path):
+            return path
+    return None
+
+def backend_for_path(path: str) -> CacheBackend:
+    """根据文件扩展名获取对应的缓存后端"""
+    extension = os.path.splitext(path)[1]
+    for backend in BACKENDS.values():
+        if backend.extension == extension:
+            return backend()
+    raise ValueError(f"Unknown cache file format: {path}")
@@ -13,3 +13,11 @@ class Colors:
 
 # EMA periods for analysis
 EMA_PERIODS = [5, 50, 200]  # 短期、中期、长期趋势
+
+# 多周期分析：由日线重采样得到的周期
+# rule 为 pandas 的周期频率，recent_days 为警报中视为“最近”的交叉（约 10 根K线）
+TIMEFRAMES = {
+    '1d': {'name': '日线', 'unit': '日', 'rule': None, 'recent_days': 10},
+    '1wk': {'name': '周线', 'unit': '周', 'rule': 'W-FRI', 'recent_days': 70},
+    '1mo': {'name': '月线', 'unit': '月', 'rule': 'M', 'recent_days': 300},
+}
@@ -1,47 +1,229 @@
 """
 股票数据获取模块
 包含数据下载和缓存功能，以避免API限流
+
+缓存按股票代码和时间间隔各保存一份（例如 GOOGL_1d.feather），并在同名的 .json
+文件中记录已覆盖的日期范围 [start, end)。任意子区间都直接从本地缓存读取，
+只有缺失的头部或尾部才会从网络下载并合并到缓存中。
+存储格式由可插拔的缓存后端决定，见 cache_backends 模块。
 """
 
 import yfinance as yf
 import pandas as pd
 import os
+import re
+import glob
+import json
 from datetime import datetime
 import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from .cache_backends import BACKENDS, backend_for_path, find_cache_file, get_backend, select_columns
+
 logger = logging.getLogger(__name__)
 
+# 旧版缓存文件名：{symbol}_{start}_{end}.pkl
+LEGACY_CACHE_PATTERN = re.compile(r'^(?P<symbol>.+)_(?P<start>\d{4}-\d{2}-\d{2})_(?P<end>\d{4}-\d{2}-\d{2})\.pkl$')
+
+Coverage = Tuple[pd.Timestamp, pd.Timestamp]
+
+# 覆盖范围内第一根K线之前至少有这么多个工作日没有K线，才认为股票在此之前尚未上市（节假日最多连续几天）
+LISTING_GAP_DAYS = 5
+
+# ema 工具的默认缓存目录，setup、pl 工具默认与其共用
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data_cache')
+
 class DataFetcher:
-    def __init__(self, cache_dir: str = 'data_cache'):
+    def __init__(self, cache_dir: str = 'data_cache', backend: str = 'feather'):
         """
         初始化数据获取器
         Args:
             cache_dir: 缓存目录路径
+            backend: 缓存存储格式，pickle / feather / parquet
         """
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
+        self.backend = get_backend(backend)
         self.retry_count = 3
         self.retry_delay = 5  # 初始重试延迟（秒）
         self.max_delay = 60   # 最大延迟（秒）
 
-    def _get_cache_filename(self, symbol: str, start_date: str, end_date: str) -> str:
-        """生成缓存文件名"""
+    def _get_cache_filename(self, symbol: str, interval: str = '1d') -> str:
+        """生成缓存文件名（每个股票、每个时间间隔一个文件）"""
         return os.path.join(
             self.cache_dir,
-            f"{symbol}_{start_date}_{end_date}.pkl"
+            f"{symbol}_{interval}{self.backend.extension}"
         )
 
-    def _is_cache_valid(self, filename: str, max_age_days: int = 7) -> bool:
-        """检查缓存是否有效"""
-        if not os.path.exists(filename):
+    def _get_meta_filename(self, symbol: str, interval: str = '1d') -> str:
+        """生成缓存覆盖范围记录的文件名"""
+        return os.path.join(
+            self.cache_dir,
+            f"{symbol}_{interval}.json"
+        )
+
+    def _load_legacy_cache(self, symbol: str) -> Tuple[Optional[pd.DataFrame], Optional[Coverage]]:
+        """
+        合并旧版按日期窗口保存的缓存文件
+        只保留与最新窗口首尾相连的部分，保证覆盖范围连续
+        """
+        windows = []
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), f"{glob.escape(symbol)}_*.pkl")):
+            match = LEGACY_CACHE_PATTERN.match(os.path.basename(path))
+            if match and match.group('symbol') == symbol:
+                windows.append((pd.Timestamp(match.group('start')), pd.Timestamp(match.group('end')), path))
+        if not windows:
+            return None, None
+
+        # 从结束日期最晚的窗口开始，向前合并相互重叠的窗口
+        windows.sort(key=lambda window: window[1], reverse=True)
+        cov_start, cov_end, path = windows[0]
+        frames = [pd.read_pickle(path)]
+        for start, end, path in sorted(windows[1:], key=lambda window: window[0], reverse=True):
+            if start < cov_start <= end:
+                frames.append(pd.read_pickle(path))
+                cov_start = start
+
+        logger.info(f"Imported {len(frames)} legacy cache files for {symbol}")
+        return self._merge(frames), (cov_start, cov_end)
+
+    def _load_coverage(self, symbol: str, interval: str) -> Optional[Coverage]:
+        """读取缓存的覆盖范围，没有缓存时返回None"""
+        meta_file = self._get_meta_filename(symbol, interval)
+        if not os.path.exists(meta_file):
+            return None
+        if find_cache_file(os.path.join(self.cache_dir, f"{symbol}_{interval}")) is None:
+            return None
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def _read_cache(self, symbol: str, interval: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        读取缓存数据
+        如果缓存以其他后端的格式保存，则读取后转换为当前后端的格式
+        """
+        cache_file = self._get_cache_filename(symbol, interval)
+        if os.path.exists(cache_file):
+            return self.backend.read(cache_file, columns)
+
+        path = find_cache_file(os.path.join(self.cache_dir, f"{symbol}_{interval}"))
+        data = backend_for_path(path).read(path)
+        self.backend.write(data, cache_file)
+        logger.info(f"Converted cache for {symbol} to {self.backend.name}")
+        return select_columns(data, columns)
+
+    def _load_cache(self, symbol: str, interval: str) -> Tuple[Optional[pd.DataFrame], Optional[Coverage]]:
+        """读取缓存数据及其覆盖范围"""
+        coverage = self._load_coverage(symbol, interval)
+        if coverage is not None:
+            return self._read_cache(symbol, interval), coverage
+        if interval == '1d':
+            data, coverage = self._load_legacy_cache(symbol)
+            if data is not None:
+                self._save_cache(symbol, interval, data, coverage)
+            return data, coverage
+        return None, None
+
+    def _save_cache(self, symbol: str, interval: str, data: pd.DataFrame, coverage: Coverage) -> None:
+        """保存缓存数据及其覆盖范围"""
+        self.backend.write(data, self._get_cache_filename(symbol, interval))
+        with open(self._get_meta_filename(symbol, interval), 'w', encoding='utf-8') as f:
+            json.dump({
+                'start': coverage[0].isoformat(),
+                'end': coverage[1].isoformat(),
+                'updated': datetime.now().isoformat(timespec='seconds')
+            }, f)
+
+    @staticmethod
+    def _missing_ranges(coverage: Optional[Coverage], start: pd.Timestamp, end: pd.Timestamp) -> List[Coverage]:
+        """
+        计算请求区间中缓存未覆盖的部分（头部和/或尾部）
+        不包含任何工作日的区间（如周末）不可能有新数据，直接视为已覆盖
+        """
+        if coverage is None:
+            return [(start, end)]
+        cov_start, cov_end = coverage
+        ranges = []
+        if start < cov_start:
+            ranges.append((start, cov_start))
+        if end > cov_end:
+            ranges.append((cov_end, end))
+        return [(s, e) for s, e in ranges if len(pd.bdate_range(s, e - pd.Timedelta(days=1))) > 0]
+
+    @staticmethod
+    def _extend_coverage(coverage: Optional[Coverage], start: pd.Timestamp, end: pd.Timestamp) -> Coverage:
+        """将已下载的区间并入覆盖范围"""
+        if coverage is None:
+            return start, end
+        return min(coverage[0], start), max(coverage[1], end)
+
+    @staticmethod
+    def _merge(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        """合并多段数据，重复的日期保留最新下载的数据"""
+        data = pd.concat(frames)
+        data = data[~data.index.duplicated(keep='last')]
+        return data.sort_index()
+
+    @staticmethod
+    def _slice(data: Optional[pd.DataFrame], start: pd.Timestamp, end: pd.Timestamp) -> Optional[pd.DataFrame]:
+        """截取 [start, end) 区间的数据，为空时返回None"""
+        if data is None:
+            return None
+        if getattr(data.index, 'tz', None) is not None:
+            start, end = start.tz_localize(data.index.tz), end.tz_localize(data.index.tz)
+        data = data[(data.index >= start) & (data.index < end)]
+        return data if not data.empty else None
+
+    @staticmethod
+    def _before_listing(data: Optional[pd.DataFrame], coverage: Optional[Coverage], end: pd.Timestamp) -> bool:
+        """
+        区间 [start, end) 是否在股票有K线之前（如上市之前），这样的区间下载不到K线是正常的，可以计入覆盖范围
+        只有缓存的覆盖范围内、第一根K线之前已有 LISTING_GAP_DAYS 个以上工作日没有K线时才能确定，
+        否则空数据无法与 yfinance 的网络错误（不抛出异常、返回空数据）区分
+        """
+        if data is None or data.empty or coverage is None:
             return False
-            
-        file_age = (datetime.now() - datetime.fromtimestamp(os.path.getmtime(filename))).days
-        return file_age <= max_age_days
+        first = data.index[0]
+        if first.tzinfo is not None:
+            first = first.tz_localize(None)
+        first = first.normalize()
+        return end <= first and len(pd.bdate_range(coverage[0], first - pd.Timedelta(days=1))) >= LISTING_GAP_DAYS
+
+    def _download(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, interval: str,
+                  allow_empty: bool = False) -> Optional[pd.DataFrame]:
+        """
+        带重试的单个股票下载
+        yfinance 在网络错误、限流时不抛出异常而是返回空数据，因此没有K线（或全为缺失值）也视为失败并重试
+        Args:
+            allow_empty: 该区间可以确定没有K线（见 _before_listing）时为True，空数据视为成功
+        Returns:
+            下载的数据（仅在 allow_empty 时可能为空），所有重试均失败时返回None
+        """
+        for attempt in range(self.retry_count):
+            try:
+                logger.info(f"Fetching data for {symbol} {start.date()} ~ {end.date()} (attempt {attempt + 1}/{self.retry_count})")
+                data = yf.download(symbol, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'), interval=interval)
+                data = data.dropna(how='all') if data is not None else pd.DataFrame()
+                if data.empty and not allow_empty:
+                    raise ValueError("no data received")
+                return data
+
+            except Exception as e:
+                if attempt == self.retry_count - 1:  # 最后一次尝试失败
+                    logger.error(f"Failed to fetch data for {symbol}: {str(e)}")
+                    return None
+
+                # 计算指数退避延迟
+                delay = min(self.retry_delay * (2 ** attempt), self.max_delay)
+                logger.warning(f"Retrying in {delay} seconds... ({str(e)})")
+                time.sleep(delay)
+
+        return None
 
-    def fetch_data(self, symbol: str, start_date: str, end_date: str, interval: str = '1d') -> Optional[pd.DataFrame]:
+    def fetch_data(self, symbol: str, start_date: str, end_date: str, interval: str = '1d',
+                   columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
         """
         获取股票数据
         Args:
@@ -49,38 +231,211 @@ class DataFetcher:
             start_date: 开始日期
             end_date: 结束日期
             interval: 时间间隔
+            columns: 只返回指定的价格列（如 ['Close']），None 表示全部
         Returns:
             股票数据DataFrame，如果失败返回None
         """
-        cache_file = self._get_cache_filename(symbol, start_date, end_date)
-        
-        # 尝试使用缓存
-        if self._is_cache_valid(cache_file):
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+
+        # 尝试使用缓存（列式后端只读取需要的列）
+        if not self._missing_ranges(self._load_coverage(symbol, interval), start, end):
+            logger.info(f"Using cached data for {symbol}")
+            return self._slice(self._read_cache(symbol, interval, columns), start, end)
+
+        cached, coverage = self._load_cache(symbol, interval)
+        missing = self._missing_ranges(coverage, start, end)
+        if not missing:
             logger.info(f"Using cached data for {symbol}")
-            return pd.read_pickle(cache_file)
+            return self._slice(select_columns(cached, columns), start, end)
+
+        frames = [] if cached is None else [cached]
+        updated = False
+        for seg_start, seg_end in missing:
+            data = self._download(symbol, seg_start, seg_end, interval,
+                                  allow_empty=self._before_listing(cached, coverage, seg_end))
+            if data is None:
+                # 下载失败时不扩展覆盖范围，下次运行重新下载该区间
+                continue
+            # 上市之前的区间没有K线也计入覆盖范围，避免每次重新下载
+            if data.empty:
+                logger.info(f"No data for {symbol} before {seg_end.date()}")
+            else:
+                frames.append(data)
+            coverage = self._extend_coverage(coverage, seg_start, seg_end)
+            updated = True
+
+        if not frames:
+            return None
+        data = self._merge(frames)
+        if updated:
+            # 保存到缓存
+            self._save_cache(symbol, interval, data, coverage)
+        return self._slice(select_columns(data, columns), start, end)
+
+    def _split_symbol(self, data: Optional[pd.DataFrame], symbol: str) -> Optional[pd.DataFrame]:
+        """
+        从批量下载结果中拆分出单个股票的数据，保持与单独下载相同的列结构
+        Returns:
+            股票数据（全为缺失值时为空DataFrame），下载失败或结果中没有该股票时返回None
+        """
+        if data is None:
+            return None
+        if not isinstance(data.columns, pd.MultiIndex):
+            return data.dropna(how='all') if len(data.columns) else None
+        if symbol not in data.columns.get_level_values(1):
+            return None
+        return data.xs(symbol, axis=1, level=1, drop_level=False).dropna(how='all')
 
-        # 重试逻辑
+    def _download_many(self, symbols: List[str], start: pd.Timestamp, end: pd.Timestamp, interval: str,
+                       allow_empty: Tuple[str, ...] = ()) -> Dict[str, pd.DataFrame]:
+        """
+        批量下载同一区间的多个股票，重试时只针对失败的股票
+        yfinance 批量下载时，出错（网络错误、限流等）的股票返回全为缺失值的列而不抛出异常，
+        因此结果中缺少某个股票或其数据全为缺失值都视为失败
+        Args:
+            allow_empty: 可以确定该区间没有K线的股票（见 _before_listing），空数据视为成功
+        Returns:
+            成功下载的股票代码到数据（仅 allow_empty 中的股票可能为空）的字典
+        """
+        results = {}
+        pending = list(symbols)
         for attempt in range(self.retry_count):
+            if not pending:
+                break
+
+            logger.info(f"Fetching data for {len(pending)} symbols {start.date()} ~ {end.date()} (attempt {attempt + 1}/{self.retry_count})")
             try:
-                logger.info(f"Fetching data for {symbol} (attempt {attempt + 1}/{self.retry_count})")
-                data = yf.download(symbol, start=start_date, end=end_date, interval=interval)
-                
-                if not data.empty:
-                    # 保存到缓存
-                    data.to_pickle(cache_file)
-                    return data
-                
-                logger.warning(f"No data received for {symbol}")
-                return None
-                
+                data = yf.download(pending, start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'),
+                                   interval=interval, group_by='column', progress=False)
             except Exception as e:
-                if attempt == self.retry_count - 1:  # 最后一次尝试失败
-                    logger.error(f"Failed to fetch data for {symbol}: {str(e)}")
-                    return None
-                    
+                logger.warning(f"Batch download failed: {str(e)}")
+                data = None
+
+            failed = []
+            for symbol in pending:
+                frame = self._split_symbol(data, symbol)
+                if frame is None or (frame.empty and symbol not in allow_empty):
+                    failed.append(symbol)
+                else:
+                    results[symbol] = frame
+            pending = failed
+
+            if pending and attempt < self.retry_count - 1:
                 # 计算指数退避延迟
                 delay = min(self.retry_delay * (2 ** attempt), self.max_delay)
-                logger.warning(f"Retrying in {delay} seconds... ({str(e)})")
+                logger.warning(f"Retrying {len(pending)} failed symbols in {delay} seconds... ({', '.join(pending)})")
                 time.sleep(delay)
 
-        return None
+        for symbol in pending:
+            logger.error(f"Failed to fetch data for {symbol} {start.date()} ~ {end.date()}")
+        return results
+
+    def fetch_many(self, symbols: List[str], start_date: str, end_date: str, interval: str = '1d',
+                   columns: Optional[List[str]] = None) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        批量获取多个股票数据
+        先从缓存读取，缺失的区间按相同的起止日期分组，每组通过一次批量下载获取，
+        重试时只针对失败的股票。
+        Args:
+            symbols: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期
+            interval: 时间间隔
+            columns: 只返回指定的价格列（如 ['Close']），None 表示全部
+        Returns:
+            股票代码到数据DataFrame的字典，失败的股票对应None
+        """
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        cached = {}
+        groups = {}
+
+        # 尝试使用缓存，并按缺失区间分组
+        for symbol in dict.fromkeys(symbols):
+            coverage = self._load_coverage(symbol, interval)
+            if not self._missing_ranges(coverage, start, end):
+                cached[symbol] = (self._read_cache(symbol, interval, columns), coverage)
+            else:
+                cached[symbol] = self._load_cache(symbol, interval)
+            missing = self._missing_ranges(cached[symbol][1], start, end)
+            if not missing:
+                logger.info(f"Using cached data for {symbol}")
+            for segment in missing:
+                groups.setdefault(segment, []).append(symbol)
+
+        downloaded = {}
+        for (seg_start, seg_end), group in groups.items():
+            allow_empty = tuple(symbol for symbol in group if self._before_listing(*cached[symbol], seg_end))
+            # 下载失败的股票不在结果中，其覆盖范围保持不变，下次运行重新下载
+            for symbol, frame in self._download_many(group, seg_start, seg_end, interval, allow_empty).items():
+                if frame.empty:
+                    logger.info(f"No data for {symbol} before {seg_end.date()}")
+                downloaded.setdefault(symbol, []).append((seg_start, seg_end, frame))
+
+        results = {}
+        for symbol, (data, coverage) in cached.items():
+            if symbol in downloaded:
+                frames = [] if data is None else [data]
+                for seg_start, seg_end, frame in downloaded[symbol]:
+                    # 上市之前没有K线的区间同样计入覆盖范围
+                    if not frame.empty:
+                        frames.append(frame)
+                    coverage = self._extend_coverage(coverage, seg_start, seg_end)
+                if frames:
+                    data = self._merge(frames)
+                    # 保存到缓存
+                    self._save_cache(symbol, interval, data, coverage)
+            results[symbol] = self._slice(None if data is None else select_columns(data, columns), start, end)
+
+        return {symbol: results[symbol] for symbol in symbols}
+
+    def migrate_cache(self, remove_old: bool = False) -> int:
+        """
+        将缓存目录中的旧缓存一次性转换为当前后端的格式
+        包括旧版按日期窗口命名的 pickle 文件，以及其他格式保存的缓存
+        Args:
+            remove_old: 转换成功后是否删除旧文件
+        Returns:
+            转换的股票数量
+        """
+        old_files = {}
+        for path in glob.glob(os.path.join(glob.escape(self.cache_dir), '*')):
+            name = os.path.basename(path)
+            legacy = LEGACY_CACHE_PATTERN.match(name)
+            stem, extension = os.path.splitext(name)
+            if legacy:
+                key = (legacy.group('symbol'), '1d')
+            elif extension != self.backend.extension and '_' in stem and \
+                    extension in {backend.extension for backend in BACKENDS.values()}:
+                key = tuple(stem.rsplit('_', 1))
+            else:
+                continue
+            old_files.setdefault(key, []).append(path)
+
+        converted = 0
+        for (symbol, interval), paths in sorted(old_files.items()):
+            # 读取缓存时会自动导入旧版窗口文件，或将其他格式转换为当前格式
+            data, _ = self._load_cache(symbol, interval)
+            if data is None:
+                continue
+            converted += 1
+            if remove_old:
+                for path in paths:
+                    os.remove(path)
+
+        logger.info(f"Migrated {converted} cached symbols to {self.backend.name}")
+        return converted
+
+def create_fetcher(cache_dir: Optional[str] = None, backend: str = 'feather', base_dir: Optional[str] = None) -> DataFetcher:
+    """
+    创建数据获取器（setup、pl 工具共用，与 ema 工具共享同一份缓存）
+    Args:
+        cache_dir: 缓存目录，None 表示 DEFAULT_CACHE_DIR
+        backend: 缓存存储格式，pickle / feather / parquet
+        base_dir: 相对路径的基准目录，None 表示当前目录
+    Returns:
+        DataFetcher: 数据获取器
+    """
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    if base_dir is not None:
+        cache_dir = os.path.normpath(os.path.join(base_dir, cache_dir))
+    return DataFetcher(cache_dir=cache_dir, backend=backend)
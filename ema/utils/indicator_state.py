@@ -0,0 +1,402 @@
+"""
+增量指标计算模块
+
+IndicatorState 保存计算技术指标所需的全部中间状态（各条EMA的最新值、RSI的涨跌窗口、
+MACD信号线状态、布林带的滚动和与平方偏差和），每根新K线只需 O(1) 的更新。
+状态可以持久化到缓存目录中，每日运行时只需计算新增的 k 根K线。
+
+各个滚动统计量逐步复现 pandas ewm / rolling 的在线算法（包括 Kahan 补偿求和），
+因此增量计算的结果与对同一段数据调用 calculate_indicators(engine='pandas')
+的全量计算逐位一致。
+"""
+
+import json
+import math
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .analysis import (BOLLINGER_PERIOD, BOLLINGER_STD_DEV, INDICATOR_EMA_PERIODS, MACD_PERIODS,
+                       RSI_PERIOD, _column_values)
+from .cache_backends import get_backend
+from .constants import Colors
+
+# 状态格式版本，算法变化时递增以使旧状态失效
+STATE_VERSION = 1
+
+INDICATOR_COLUMNS = [f'EMA_{period}' for period in INDICATOR_EMA_PERIODS] + [
+    'RSI', 'MACD_line', 'MACD_signal', 'MACD_hist',
+    'BB_upper', 'BB_middle', 'BB_lower', 'BB_width', 'BB_percent'
+]
+
+class EwmMean:
+    """指数移动平均（与 pandas ewm(span, adjust=False).mean() 一致）"""
+
+    def __init__(self, span, value=None):
+        com = (span - 1) / 2.0
+        self.span = span
+        self.alpha = 1.0 / (1.0 + com)
+        self.value = value
+
+    def update(self, x):
+        """加入一个新值并返回最新的EMA"""
+        if self.value is None or self.value != self.value:
+            self.value = x
+        elif x == x and self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+    def to_dict(self):
+        return {'span': self.span, 'value': self.value}
+
+    @classmethod
+    def from_dict(cls, state):
+        return cls(state['span'], state['value'])
+
+class RollingMean:
+    """固定窗口滚动平均（与 pandas rolling(window).mean() 的在线算法一致）"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if val < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if val < 0:
+                self.neg_ct -= 1
+
+    def update(self, x):
+        """加入一个新值并返回窗口平均值（数据不足时为 NaN）"""
+        if self.prev_value is None:
+            self.prev_value = x
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state['values'] = list(self.values)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['window'])
+        rolling.__dict__.update(state)
+        rolling.values = deque(state['values'])
+        return rolling
+
+class RollingVariance:
+    """固定窗口滚动方差（与 pandas rolling(window).var() 的在线算法一致）"""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val == val:
+            if val == self.prev_value:
+                self.num_consecutive_same_value += 1
+            else:
+                self.num_consecutive_same_value = 1
+            self.prev_value = val
+            self.nobs += 1
+            prev_mean = self.mean_x - self.compensation_add
+            y = val - self.compensation_add
+            t = y - self.mean_x
+            self.compensation_add = t + self.mean_x - y
+            self.mean_x += t / self.nobs
+            self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val == val:
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean_x - self.compensation_remove
+                y = val - self.compensation_remove
+                t = y - self.mean_x
+                self.compensation_remove = t + self.mean_x - y
+                self.mean_x -= t / self.nobs
+                self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+            else:
+                self.mean_x = 0.0
+                self.ssqdm_x = 0.0
+
+    def update(self, x):
+        """加入一个新值并返回窗口方差（数据不足时为 NaN）"""
+        if self.prev_value is None:
+            self.prev_value = x
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+        if self.num_consecutive_same_value >= self.nobs:
+            # 窗口内全部为相同值时重置累计量，消除浮点残差
+            self.mean_x = x
+            self.ssqdm_x = 0.0
+            self.compensation_add = 0.0
+            self.compensation_remove = 0.0
+
+        if self.nobs < self.window or self.nobs <= self.ddof:
+            return math.nan
+        if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        result = self.ssqdm_x / (self.nobs - self.ddof)
+        return result if result >= 0 else 0.0
+
+    def to_dict(self):
+        state = dict(self.__dict__)
+        state['values'] = list(self.values)
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        rolling = cls(state['window'], state['ddof'])
+        rolling.__dict__.update(state)
+        rolling.values = deque(state['values'])
+        return rolling
+
+def _divide(numerator, denominator):
+    """按 NumPy 语义做浮点除法（除以 0 得到 inf 或 NaN，而不是抛出异常）"""
+    if denominator == 0:
+        if numerator == 0 or numerator != numerator:
+            return math.nan
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+class IndicatorState:
+    """技术指标的增量计算状态"""
+
+    def __init__(self):
+        fast_period, slow_period, signal_period = MACD_PERIODS
+        self.last_date = None
+        self.last_close = None
+        self.count = 0
+        self.emas = {period: EwmMean(period) for period in INDICATOR_EMA_PERIODS}
+        self.macd_fast = EwmMean(fast_period)
+        self.macd_slow = EwmMean(slow_period)
+        self.macd_signal = EwmMean(signal_period)
+        self.rsi_gain = RollingMean(RSI_PERIOD)
+        self.rsi_loss = RollingMean(RSI_PERIOD)
+        self.bb_mean = RollingMean(BOLLINGER_PERIOD)
+        self.bb_var = RollingVariance(BOLLINGER_PERIOD)
+
+    def update(self, date, close):
+        """
+        加入一根新K线
+        Args:
+            date (pd.Timestamp): 日期
+            close (float): 收盘价
+        Returns:
+            dict: 该K线的全部指标值
+        """
+        close = float(close)
+        row = {f'EMA_{period}': ema.update(close) for period, ema in self.emas.items()}
+
+        # RSI：第一根K线没有涨跌幅，按 0 计入窗口
+        delta = close - self.last_close if self.last_close is not None else math.nan
+        gain = self.rsi_gain.update(delta if delta > 0 else 0.0)
+        loss = self.rsi_loss.update(-delta if delta < 0 else 0.0)
+        row['RSI'] = 100 - _divide(100, 1 + _divide(gain, loss))
+
+        # MACD
+        macd_line = self.macd_fast.update(close) - self.macd_slow.update(close)
+        signal_line = self.macd_signal.update(macd_line)
+        row['MACD_line'] = macd_line
+        row['MACD_signal'] = signal_line
+        row['MACD_hist'] = macd_line - signal_line
+
+        # 布林带
+        middle = self.bb_mean.update(close)
+        variance = self.bb_var.update(close)
+        std = math.sqrt(variance) if variance == variance else math.nan
+        upper = middle + std * BOLLINGER_STD_DEV
+        lower = middle - std * BOLLINGER_STD_DEV
+        row['BB_upper'] = upper
+        row['BB_middle'] = middle
+        row['BB_lower'] = lower
+        row['BB_width'] = _divide(upper - lower, middle)
+        row['BB_percent'] = _divide(close - lower, upper - lower)
+
+        self.last_date = pd.Timestamp(date)
+        self.last_close = close
+        self.count += 1
+        return row
+
+    def update_many(self, dates, closes):
+        """
+        依次加入多根K线
+        Returns:
+            pd.DataFrame: 新K线的指标，列顺序与 calculate_indicators 一致
+        """
+        rows = [self.update(date, close) for date, close in zip(dates, closes)]
+        return pd.DataFrame(rows, index=pd.Index(dates), columns=INDICATOR_COLUMNS, dtype=np.float64)
+
+    def to_dict(self):
+        """转换为可 JSON 序列化的字典"""
+        return {
+            'version': STATE_VERSION,
+            'last_date': self.last_date.isoformat() if self.last_date is not None else None,
+            'last_close': self.last_close,
+            'count': self.count,
+            'emas': [ema.to_dict() for ema in self.emas.values()],
+            'macd_fast': self.macd_fast.to_dict(),
+            'macd_slow': self.macd_slow.to_dict(),
+            'macd_signal': self.macd_signal.to_dict(),
+            'rsi_gain': self.rsi_gain.to_dict(),
+            'rsi_loss': self.rsi_loss.to_dict(),
+            'bb_mean': self.bb_mean.to_dict(),
+            'bb_var': self.bb_var.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        """从字典恢复状态，版本不匹配时返回None"""
+        if state.get('version') != STATE_VERSION:
+            return None
+        indicator_state = cls()
+        indicator_state.last_date = pd.Timestamp(state['last_date']) if state['last_date'] else None
+        indicator_state.last_close = state['last_close']
+        indicator_state.count = state['count']
+        indicator_state.emas = {item['span']: EwmMean.from_dict(item) for item in state['emas']}
+        indicator_state.macd_fast = EwmMean.from_dict(state['macd_fast'])
+        indicator_state.macd_slow = EwmMean.from_dict(state['macd_slow'])
+        indicator_state.macd_signal = EwmMean.from_dict(state['macd_signal'])
+        indicator_state.rsi_gain = RollingMean.from_dict(state['rsi_gain'])
+        indicator_state.rsi_loss = RollingMean.from_dict(state['rsi_loss'])
+        indicator_state.bb_mean = RollingMean.from_dict(state['bb_mean'])
+        indicator_state.bb_var = RollingVariance.from_dict(state['bb_var'])
+        return indicator_state
+
+class IndicatorStore:
+    """
+    指标状态与已计算指标的持久化存储
+    保存在数据缓存目录的 indicators 子目录中：{symbol}_{interval}.json（状态）
+    和 {symbol}_{interval}.{扩展名}（已计算的指标序列）
+    """
+
+    def __init__(self, cache_dir='data_cache', backend='feather'):
+        self.cache_dir = os.path.join(cache_dir, 'indicators')
+        self.backend = get_backend(backend)
+
+    def _base_path(self, symbol, interval):
+        return os.path.join(self.cache_dir, f"{symbol}_{interval}")
+
+    def load(self, symbol, interval='1d'):
+        """读取状态和指标序列，不存在或已失效时返回 (None, None)"""
+        base = self._base_path(symbol, interval)
+        data_path = base + self.backend.extension
+        if not (os.path.exists(base + '.json') and os.path.exists(data_path)):
+            return None, None
+        with open(base + '.json', 'r', encoding='utf-8') as f:
+            state = IndicatorState.from_dict(json.load(f))
+        if state is None:
+            return None, None
+        return state, self.backend.read(data_path)
+
+    def save(self, symbol, state, indicators, interval='1d'):
+        """保存状态和指标序列"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        base = self._base_path(symbol, interval)
+        self.backend.write(indicators, base + self.backend.extension)
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(state.to_dict(), f)
+
+def calculate_indicators_incremental(data, symbol, store, interval='1d'):
+    """
+    增量计算技术指标
+
+    读取上次保存的状态，只对 data 中晚于状态最后日期的K线做 O(1) 更新；
+    以下情况从 data 的第一根K线开始全量计算并重建状态：
+    没有保存的状态、data 的第一根K线与已保存的指标序列不同（例如回溯窗口随日期向后移动）、
+    或状态最后一根K线的收盘价与 data 不一致（例如拆股、分红调整导致历史价格变化）。
+
+    EMA等递推指标依赖于序列的起点，因此只有起点相同时才复用状态，
+    结果总是与对同一段 data 调用 calculate_indicators(engine='pandas') 的全量计算逐位一致。
+    调用方应传入起点固定的完整历史（见 ema.py 中的 history_start），需要时再截取最近一段用于展示。
+
+    Args:
+        data (pd.DataFrame): 股票数据
+        symbol (str): 股票代码
+        store (IndicatorStore): 状态存储
+        interval (str): 时间间隔
+    Returns:
+        pd.DataFrame: 添加了技术指标的股票数据
+    """
+    try:
+        close = _column_values(data, 'Close')
+        state, indicators = store.load(symbol, interval)
+
+        if state is not None and len(data) and len(indicators) and data.index[0] == indicators.index[0] \
+                and state.last_date in data.index \
+                and close[data.index.get_loc(state.last_date)] == state.last_close:
+            new_mask = data.index > state.last_date
+            if new_mask.any():
+                new_rows = state.update_many(data.index[new_mask], close[new_mask])
+                indicators = pd.concat([indicators, new_rows])
+                store.save(symbol, state, indicators, interval)
+        else:
+            state = IndicatorState()
+            indicators = state.update_many(data.index, close)
+            store.save(symbol, state, indicators, interval)
+
+        indicators = indicators.reindex(data.index)
+        if isinstance(data.columns, pd.MultiIndex):
+            indicators.columns = pd.MultiIndex.from_tuples(
+                [(name,) + ('',) * (data.columns.nlevels - 1) for name in indicators.columns],
+                names=data.columns.names
+            )
+        return pd.concat([data.drop(columns=INDICATOR_COLUMNS, errors='ignore'), indicators], axis=1)
+    except Exception as e:
+        print(f"{Colors.RED}Error calculating incremental indicators for {symbol}: {str(e)}{Colors.END}")
+        from .analysis import calculate_indicators
+        return calculate_indicators(data, engine='pandas')
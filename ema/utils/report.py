@@ -2,12 +2,24 @@
 
 import os
 import base64
+import hashlib
+import json
 import re
+import shutil
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 from .constants import Colors, EMA_PERIODS
 import pandas as pd
 from openpyxl.utils import get_column_letter
 from collections import Counter # 引入Counter
+import numpy as np
+from datetime import datetime
+
+# 预编译的正则表达式（报告生成时对每条警报使用）
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+LATIN_CJK_PATTERN = re.compile(r'([a-zA-Z0-9])([\u4e00-\u9fff])')
+CJK_LATIN_PATTERN = re.compile(r'([\u4e00-\u9fff])([a-zA-Z0-9])')
+NUMBER_PERCENT_PATTERN = re.compile(r'([0-9])%')
 
 def remove_ansi_colors(text):
     """移除文本中的 ANSI 颜色代码
@@ -16,15 +28,204 @@ def remove_ansi_colors(text):
     Returns:
         str: 移除了 ANSI 颜色代码的文本
     """
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return ANSI_ESCAPE_PATTERN.sub('', text)
+
+# 图表渲染模式：standard（每次重新设置样式并创建图表）或 fast（复用图表模板，只更新线条数据）
+PLOT_MODES = ('standard', 'fast')
+
+# 图表输出分辨率（两种渲染模式相同，快速模式只减少每张图的准备工作，不降低分辨率）
+PLOT_DPI = 150
+
+# 快速模式下每个进程只设置一次样式、创建一次图表模板
+_plot_style_applied = False
+_plot_template = None
+
+def apply_plot_style(colors):
+    """设置 Matplotlib 全局样式
+    Args:
+        colors (dict): 配色方案
+    """
+    plt.style.use('seaborn-v0_8-whitegrid') # 使用更现代的样式
+    
+    # Set Matplotlib default font
+    plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Helvetica'] # 添加备选字体
+    plt.rcParams['font.family'] = 'sans-serif'
+    print('Using DejaVu Sans font for plots.')
+    
+    # 统一字体和符号配置
+    plt.rcParams.update({
+        'axes.unicode_minus': False,  # 正确显示负号
+        'font.size': 12,              # 统一字体大小
+        'axes.titlesize': 18,         # 标题字体大小 (增大)
+        'axes.labelsize': 14,         # 坐标轴标签大小 (增大)
+        'legend.fontsize': 11,        # 图例字体大小
+        'xtick.labelsize': 10,        # X轴刻度标签大小
+        'ytick.labelsize': 10,        # Y轴刻度标签大小
+    })
+    
+    plt.rcParams['axes.facecolor'] = colors.get('background_light', '#FFFFFF') # 更亮的背景
+    plt.rcParams['figure.facecolor'] = colors.get('background_light', '#FFFFFF')
+    plt.rcParams['axes.edgecolor'] = colors.get('border_light', '#CCCCCC') # 更浅的边框
+    plt.rcParams['axes.labelcolor'] = colors.get('text_strong', '#333333') # 更强的文本颜色
+    plt.rcParams['xtick.color'] = colors.get('text_medium', '#555555') # 中等文本颜色
+    plt.rcParams['ytick.color'] = colors.get('text_medium', '#555555')
+
+def get_plot_emas(colors):
+    """图表中绘制的EMA及其颜色、样式
+    Args:
+        colors (dict): 配色方案
+    Returns:
+        dict: 列名 -> 绘图属性
+    """
+    # 用户要求: Price/EMA5, EMA10, EMA20, 和 EMA200
+    return {
+        'EMA_5': {'label': 'EMA 5', 'color': colors.get('chart_green', '#2ECC71'), 'style': '-', 'lw': 1.8},
+        'EMA_10': {'label': 'EMA 10', 'color': colors.get('chart_blue', '#3498DB'), 'style': '-', 'lw': 1.8},
+        'EMA_20': {'label': 'EMA 20', 'color': colors.get('chart_purple', '#9B59B6'), 'style': '-', 'lw': 1.8},
+        'EMA_200': {'label': 'EMA 200', 'color': colors.get('chart_red', '#E74C3C'), 'style': '--', 'lw': 2.0} # EMA200用虚线突出
+    }
+
+class PlotTemplate:
+    """快速渲染模式的图表模板
+    
+    坐标轴、线条、参考线、图例和水印只创建一次，之后每个股票只更新线条数据、
+    坐标范围和标题。直接使用 Agg 画布渲染，不经过 pyplot 的全局状态，
+    横轴使用数值日期而不是逐日的字符串刻度。
+    """
+    
+    def __init__(self, colors):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.patches import Patch
+        
+        self.colors = colors
+        self.fig = Figure(figsize=(16, 8), facecolor=colors.get('background_light', '#FFFFFF'))
+        FigureCanvasAgg(self.fig)
+        self.ax1 = self.fig.add_subplot()
+        self.ax2 = self.ax1.twinx()
+        ax1, ax2 = self.ax1, self.ax2
+        gray = colors.get('chart_gray', '#95A5A6')
+        
+        # 价格、布林带和EMA线条（数据在渲染时填充）
+        self.price_lines = {
+            'Close': ax1.plot([], [], label='Price', color=colors.get('primary', '#007ACC'),
+                              linewidth=2.5, alpha=0.9)[0],
+            'BB_upper': ax1.plot([], [], label='BB Upper', color=gray, linestyle='--',
+                                 linewidth=1.0, alpha=0.6)[0],
+            'BB_lower': ax1.plot([], [], label='BB Lower', color=gray, linestyle='--',
+                                 linewidth=1.0, alpha=0.6)[0],
+        }
+        # 布林带填充区域每次渲染时重建，图例使用代理图形
+        self.bb_fill = None
+        bb_range = Patch(color=gray, alpha=0.1, label='BB Range')
+        self.emas = get_plot_emas(colors)
+        for ema_col, props in self.emas.items():
+            self.price_lines[ema_col] = ax1.plot([], [], label=props['label'], color=props['color'],
+                                                 linestyle=props['style'], linewidth=props['lw'],
+                                                 alpha=0.85)[0]
+        self.rsi_line = ax2.plot([], [], label='RSI', color=colors.get('info_dark', '#F39C12'),
+                                 linewidth=1.8, alpha=0.8)[0]
+        
+        # RSI超买超卖线和区域
+        ax2.axhline(y=70, color=colors.get('negative_light', '#E74C3C'), linestyle=':', alpha=0.6, linewidth=1.5)
+        ax2.axhline(y=30, color=colors.get('positive_light', '#2ECC71'), linestyle=':', alpha=0.6, linewidth=1.5)
+        ax2.axhspan(70, 100, color=colors.get('negative_light', '#E74C3C'), alpha=0.1, linewidth=0)
+        ax2.axhspan(0, 30, color=colors.get('positive_light', '#2ECC71'), alpha=0.1, linewidth=0)
+        
+        self.title = ax1.set_title('', fontsize=18, color=colors.get('text_strong', '#333333'),
+                                   fontweight='bold', pad=25)
+        ax1.grid(True, alpha=0.3, color=colors.get('border_light', '#DDDDDD'), linestyle='--')
+        ax2.grid(False)
+        
+        # 数值日期轴，自动选择刻度
+        ax1.xaxis.set_major_locator(mdates.AutoDateLocator(minticks=5, maxticks=10))
+        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+        ax1.tick_params(axis='x', labelrotation=30, labelsize=10, labelcolor=colors.get('text_medium', '#555555'))
+        
+        ax1.set_xlabel('Date', fontsize=14, color=colors.get('text_strong', '#333333'))
+        ax1.set_ylabel('Price / EMA', fontsize=14, color=colors.get('text_strong', '#333333'))
+        ax2.set_ylabel('RSI', fontsize=14, color=colors.get('info_dark', '#F39C12'))
+        ax2.set_ylim(0, 100)
+        
+        ax1.spines['top'].set_visible(False)
+        ax1.spines['right'].set_visible(False)
+        ax2.spines['top'].set_visible(False)
+        for spine in ('left', 'bottom'):
+            ax1.spines[spine].set_color(colors.get('border_medium', '#AAAAAA'))
+        for spine in ('left', 'right', 'bottom'):
+            ax2.spines[spine].set_color(colors.get('border_medium', '#AAAAAA'))
+        
+        # 图例放在图表下方，水平排列
+        handles = list(self.price_lines.values())
+        handles.insert(3, bb_range)
+        handles.append(self.rsi_line)
+        self.fig.legend(handles, [handle.get_label() for handle in handles], loc='lower center',
+                        bbox_to_anchor=(0.5, 0.0), ncol=len(handles), frameon=False, fontsize=11)
+        self.fig.text(0.98, 0.01, 'Stock Analysis by TraeAI',
+                      fontsize=9, color=colors.get('text_light', '#999999'), ha='right')
+        
+        # 固定边距代替逐张图的 tight_layout / bbox_inches='tight'
+        self.fig.subplots_adjust(left=0.06, right=0.94, bottom=0.17, top=0.9)
+    
+    def render(self, data, symbol, plot_filename, dpi=PLOT_DPI):
+        """用新数据更新模板并保存图表
+        Args:
+            data (pd.DataFrame): 股票数据
+            symbol (str): 股票代码
+            plot_filename (str): 输出文件路径
+            dpi (int): 输出分辨率
+        """
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        x = mdates.date2num(index.values)
+        
+        for column, line in self.price_lines.items():
+            if column in data.columns:
+                line.set_data(x, data[column].to_numpy(dtype=float).ravel())
+                line.set_visible(True)
+            else:
+                line.set_visible(False)
+                if column in self.emas:
+                    print(f"Warning: {column} not found in data for {symbol}")
+        self.rsi_line.set_data(x, data['RSI'].to_numpy(dtype=float).ravel())
+        
+        if self.bb_fill is not None:
+            self.bb_fill.remove()
+            self.bb_fill = None
+        if all(col in data.columns for col in ['BB_upper', 'BB_middle', 'BB_lower']):
+            self.bb_fill = self.ax1.fill_between(x, data['BB_upper'].to_numpy(dtype=float).ravel(),
+                                                 data['BB_lower'].to_numpy(dtype=float).ravel(),
+                                                 color=self.colors.get('chart_gray', '#95A5A6'), alpha=0.1)
+        
+        self.ax1.relim(visible_only=True)
+        self.ax1.autoscale_view()
+        for label in self.ax1.get_xticklabels():
+            label.set_horizontalalignment('right')
+        self.title.set_text(f'{symbol} Technical Analysis - {index[-1].strftime("%Y-%m-%d")}')
+        
+        self.fig.savefig(plot_filename, dpi=dpi, facecolor=self.fig.get_facecolor())
+
+def _save_analysis_plot_fast(data, symbol, output_dir, colors):
+    """快速渲染模式：每个进程只设置一次样式，复用图表模板"""
+    global _plot_style_applied, _plot_template
+    if not _plot_style_applied:
+        apply_plot_style(colors)
+        _plot_style_applied = True
+    if _plot_template is None:
+        _plot_template = PlotTemplate(colors)
+    
+    plot_filename = os.path.join(output_dir, f'{symbol}_analysis_plot.png')
+    _plot_template.render(data, symbol, plot_filename)
+    print(f"Modern plot saved to {plot_filename}")
 
-def save_analysis_plot(data, symbol, output_dir):
+def save_analysis_plot(data, symbol, output_dir, mode='standard'):
     """保存分析图表，采用现代简约的设计风格
     Args:
         data (pd.DataFrame): 股票数据
         symbol (str): 股票代码
         output_dir (str): 输出目录
+        mode (str): 渲染模式，'standard' 或 'fast'（见 PlotTemplate）
     """
     try:
         # 导入样式模块
@@ -33,34 +234,12 @@ def save_analysis_plot(data, symbol, output_dir):
         # 获取配色方案
         colors = get_color_scheme()
         
+        if mode == 'fast':
+            _save_analysis_plot_fast(data, symbol, output_dir, colors)
+            return
+        
         # 设置Matplotlib样式
-        plt.style.use('seaborn-v0_8-whitegrid') # 使用更现代的样式
-        
-        # 导入字体管理器，确保字体正确加载
-        import matplotlib.font_manager as fm
-        
-        # Set Matplotlib default font
-        plt.rcParams['font.sans-serif'] = ['DejaVu Sans', 'Arial', 'Helvetica'] # 添加备选字体
-        plt.rcParams['font.family'] = 'sans-serif'
-        print('Using DejaVu Sans font for plots.')
-        
-        # 统一字体和符号配置
-        plt.rcParams.update({
-            'axes.unicode_minus': False,  # 正确显示负号
-            'font.size': 12,              # 统一字体大小
-            'axes.titlesize': 18,         # 标题字体大小 (增大)
-            'axes.labelsize': 14,         # 坐标轴标签大小 (增大)
-            'legend.fontsize': 11,        # 图例字体大小
-            'xtick.labelsize': 10,        # X轴刻度标签大小
-            'ytick.labelsize': 10,        # Y轴刻度标签大小
-        })
-        
-        plt.rcParams['axes.facecolor'] = colors.get('background_light', '#FFFFFF') # 更亮的背景
-        plt.rcParams['figure.facecolor'] = colors.get('background_light', '#FFFFFF')
-        plt.rcParams['axes.edgecolor'] = colors.get('border_light', '#CCCCCC') # 更浅的边框
-        plt.rcParams['axes.labelcolor'] = colors.get('text_strong', '#333333') # 更强的文本颜色
-        plt.rcParams['xtick.color'] = colors.get('text_medium', '#555555') # 中等文本颜色
-        plt.rcParams['ytick.color'] = colors.get('text_medium', '#555555')
+        apply_plot_style(colors)
         
         # 创建图表
         fig, ax1 = plt.subplots(figsize=(16, 8)) # 略微调整尺寸
@@ -100,13 +279,7 @@ def save_analysis_plot(data, symbol, output_dir):
                             label='BB Range')
         
         # 定义要绘制的EMA周期和对应的颜色、样式
-        # 用户要求: Price/EMA5, EMA10, EMA20, 和 EMA200
-        emas_to_plot = {
-            'EMA_5': {'label': 'EMA 5', 'color': colors.get('chart_green', '#2ECC71'), 'style': '-', 'lw': 1.8},
-            'EMA_10': {'label': 'EMA 10', 'color': colors.get('chart_blue', '#3498DB'), 'style': '-', 'lw': 1.8},
-            'EMA_20': {'label': 'EMA 20', 'color': colors.get('chart_purple', '#9B59B6'), 'style': '-', 'lw': 1.8},
-            'EMA_200': {'label': 'EMA 200', 'color': colors.get('chart_red', '#E74C3C'), 'style': '--', 'lw': 2.0} # EMA200用虚线突出
-        }
+        emas_to_plot = get_plot_emas(colors)
         
         chart_colors = colors.get('chart_colors', ['#2ECC71', '#3498DB', '#9B59B6', '#F1C40F', '#E67E22', '#E74C3C'])
 
@@ -202,7 +375,7 @@ def save_analysis_plot(data, symbol, output_dir):
         plot_filename = os.path.join(output_dir, f'{symbol}_analysis_plot.png')
         plt.savefig(plot_filename,
                    bbox_inches='tight', 
-                   dpi=150, # 提高DPI以获得更清晰的图像
+                   dpi=PLOT_DPI,
                    facecolor=fig.get_facecolor())
         plt.close(fig) # 关闭图表，释放内存
         print(f"Modern plot saved to {plot_filename}")
@@ -210,6 +383,88 @@ def save_analysis_plot(data, symbol, output_dir):
     except Exception as e:
         print(f"{Colors.RED}Error saving modern analysis plot for {symbol}: {str(e)}{Colors.END}")
 
+# 图表缓存：每个输出目录中的清单文件记录各图表的数据指纹
+PLOT_CACHE_MANIFEST = 'plot_cache.json'
+
+# 图表布局版本，修改绘图代码后递增以使旧的图表缓存失效
+PLOT_STYLE_VERSION = 2
+
+# 图表中绘制的数据列
+PLOT_COLUMNS = ['Close', 'BB_upper', 'BB_middle', 'BB_lower', 'EMA_5', 'EMA_10', 'EMA_20', 'EMA_200', 'RSI']
+
+def plot_fingerprint(data, symbol, mode='standard'):
+    """计算图表的数据指纹
+    由最后一根K线的时间、图表用到的指标列和样式配置（配色、渲染模式、布局版本）共同决定，
+    指纹相同的图表渲染结果相同
+    Args:
+        data (pd.DataFrame): 添加了技术指标的股票数据
+        symbol (str): 股票代码
+        mode (str): 渲染模式
+    Returns:
+        str: 十六进制指纹
+    """
+    from .styles import get_color_scheme
+    
+    digest = hashlib.sha256()
+    style = {'mode': mode, 'version': PLOT_STYLE_VERSION, 'dpi': PLOT_DPI, 'colors': get_color_scheme()}
+    digest.update(json.dumps([symbol, str(data.index[-1]), len(data), style], sort_keys=True).encode())
+    for column in PLOT_COLUMNS:
+        if column in data.columns:
+            digest.update(column.encode())
+            digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def load_previous_plot_cache(output_dir):
+    """查找上一次运行的输出目录及其图表指纹清单
+    Args:
+        output_dir (str): 本次运行的输出目录（与历次输出目录位于同一父目录下）
+    Returns:
+        dict: {'dir': 上次的输出目录, 'fingerprints': {股票代码: 指纹}}，没有可用缓存时返回None
+    """
+    parent = os.path.dirname(os.path.abspath(output_dir))
+    current = os.path.basename(os.path.abspath(output_dir))
+    candidates = sorted((name for name in os.listdir(parent) if name < current), reverse=True)
+    for name in candidates:
+        manifest = os.path.join(parent, name, PLOT_CACHE_MANIFEST)
+        if os.path.exists(manifest):
+            try:
+                with open(manifest, 'r', encoding='utf-8') as f:
+                    return {'dir': os.path.join(parent, name), 'fingerprints': json.load(f)}
+            except (OSError, ValueError) as e:
+                print(f"{Colors.YELLOW}Ignoring unreadable plot cache {manifest}: {str(e)}{Colors.END}")
+    return None
+
+def save_plot_cache(results, output_dir):
+    """将本次运行各图表的指纹写入输出目录的清单文件"""
+    fingerprints = {result['symbol']: result['plot_fingerprint']
+                    for result in results if result.get('plot_fingerprint')}
+    with open(os.path.join(output_dir, PLOT_CACHE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, indent=2)
+
+def reuse_cached_plot(symbol, fingerprint, output_dir, plot_cache):
+    """指纹未变化时从上次的输出目录复用图表（优先硬链接，失败时复制）
+    Args:
+        symbol (str): 股票代码
+        fingerprint (str): 本次的图表指纹
+        output_dir (str): 输出目录
+        plot_cache (dict): load_previous_plot_cache 的返回值
+    Returns:
+        bool: 是否复用成功
+    """
+    if not plot_cache or plot_cache['fingerprints'].get(symbol) != fingerprint:
+        return False
+    filename = f'{symbol}_analysis_plot.png'
+    source = os.path.join(plot_cache['dir'], filename)
+    target = os.path.join(output_dir, filename)
+    if not os.path.exists(source):
+        return False
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+    print(f"Reused cached plot {source}")
+    return True
+
 def format_value(value):
     """格式化数值
     Args:
@@ -227,18 +482,142 @@ def format_value(value):
         return "N/A"
     return str(value)
 
+# Excel 导出模式：standard（pandas + openpyxl，逐单元格着色）
+# 或 fast（xlsxwriter 常量内存模式逐行写入，使用 Excel 原生条件格式）
+EXCEL_MODES = ('standard', 'fast')
+
+# 条件格式使用的填充颜色
+EXCEL_RED = '#FFCDD2'
+EXCEL_GREEN = '#C8E6C9'
+EXCEL_YELLOW = '#FFE0B2'
 
+def _excel_rename_map():
+    """详细数据表的列名（英文 -> 中文）"""
+    rename_map = {
+        'Open': '开盘价',
+        'High': '最高价',
+        'Low': '最低价',
+        'Close': '收盘价',
+        'Adj Close': '调整后收盘价',
+        'Volume': '成交量',
+        'RSI': 'RSI',
+        'BB_upper': '布林带上轨',
+        'BB_middle': '布林带中轨',
+        'BB_lower': '布林带下轨',
+        'BB_width': '布林带宽度',
+        'BB_percent': '%B指标'
+    }
+    for period in EMA_PERIODS:
+        rename_map[f'EMA_{period}'] = f'{period}日均线'
+    return rename_map
 
+def _overview_rows(results):
+    """概览表的数据行：(股票代码, 当前价格, 价格变化, 价格变化率, RSI, 警报数量)"""
+    return [
+        (result['symbol'], float(format_value(result['price'])), float(format_value(result['price_change'])),
+         float(format_value(result['price_change_pct'])), float(format_value(result['rsi'])),
+         len(result.get('alert_details', [])))
+        for result in results if not result.get('error')
+    ]
 
-def generate_excel_report(results, output_dir):
+def _generate_excel_report_fast(results, excel_file, max_rows=None):
+    """使用 xlsxwriter 常量内存模式写入Excel
+    每个工作表逐行写入后即刷新到磁盘，着色全部使用 Excel 原生条件格式，
+    列位置只在每个工作表开始时解析一次
+    Args:
+        results (list): 分析结果列表
+        excel_file (str): 输出文件路径
+        max_rows (int): 每个股票的详细数据表只保留最近的行数，None 表示全部
+    """
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(excel_file, {'constant_memory': True})
+    try:
+        number_format = workbook.add_format({'num_format': '0.00'})
+        integer_format = workbook.add_format({'num_format': '0'})
+        red = workbook.add_format({'bg_color': EXCEL_RED})
+        green = workbook.add_format({'bg_color': EXCEL_GREEN})
+        yellow = workbook.add_format({'bg_color': EXCEL_YELLOW})
+        
+        # 概览表
+        worksheet = workbook.add_worksheet('概览')
+        worksheet.set_column(0, 5, 15)
+        worksheet.write_row(0, 0, ['股票代码', '当前价格', '价格变化', '价格变化率(%)', 'RSI', '警报数量'])
+        rows = _overview_rows(results)
+        for row, values in enumerate(rows, 1):
+            worksheet.write_string(row, 0, values[0])
+            for col in range(1, 5):
+                # 与详细数据表一致，缺失值（如数据不足14天时的RSI）留空
+                if values[col] == values[col]:
+                    worksheet.write_number(row, col, values[col], number_format)
+            worksheet.write_number(row, 5, values[5])
+        if rows:
+            last = len(rows)
+            # 价格变化和变化率：上涨绿色、下跌红色
+            worksheet.conditional_format(1, 2, last, 3, {'type': 'cell', 'criteria': '>', 'value': 0, 'format': green})
+            worksheet.conditional_format(1, 2, last, 3, {'type': 'cell', 'criteria': '<', 'value': 0, 'format': red})
+            # RSI：超买红色、超卖绿色
+            worksheet.conditional_format(1, 4, last, 4, {'type': 'cell', 'criteria': '>=', 'value': 70, 'format': red})
+            worksheet.conditional_format(1, 4, last, 4, {'type': 'cell', 'criteria': '<=', 'value': 30, 'format': green})
+            # 有警报的股票黄色
+            worksheet.conditional_format(1, 5, last, 5, {'type': 'cell', 'criteria': '>', 'value': 0, 'format': yellow})
+        
+        # 为每个股票创建详细数据表
+        rename_map = _excel_rename_map()
+        for result in results:
+            if result.get('error') or 'data' not in result:
+                continue
+            data = result['data']
+            if max_rows:
+                data = data.tail(max_rows)
+            names = list(data.columns.get_level_values(0) if isinstance(data.columns, pd.MultiIndex) else data.columns)
+            headers = ['Date'] + [rename_map.get(name, name) for name in names]
+            dates = pd.DatetimeIndex(data.index).strftime('%Y-%m-%d')
+            values = data.to_numpy(dtype=np.float64)
+            formats = [integer_format if pd.api.types.is_integer_dtype(dtype) else number_format
+                       for dtype in data.dtypes]
+            
+            worksheet = workbook.add_worksheet(result['symbol'])
+            worksheet.set_column(0, len(headers) - 1, 15)
+            worksheet.write_row(0, 0, headers)
+            for row in range(len(values)):
+                worksheet.write_string(row + 1, 0, dates[row])
+                for col, value in enumerate(values[row], 1):
+                    if value == value:
+                        worksheet.write_number(row + 1, col, value, formats[col - 1])
+            
+            if 'RSI' in names and len(values):
+                rsi_col = names.index('RSI') + 1
+                worksheet.conditional_format(1, rsi_col, len(values), rsi_col,
+                                             {'type': 'cell', 'criteria': '>=', 'value': 70, 'format': red})
+                worksheet.conditional_format(1, rsi_col, len(values), rsi_col,
+                                             {'type': 'cell', 'criteria': '<=', 'value': 30, 'format': green})
+    finally:
+        workbook.close()
+
+def generate_excel_report(results, output_dir, mode='standard', max_rows=None):
     """保存数据到Excel文件
     Args:
         results (list): 分析结果列表
         output_dir (str): 输出目录
+        mode (str): 导出模式，'standard' 或 'fast'（见 EXCEL_MODES）
+        max_rows (int): 每个股票的详细数据表只保留最近的行数，None 表示全部
     """
+    excel_file = os.path.join(output_dir, 'stock_analysis.xlsx')
+    if mode == 'fast':
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            print(f"{Colors.YELLOW}xlsxwriter is not installed, falling back to standard Excel export{Colors.END}")
+        else:
+            try:
+                _generate_excel_report_fast(results, excel_file, max_rows=max_rows)
+            except Exception as e:
+                print(f"{Colors.RED}Error saving Excel file: {str(e)}{Colors.END}")
+            return
+    
     try:
         # 创建一个Excel写入器
-        excel_file = os.path.join(output_dir, 'stock_analysis.xlsx')
         with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
             # 创建概览表
             overview_data = []
@@ -312,29 +691,14 @@ def generate_excel_report(results, output_dir):
                 if not result.get('error') and 'data' in result:
                     symbol = result['symbol']
                     data = result['data'].copy()
+                    if max_rows:
+                        data = data.tail(max_rows)
                     
                     # 格式化日期索引
                     data.index = data.index.strftime('%Y-%m-%d')
                     
                     # 重命名列
-                    rename_map = {
-                        'Open': '开盘价',
-                        'High': '最高价',
-                        'Low': '最低价',
-                        'Close': '收盘价',
-                        'Adj Close': '调整后收盘价',
-                        'Volume': '成交量',
-                        'RSI': 'RSI',
-                        'BB_upper': '布林带上轨',
-                        'BB_middle': '布林带中轨',
-                        'BB_lower': '布林带下轨',
-                        'BB_width': '布林带宽度',
-                        'BB_percent': '%B指标'
-                    }
-                    for period in EMA_PERIODS:
-                        rename_map[f'EMA_{period}'] = f'{period}日均线'
-                    
-                    data.rename(columns=rename_map, inplace=True)
+                    data.rename(columns=_excel_rename_map(), inplace=True)
                     
                     # 保存到Excel，所有数字列保留两位小数
                     data.to_excel(writer, sheet_name=symbol, float_format='%.2f')
@@ -369,25 +733,78 @@ def generate_excel_report(results, output_dir):
     except Exception as e:
         print(f"{Colors.RED}Error saving Excel file: {str(e)}{Colors.END}")
 
-def generate_report(results, output_dir):
-    """生成HTML报告
+
+# HTML报告中图表的引用方式：inline（base64 内嵌，单文件可独立打开）、
+# link（按相对路径引用输出目录中的图片）或 lazy（相对路径 + 浏览器延迟加载）
+REPORT_IMAGE_MODES = ('inline', 'link', 'lazy')
+
+# 内嵌图表时每次读取的字节数（3 的倍数，保证分块编码的 base64 可以直接拼接）
+_BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+def format_alert_html(alert_message):
+    """将一条警报转换为HTML列表项
+    Args:
+        alert_message (str): 警报消息
+    Returns:
+        str: <li> 元素
+    """
+    # 清除ANSI颜色代码
+    clean_alert = remove_ansi_colors(alert_message)
+    
+    # 在英文字母/数字和中文之间添加空格
+    clean_alert = LATIN_CJK_PATTERN.sub(r'\1 \2', clean_alert)
+    clean_alert = CJK_LATIN_PATTERN.sub(r'\1 \2', clean_alert)
+    # 确保数字与百分号之间有空格
+    clean_alert = NUMBER_PERCENT_PATTERN.sub(r'\1 %', clean_alert)
+    
+    # 根据警报类型添加不同的样式
+    if '金叉' in clean_alert or '上穿' in clean_alert or '买入' in clean_alert or '看涨' in clean_alert:
+        return f'<li class="golden-cross">{clean_alert}</li>'
+    elif '死叉' in clean_alert or '下穿' in clean_alert or '卖出' in clean_alert or '看跌' in clean_alert:
+        return f'<li class="death-cross">{clean_alert}</li>'
+    elif 'RSI 超买' in clean_alert or 'RSI超买' in clean_alert or '突破上轨' in clean_alert:
+        return f'<li class="death-cross">{clean_alert}</li>'
+    elif 'RSI 超卖' in clean_alert or 'RSI超卖' in clean_alert or '跌破下轨' in clean_alert:
+        return f'<li class="golden-cross">{clean_alert}</li>'
+    elif '布林带收口' in clean_alert:
+        return f'<li class="golden-cross" style="color: #F39C12;">{clean_alert}</li>'
+    # 如果不是交叉信号，使用普通样式
+    return f'<li>{clean_alert}</li>'
+
+def _write_plot_image(f, symbol, output_dir, image_mode):
+    """写入图表的 <img> 元素，内嵌模式下分块编码图片，避免整张图片的 base64 字符串驻留内存"""
+    filename = f"{symbol}_analysis_plot.png"
+    if image_mode == 'inline':
+        f.write('<img src="data:image/png;base64,')
+        plot_filename = os.path.join(output_dir, filename)
+        if os.path.exists(plot_filename):
+            with open(plot_filename, "rb") as image_file:
+                for chunk in iter(lambda: image_file.read(_BASE64_CHUNK_SIZE), b''):
+                    f.write(base64.b64encode(chunk).decode())
+        f.write(f'" alt="{symbol} 分析图表">')
+    else:
+        loading = ' loading="lazy" decoding="async"' if image_mode == 'lazy' else ''
+        f.write(f'<img src="{filename}"{loading} alt="{symbol} 分析图表">')
+
+def write_html_report(results, output_dir, image_mode='inline'):
+    """将HTML报告逐段写入文件
     Args:
         results (list): 分析结果列表
         output_dir (str): 输出目录
+        image_mode (str): 图表引用方式（见 REPORT_IMAGE_MODES）
     """
-    try:
-        # 保存Excel文件
-        generate_excel_report(results, output_dir)
-        
-        # 导入样式模块
-        from .styles import get_css_styles
-        
-        # 获取当前日期
-        from datetime import datetime
-        current_date = datetime.now().strftime("%Y年%m月%d日")
-        
+    if image_mode not in REPORT_IMAGE_MODES:
+        raise ValueError(f"Unknown report image mode: {image_mode} (available: {', '.join(REPORT_IMAGE_MODES)})")
+    
+    # 导入样式模块
+    from .styles import get_css_styles
+    
+    # 获取当前日期
+    current_date = datetime.now().strftime("%Y年%m月%d日")
+    
+    with open(os.path.join(output_dir, 'analysis_results.html'), 'w', encoding='utf-8') as f:
         # HTML头部
-        html = f"""
+        f.write(f"""
         <!DOCTYPE html>
         <html lang="zh-CN">
         <head>
@@ -421,17 +838,17 @@ def generate_report(results, output_dir):
                             </tr>
                         </thead>
                         <tbody>
-        """
+        """)
         
         # 添加概览表格数据
         for result in results:
             if result.get('error'):
-                html += f"""
+                f.write(f"""
                 <tr>
                     <td>{result['symbol']}</td>
                     <td colspan="4" style="color: #D82C0D;">Error: {result['error']}</td>
                 </tr>
-                """
+                """)
                 continue
                 
             price_change = float(format_value(result['price_change']))
@@ -445,7 +862,7 @@ def generate_report(results, output_dir):
             
             alert_count = len(result.get('alert_details', []))
             
-            html += f"""
+            f.write(f"""
             <tr>
                 <td><strong>{result['symbol']}</strong></td>
                 <td>{format_value(result['price'])}</td>
@@ -453,9 +870,9 @@ def generate_report(results, output_dir):
                 <td class="{rsi_class}">{format_value(result['rsi'])}</td>
                 <td>{alert_count} {f'<span class="alert">{"警报" if alert_count > 0 else ""}</span>' if alert_count > 0 else ""}</td>
             </tr>
-            """
+            """)
         
-        html += """
+        f.write("""
                         </tbody>
                     </table>
                 </div>
@@ -466,7 +883,7 @@ def generate_report(results, output_dir):
                     <h2 style="margin: 0;">详细分析</h2>
                 </div>
             </div>
-        """
+        """)
         
         # 添加每个股票的详细分析
         for result in results:
@@ -479,15 +896,8 @@ def generate_report(results, output_dir):
             price_change_pct = format_value(result['price_change_pct'])
             rsi = format_value(result['rsi'])
             change_class = 'up' if float(price_change) > 0 else 'down'
-
-            # 嵌入图表
-            plot_data = ''
-            plot_filename = os.path.join(output_dir, f"{result['symbol']}_analysis_plot.png")
-            if os.path.exists(plot_filename):
-                with open(plot_filename, "rb") as image_file:
-                    plot_data = base64.b64encode(image_file.read()).decode()
             
-            html += f"""
+            f.write(f"""
             <div class="card stock-detail">
                 <div class="card-header">
                     <h3 style="margin: 0;">{result['symbol']} 详细分析</h3>
@@ -516,75 +926,50 @@ def generate_report(results, output_dir):
                     </div>
                     
                     <!-- 分析图表 -->
-                    <img src="data:image/png;base64,{plot_data}" alt="{result['symbol']} 分析图表">
-            """
+                    """)
+            _write_plot_image(f, result['symbol'], output_dir, image_mode)
+            f.write("\n            ")
             
             # 添加警报信息
             if result.get('alert_details', []):
-                html += """<div class="card" style="margin-top: 24px;">
+                f.write("""<div class="card" style="margin-top: 24px;">
                     <div class="card-header">
                         <h4 style="margin: 0;">警报信息</h4>
                     </div>
                     <div class="card-body">
-                        <ul>"""
+                        <ul>""")
                 for alert in result['alert_details']:
-                    # 从字典中获取消息
-                    alert_message = alert.get('message', '')
-
-                    # 提取日期并检查是否在最近10天内
-                    import re
-                    from datetime import datetime, timedelta
-                    date_match = re.search(r'发生于：(\d{4}-\d{2}-\d{2})', alert_message)
-                    is_recent = False
-                    if date_match:
-                        alert_date = datetime.strptime(date_match.group(1), '%Y-%m-%d')
-                        current_date = datetime.now()
-                        days_diff = (current_date - alert_date).days
-                        is_recent = days_diff <= 10
-                    
-                    # 清除ANSI颜色代码
-                    clean_alert = remove_ansi_colors(alert_message)
-                    
-                    # 替换常见的中英文混排情况，添加空格
-                    import re
-                    # 在英文字母/数字和中文之间添加空格
-                    clean_alert = re.sub(r'([a-zA-Z0-9])([\u4e00-\u9fff])', r'\1 \2', clean_alert)
-                    clean_alert = re.sub(r'([\u4e00-\u9fff])([a-zA-Z0-9])', r'\1 \2', clean_alert)
-                    # 确保数字与百分号之间有空格
-                    clean_alert = re.sub(r'([0-9])%', r'\1 %', clean_alert)
-                    
-                    # 根据警报类型和时间添加不同的样式
-                    if '金叉' in clean_alert or '上穿' in clean_alert or '买入' in clean_alert or '看涨' in clean_alert:
-                        html += f'<li class="golden-cross">{clean_alert}</li>'
-                    elif '死叉' in clean_alert or '下穿' in clean_alert or '卖出' in clean_alert or '看跌' in clean_alert:
-                        html += f'<li class="death-cross">{clean_alert}</li>'
-                    elif 'RSI 超买' in clean_alert or 'RSI超买' in clean_alert or '突破上轨' in clean_alert:
-                        html += f'<li class="death-cross">{clean_alert}</li>'
-                    elif 'RSI 超卖' in clean_alert or 'RSI超卖' in clean_alert or '跌破下轨' in clean_alert:
-                        html += f'<li class="golden-cross">{clean_alert}</li>'
-                    elif '布林带收口' in clean_alert:
-                        html += f'<li class="golden-cross" style="color: #F39C12;">{clean_alert}</li>'
-                    else:
-                        # 如果不是交叉信号，使用普通样式
-                        html += f'<li>{clean_alert}</li>'
-                html += """</ul>
+                    f.write(format_alert_html(alert.get('message', '')))
+                f.write("""</ul>
                     </div>
-                </div>"""
+                </div>""")
             
-            html += "</div>\n</div>"
+            f.write("</div>\n</div>")
         
         # HTML尾部
-        html += """
+        f.write("""
             <footer style="margin-top: 40px; padding-top: 20px; border-top: 1px solid #E4E7EC; text-align: center; color: #8A919E; font-size: 0.9rem;">
                 <p>EMA 股票分析工具 © 版权所有</p>
             </footer>
         </body>
         </html>
-        """
+        """)
+
+def generate_report(results, output_dir, image_mode='inline', excel_mode='standard', excel_max_rows=None):
+    """生成HTML报告
+    Args:
+        results (list): 分析结果列表
+        output_dir (str): 输出目录
+        image_mode (str): 图表引用方式，'inline'、'link' 或 'lazy'（见 REPORT_IMAGE_MODES）
+        excel_mode (str): Excel 导出模式，'standard' 或 'fast'（见 EXCEL_MODES）
+        excel_max_rows (int): Excel 详细数据表保留的最近行数，None 表示全部
+    """
+    try:
+        # 保存Excel文件
+        generate_excel_report(results, output_dir, mode=excel_mode, max_rows=excel_max_rows)
         
-        # 保存HTML报告
-        with open(os.path.join(output_dir, 'analysis_results.html'), 'w', encoding='utf-8') as f:
-            f.write(html)
+        # 逐段写入HTML报告
+        write_html_report(results, output_dir, image_mode=image_mode)
             
     except Exception as e:
         print(f"{Colors.RED}Error saving results to HTML: {str(e)}{Colors.END}")
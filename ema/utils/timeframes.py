@@ -0,0 +1,84 @@
+"""
+多周期分析模块
+
+周线、月线不单独下载，而是由缓存中的日线 OHLCV 在本地重采样得到：
+每个周期的开盘价取第一根日线、最高/最低价取极值、收盘价取最后一根日线、成交量求和，
+K线的日期为该周期内最后一个交易日（当前未结束的周期即为最新一根日线的日期）。
+
+重采样每次直接对传入的日线数据进行（10 年日线约 1 毫秒），结果只取决于输入，不另外缓存。
+"""
+
+import numpy as np
+import pandas as pd
+
+from .constants import TIMEFRAMES
+
+# 各价格列的聚合方式，其他列取周期内最后一个值
+OHLCV_AGGREGATIONS = {
+    'Open': 'first',
+    'High': 'max',
+    'Low': 'min',
+    'Close': 'last',
+    'Adj Close': 'last',
+    'Volume': 'sum',
+}
+
+def _periods(index, interval):
+    """日期所属的周期（时区只影响日期的表示，按本地日期划分周期）"""
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.to_period(TIMEFRAMES[interval]['rule'])
+
+def _reduce(values, starts, how):
+    """
+    按周期聚合一列数据（与 pandas groupby 的 first/last/max/min/sum 一致，缺失值不参与计算）
+    Args:
+        values (np.ndarray): 一列日线数据
+        starts (np.ndarray): 每个周期第一根日线的位置
+        how (str): 聚合方式
+    Returns:
+        np.ndarray: 每个周期的聚合值
+    """
+    valid = ~pd.isna(values)
+    if how == 'sum':
+        return np.add.reduceat(np.where(valid, values, 0), starts)
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    # first / last：每个周期内第一个 / 最后一个非缺失值的位置，整个周期都缺失时为 NaN
+    positions = np.arange(len(values))
+    if how == 'first':
+        chosen = np.minimum.reduceat(np.where(valid, positions, len(values)), starts)
+        found = chosen < len(values)
+    else:
+        chosen = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+        found = chosen >= 0
+    if found.all():
+        return values[chosen]
+    return np.where(found, values[np.clip(chosen, 0, len(values) - 1)], np.nan)
+
+def resample_ohlcv(data, interval):
+    """
+    将日线数据重采样为周线或月线
+    
+    日线按日期升序排列，同一周期的日线是连续的一段：找出每段的起点后，
+    每一列用一次 ufunc.reduceat 完成聚合，不经过 pandas groupby。
+    
+    Args:
+        data (pd.DataFrame): 日线数据（按日期升序，列结构与 yfinance 下载结果一致）
+        interval (str): 目标周期，'1wk' 或 '1mo'
+    Returns:
+        pd.DataFrame: 列结构与 data 相同的K线，索引为每个周期内最后一个交易日
+    """
+    ordinals = _periods(data.index, interval).asi8
+    starts = np.flatnonzero(np.diff(ordinals, prepend=ordinals[:1] - 1))
+    ends = np.append(starts[1:], len(data)) - 1
+    names = data.columns.get_level_values(0)
+    columns = {
+        position: _reduce(data.iloc[:, position].to_numpy(), starts, OHLCV_AGGREGATIONS.get(name, 'last'))
+        for position, name in enumerate(names)
+    }
+    bars = pd.DataFrame(columns, index=data.index[ends])
+    bars.columns = data.columns
+    return bars
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+期权定价性能基准测试
+对比逐节点循环的二叉树与按时间步整块倒推的批量二叉树，并校验结果一致
+
+用法：
+    python benchmark.py tree                       # 二叉树定价
+    python benchmark.py tree --steps 5000 --legs 8 # 指定步数和腿数
+    python benchmark.py iv                         # 隐含波动率（逐个合约求解 vs 整条期权链批量求解）
+    python benchmark.py scenario                   # 情景网格（逐点计算 vs 广播计算，增量增删腿）
+    python benchmark.py montecarlo                 # 收益型 ETF 蒙特卡洛（逐条路径 vs 向量化，分块与进程池）
+"""
+
+import argparse
+import math
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from income_etf import TRADING_DAYS as ETF_TRADING_DAYS
+from income_etf import MONTH_DAYS, CallWritingRule, MarketModel, apply_rule, simulate
+from implied_vol import MAX_ITERATIONS, MAX_VOL, MIN_VOL, VOL_TOLERANCE, black_scholes, implied_vol
+from option_calculator import MAX_STEPS, YEAR_DAYS, OptionLeg, binomial_american, price_options
+from scenario import TRADING_DAYS, ScenarioGrid
+
+def norm_cdf(x):
+    """标准正态分布的累积分布函数"""
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+def scalar_black_scholes(spot, strike, years, rate, vol, is_call):
+    """欧式期权的 Black-Scholes 价格和 Delta（与 index.html 中的 blackScholes 相同）"""
+    d1 = (math.log(spot / strike) + (rate + 0.5 * vol * vol) * years) / (vol * math.sqrt(years))
+    d2 = d1 - vol * math.sqrt(years)
+    if is_call:
+        return spot * norm_cdf(d1) - strike * math.exp(-rate * years) * norm_cdf(d2), norm_cdf(d1)
+    return strike * math.exp(-rate * years) * norm_cdf(-d2) - spot * norm_cdf(-d1), norm_cdf(d1) - 1
+
+def legacy_american(spot, strike, years, rate, vol, is_call, steps):
+    """逐节点循环的 CRR 二叉树（用于校验）"""
+    dt = years / steps
+    up = math.exp(vol * math.sqrt(dt))
+    down = 1 / up
+    probability = (math.exp(rate * dt) - down) / (up - down)
+    discount = math.exp(-rate * dt)
+    sign = 1 if is_call else -1
+    values = [max(sign * (spot * up ** (2 * j - steps) - strike), 0.0) for j in range(steps + 1)]
+    for i in range(steps - 1, -1, -1):
+        for j in range(i + 1):
+            continuation = discount * (probability * values[j + 1] + (1 - probability) * values[j])
+            values[j] = max(continuation, sign * (spot * up ** (2 * j - i) - strike))
+    return values[0]
+
+def bench_tree(args):
+    """二叉树定价：逐节点循环 vs 按时间步整块倒推（所有腿一次批量计算）"""
+    rng = np.random.default_rng(0)
+    spot, rate = 100.0, 0.05
+    strikes = rng.uniform(80, 120, args.legs).round()
+    years = rng.integers(7, 365, args.legs) / YEAR_DAYS
+    vols = rng.uniform(0.15, 0.6, args.legs)
+    is_call = rng.uniform(size=args.legs) < 0.5
+
+    # 小步数下与逐节点循环逐个比较
+    check_steps = 200
+    batched = binomial_american(spot, strikes, years, rate, vols, is_call, check_steps)[0]
+    start = time.perf_counter()
+    expected = [legacy_american(spot, k, t, rate, v, c, check_steps) for k, t, v, c in zip(strikes, years, vols, is_call)]
+    per_node = (time.perf_counter() - start) / (check_steps * (check_steps + 1) / 2 * args.legs)
+    assert np.allclose(batched, expected, rtol=1e-10, atol=1e-12), "批量二叉树与逐节点循环结果不一致"
+
+    start = time.perf_counter()
+    prices = binomial_american(spot, strikes, years, rate, vols, is_call, args.steps)[0]
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = price_options(spot, strikes, years, rate, vols, is_call, args.steps)
+    with_greeks = time.perf_counter() - start
+    assert np.allclose(result['price'], prices), "计算希腊字母时的价格不一致"
+
+    # 看涨期权（无股息）不会提前行权，应收敛到 Black-Scholes
+    for index in np.flatnonzero(is_call):
+        price, delta = scalar_black_scholes(spot, strikes[index], years[index], rate, vols[index], True)
+        assert abs(prices[index] - price) < 2e-3, "看涨期权价格与 Black-Scholes 不一致"
+        assert abs(result['delta'][index] - delta) < 2e-3, "看涨期权 Delta 与 Black-Scholes 不一致"
+    # 看跌期权的提前行权价值不为负
+    for index in np.flatnonzero(~is_call):
+        assert prices[index] >= scalar_black_scholes(spot, strikes[index], years[index], rate, vols[index], False)[0] - 2e-3
+
+    legacy = per_node * args.steps * (args.steps + 1) / 2 * args.legs
+    print(f"CRR 二叉树，{args.legs} 条腿 × {args.steps} 步，{check_steps} 步时与逐节点循环一致，看涨期权与 Black-Scholes 一致")
+    print(f"逐节点循环（估算） {legacy:9.2f} s   整块倒推 {vectorized * 1000:9.2f} ms   "
+          f"含希腊字母 {with_greeks * 1000:9.2f} ms   加速 {legacy / vectorized:8.1f}x")
+
+def legacy_implied_vol(price, spot, strike, years, rate, is_call):
+    """逐个合约的牛顿迭代加二分（用于对比）"""
+    lo, hi, sigma = MIN_VOL, MAX_VOL, 0.5
+    for _ in range(MAX_ITERATIONS):
+        diff = scalar_black_scholes(spot, strike, years, rate, sigma, is_call)[0] - price
+        d1 = (math.log(spot / strike) + (rate + 0.5 * sigma * sigma) * years) / (sigma * math.sqrt(years))
+        vega = spot * math.exp(-0.5 * d1 * d1) / math.sqrt(2 * math.pi) * math.sqrt(years)
+        if diff > 0:
+            hi = sigma
+        else:
+            lo = sigma
+        newton = sigma - diff / vega if vega > 0 else lo - 1
+        if lo < newton < hi and abs(diff / vega) < VOL_TOLERANCE:
+            return newton
+        if hi - lo < VOL_TOLERANCE:
+            return sigma
+        sigma = newton if lo < newton < hi else 0.5 * (lo + hi)
+    return float('nan')
+
+def bench_iv(args):
+    """隐含波动率：逐个合约求解 vs 整条期权链批量求解（校验反解的波动率还原出原价格）"""
+    rng = np.random.default_rng(0)
+    spot, rate = 100.0, 0.05
+    strikes = rng.uniform(50, 200, args.contracts).round(1)
+    years = rng.integers(1, 730, args.contracts) / YEAR_DAYS
+    vols = rng.uniform(0.05, 1.5, args.contracts)
+    is_call = rng.uniform(size=args.contracts) < 0.5
+    prices = black_scholes(spot, strikes, years, rate, vols, is_call)
+
+    start = time.perf_counter()
+    solved, iterations = implied_vol(prices, spot, strikes, years, rate, is_call)
+    vectorized = time.perf_counter() - start
+
+    ok = ~np.isnan(solved)
+    repriced = black_scholes(spot, strikes[ok], years[ok], rate, solved[ok], is_call[ok])
+    assert np.allclose(repriced, prices[ok], rtol=1e-9, atol=1e-9 * spot), "隐含波动率不能还原期权价格"
+    # 价格对波动率足够敏感（Vega 不过小）的合约应还原出原来的波动率
+    sensitive = black_scholes(spot, strikes, years, rate, vols + 1e-4, is_call) - prices > 1e-6
+    assert ok[sensitive].all() and np.allclose(solved[sensitive], vols[sensitive], atol=1e-6), "隐含波动率不一致"
+
+    sample = np.flatnonzero(sensitive)[:args.sample]
+    start = time.perf_counter()
+    expected = [legacy_implied_vol(prices[i], spot, strikes[i], years[i], rate, is_call[i]) for i in sample]
+    legacy = (time.perf_counter() - start) / len(sample) * args.contracts
+    assert np.allclose(expected, solved[sample], atol=1e-6), "逐个合约求解的结果不一致"
+
+    print(f"隐含波动率，{args.contracts} 个合约，{ok.sum()} 个有解（其余价格与内在价值在浮点精度内相同），"
+          f"平均 {iterations[ok].mean():.1f} 次迭代、最多 {iterations[ok].max()} 次，结果一致")
+    print(f"逐个合约（估算） {legacy * 1000:9.2f} ms   批量求解 {vectorized * 1000:9.2f} ms   "
+          f"{args.contracts / vectorized:,.0f} 个合约/秒   加速 {legacy / vectorized:6.1f}x")
+
+def legacy_business_days(start, end):
+    """逐日循环计算工作日数（index.html 的 getBusinessDays）"""
+    count, current = 0, start
+    while current <= end:
+        if current.weekday() < 5:
+            count += 1
+        current += timedelta(days=1)
+    return count
+
+def legacy_scenario(spot, rate, vol, legs, prices, days, vol_shifts, today):
+    """逐个网格点、逐条腿计算策略价值（用于对比）"""
+    total = np.zeros((len(vol_shifts), len(days), len(prices)))
+    for a, shift in enumerate(vol_shifts):
+        for b, day in enumerate(days):
+            valuation_date = today + timedelta(days=int(day))
+            for leg in legs:
+                years = legacy_business_days(valuation_date, today + timedelta(days=int(leg.days))) / TRADING_DAYS
+                for c, price in enumerate(prices):
+                    if years > 0:
+                        value = scalar_black_scholes(price, leg.strike, years, rate, vol + shift, leg.option_type == 'C')[0]
+                    else:
+                        value = max(price - leg.strike if leg.option_type == 'C' else leg.strike - price, 0.0)
+                    total[a, b, c] += leg.quantity * value
+    return total
+
+def bench_scenario(args):
+    """情景网格：逐点计算 vs 一次广播计算；增量增删腿 vs 重新计算整个策略"""
+    spot, rate, vol, today = 100.0, 0.05, 0.3, date(2025, 5, 30)
+    rng = np.random.default_rng(0)
+    legs = [OptionLeg('C' if rng.uniform() < 0.5 else 'P', float(rng.integers(80, 121)), float(rng.integers(20, 120)),
+                      float(rng.choice([-2, -1, 1, 2]))) for _ in range(args.legs)]
+    prices = np.linspace(spot * 0.7, spot * 1.3, args.points)
+    days = np.arange(0, args.days)
+    vol_shifts = np.linspace(-0.1, 0.1, args.shifts)
+
+    start = time.perf_counter()
+    grid = ScenarioGrid(spot, rate, prices, days, vol_shifts, today)
+    keys = grid.add_legs(legs, vol)
+    vectorized = time.perf_counter() - start
+    points = grid.total.size
+
+    # 逐点计算只在部分价格点上计时并按比例估算
+    sample = slice(0, len(prices), max(len(prices) // 10, 1))
+    start = time.perf_counter()
+    expected = legacy_scenario(spot, rate, vol, legs, prices[sample], days, vol_shifts, today)
+    legacy = (time.perf_counter() - start) / len(prices[sample]) * len(prices)
+    assert np.allclose(grid.total[:, :, sample], expected, rtol=1e-10, atol=1e-10), "情景网格与逐点计算不一致"
+
+    # 增加一条新腿、删除一条原有的腿：只计算新腿的网格
+    extra = OptionLeg('P', 90.0, 45.0, -1.0)
+    start = time.perf_counter()
+    grid.add_leg(extra, vol)
+    grid.remove_leg(keys[0])
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fresh = ScenarioGrid(spot, rate, prices, days, vol_shifts, today)
+    fresh.add_legs(legs[1:] + [extra], vol)
+    recompute = time.perf_counter() - start
+    assert np.allclose(grid.total, fresh.total, atol=1e-9) and np.isclose(grid.cost, fresh.cost), "增量更新与重新计算不一致"
+
+    print(f"情景网格，{args.legs} 条腿，{args.shifts} 个波动率偏移 × {args.days} 天 × {args.points} 个价格（{points} 个网格点），"
+          f"与逐点计算一致，增量更新与重新计算一致")
+    print(f"逐点计算（估算） {legacy:9.2f} s   广播计算 {vectorized * 1000:9.2f} ms   加速 {legacy / vectorized:8.1f}x")
+    print(f"重新计算策略 {recompute * 1000:9.2f} ms   增删一条腿 {incremental * 1000:9.2f} ms")
+
+def legacy_income_etf(log_returns, model, rule):
+    """逐条路径、逐月计算 ETF 与标的收益（用于对比）"""
+    tenor = MONTH_DAYS / ETF_TRADING_DAYS
+    rows = []
+    for path in log_returns:
+        underlying = etf = 1.0
+        previous_vol = None
+        for month in range(len(path) // MONTH_DAYS):
+            days = path[month * MONTH_DAYS:(month + 1) * MONTH_DAYS]
+            growth = math.exp(days.sum())
+            if rule.iv_source == 'realized':
+                iv = (model.sigma if previous_vol is None else previous_vol) * rule.iv_ratio
+                previous_vol = float(np.std(days, ddof=1)) * math.sqrt(ETF_TRADING_DAYS)
+            else:
+                iv = rule.iv
+            premium = rule.coverage * scalar_black_scholes(1.0, 1 + rule.otm, tenor, model.rate, iv, True)[0]
+            assigned = rule.coverage * max(growth - (1 + rule.otm), 0.0)
+            underlying *= growth
+            etf *= growth - assigned - rule.fee * tenor + premium * math.exp(model.rate * tenor)
+        rows.append((underlying - 1, etf - 1))
+    return np.array(rows)
+
+def bench_montecarlo(args):
+    """收益型 ETF 蒙特卡洛：逐条路径循环 vs 向量化；校验分块、进程池下结果可复现"""
+    model = MarketModel(mu=0.15, sigma=0.5, rate=0.045, dof=5)
+    rule = CallWritingRule(otm=0.05, coverage=1.0, iv_source='realized', iv_ratio=1.1)
+    days = args.months * MONTH_DAYS
+
+    rng = np.random.default_rng(0)
+    log_returns = model.sample(rng, args.sample, days)
+    start = time.perf_counter()
+    expected = legacy_income_etf(log_returns, model, rule)
+    legacy = (time.perf_counter() - start) / args.sample * args.paths
+    vectorized = apply_rule(log_returns, model, rule)
+    assert np.allclose(expected[:, 0], vectorized['标的收益']) and np.allclose(expected[:, 1], vectorized['ETF总收益']), \
+        "向量化结果与逐条路径计算不一致"
+
+    start = time.perf_counter()
+    result = simulate(model, rule, args.paths, args.months, seed=42, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    assert result.equals(simulate(model, rule, args.paths, args.months, seed=42, chunk_size=args.chunk_size)), \
+        "相同种子的结果不一致"
+
+    start = time.perf_counter()
+    pooled = simulate(model, rule, args.paths, args.months, seed=42, chunk_size=args.chunk_size, workers=args.workers)
+    pooled_elapsed = time.perf_counter() - start
+    assert result.equals(pooled), "进程池与单进程的结果不一致"
+
+    chunk_mb = min(args.chunk_size, args.paths) * days * 8 / 1024 ** 2
+    print(f"收益型 ETF 蒙特卡洛，{args.paths} 条路径 × {args.months} 个月，每块 {args.chunk_size} 条路径"
+          f"（日收益数组约 {chunk_mb:.1f} MB），与逐条路径计算一致，{args.workers} 个进程结果与单进程相同")
+    print(f"逐条路径（估算） {legacy:9.2f} s   向量化 {elapsed * 1000:9.2f} ms   "
+          f"{args.workers} 个进程 {pooled_elapsed * 1000:9.2f} ms   加速 {legacy / elapsed:8.1f}x")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='期权定价性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    tree = subparsers.add_parser('tree', help='二叉树定价')
+    tree.add_argument('--steps', type=int, default=MAX_STEPS, help='二叉树步数')
+    tree.add_argument('--legs', type=int, default=4, help='期权腿数量')
+    tree.set_defaults(func=bench_tree)
+
+    iv = subparsers.add_parser('iv', help='隐含波动率')
+    iv.add_argument('--contracts', type=int, default=10000, help='合约数量')
+    iv.add_argument('--sample', type=int, default=500, help='逐个合约求解的合约数量')
+    iv.set_defaults(func=bench_iv)
+
+    scenario = subparsers.add_parser('scenario', help='情景网格')
+    scenario.add_argument('--legs', type=int, default=4, help='期权腿数量')
+    scenario.add_argument('--points', type=int, default=201, help='标的价格点数')
+    scenario.add_argument('--days', type=int, default=60, help='经过天数点数')
+    scenario.add_argument('--shifts', type=int, default=5, help='波动率偏移个数')
+    scenario.set_defaults(func=bench_scenario)
+
+    montecarlo = subparsers.add_parser('montecarlo', help='收益型 ETF 蒙特卡洛')
+    montecarlo.add_argument('--paths', type=int, default=50000, help='路径数')
+    montecarlo.add_argument('--months', type=int, default=12, help='月数')
+    montecarlo.add_argument('--chunk-size', type=int, default=5000, help='每块路径数')
+    montecarlo.add_argument('--workers', type=int, default=2, help='进程数')
+    montecarlo.add_argument('--sample', type=int, default=200, help='逐条路径计算的路径数')
+    montecarlo.set_defaults(func=bench_montecarlo)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量隐含波动率求解
+
+对整条期权链（数千个行权价和到期日）一次反解 Black-Scholes 价格：所有合约同时做向量化的牛顿迭代，
+每个合约维护自己的波动率区间 [lo, hi]；牛顿步落在区间外或 Vega 过小时改用区间中点（二分），
+保证收敛。每个合约单独判断是否收敛，已收敛的合约用掩码移出后续迭代，不对合约逐个循环。
+
+用法：
+    python implied_vol.py chain.csv --price 100 --rate 0.05
+    python implied_vol.py chain.csv --price 100 --rate 0.05 --date 2025-05-30 --output chain_iv.csv
+"""
+
+import argparse
+import math
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from option_calculator import YEAR_DAYS
+
+try:
+    from scipy.special import ndtr as norm_cdf
+except ImportError:
+    def norm_cdf(x):
+        """
+        标准正态分布的累积分布函数（未安装 scipy 时使用）
+        Hart (1968) 的有理函数近似，尾部用连分式（West, 2005），绝对误差在双精度舍入误差量级
+        """
+        x = np.asarray(x, dtype=np.float64)
+        a = np.abs(x)
+        exponential = np.exp(-0.5 * a * a)
+        numerator = ((((((3.52624965998911e-02 * a + 0.700383064443688) * a + 6.37396220353165) * a
+                        + 33.912866078383) * a + 112.079291497871) * a + 221.213596169931) * a + 220.206867912376)
+        denominator = (((((((8.83883476483184e-02 * a + 1.75566716318264) * a + 16.064177579207) * a
+                           + 86.7807322029461) * a + 296.564248779674) * a + 637.333633378831) * a
+                         + 793.826512519948) * a + 440.413735824752)
+        fraction = a + 0.65
+        for term in (4.0, 3.0, 2.0, 1.0):
+            fraction = a + term / fraction
+        tail = np.where(a < 7.07106781186547, exponential * numerator / denominator,
+                        exponential / fraction / 2.506628274631)
+        return np.where(x > 0, 1.0 - tail, tail)
+
+# 波动率的搜索区间
+MIN_VOL = 1e-4
+MAX_VOL = 5.0
+
+# 收敛条件：牛顿步长或波动率区间宽度小于此值
+VOL_TOLERANCE = 1e-10
+
+# 最大迭代次数（二分 60 次后区间宽度已小于 VOL_TOLERANCE）
+MAX_ITERATIONS = 100
+
+# Vega 小于此值时不使用牛顿步
+MIN_VEGA = 1e-12
+
+# 期权合约代码（OCC 格式），如 NVDA250620C00100000
+CONTRACT_PATTERN = re.compile(r'^(?P<root>[A-Z.]+)(?P<date>\d{6})(?P<type>[CP])(?P<strike>\d{8})$')
+
+def norm_pdf(x):
+    """标准正态分布的概率密度函数"""
+    return np.exp(-0.5 * x * x) / math.sqrt(2 * math.pi)
+
+def black_scholes(spot, strikes, years, rate, vols, is_call, dividend=0.0):
+    """
+    批量计算欧式期权的 Black-Scholes 价格
+    Args:
+        spot (array-like): 标的价格
+        strikes (array-like): 行权价
+        years (array-like): 到期时间（年）
+        rate (float): 无风险利率（小数）
+        vols (array-like): 波动率（小数）
+        is_call (array-like): True 为看涨、False 为看跌
+        dividend (float): 连续股息率（小数）
+    Returns:
+        np.ndarray: 期权价格
+    """
+    spot, strikes, years, vols, is_call = np.broadcast_arrays(
+        *(np.asarray(values, dtype=np.float64) for values in (spot, strikes, years, vols)), np.asarray(is_call, dtype=bool))
+    return _price_and_vega(spot, strikes, years, vols, rate, is_call, dividend)[0]
+
+def _price_and_vega(spot, strikes, years, vols, rate, is_call, dividend):
+    """Black-Scholes 价格和 Vega（每单位波动率），所有数组形状相同"""
+    sqrt_years = np.sqrt(years)
+    forward_discount, strike_discount = spot * np.exp(-dividend * years), strikes * np.exp(-rate * years)
+    d1 = (np.log(spot / strikes) + (rate - dividend + 0.5 * vols * vols) * years) / (vols * sqrt_years)
+    d2 = d1 - vols * sqrt_years
+    sign = np.where(is_call, 1.0, -1.0)
+    price = sign * (forward_discount * norm_cdf(sign * d1) - strike_discount * norm_cdf(sign * d2))
+    return price, forward_discount * norm_pdf(d1) * sqrt_years
+
+def price_bounds(spot, strikes, years, rate, is_call, dividend=0.0):
+    """
+    欧式期权价格的无套利区间
+    Returns:
+        tuple: (下界, 上界)；价格不在区间内时没有对应的隐含波动率
+    """
+    forward_discount, strike_discount = spot * np.exp(-dividend * years), strikes * np.exp(-rate * years)
+    lower = np.where(is_call, np.maximum(forward_discount - strike_discount, 0.0),
+                     np.maximum(strike_discount - forward_discount, 0.0))
+    return lower, np.where(is_call, forward_discount, strike_discount)
+
+def implied_vol(prices, spot, strikes, years, rate, is_call, dividend=0.0, max_iterations=MAX_ITERATIONS):
+    """
+    批量反解 Black-Scholes 隐含波动率
+    Args:
+        prices (array-like): 期权价格
+        spot (array-like): 标的价格
+        strikes (array-like): 行权价
+        years (array-like): 到期时间（年）
+        rate (float): 无风险利率（小数）
+        is_call (array-like): True 为看涨、False 为看跌
+        dividend (float): 连续股息率（小数）
+        max_iterations (int): 最大迭代次数
+    Returns:
+        tuple: (隐含波动率, 迭代次数)；价格超出无套利区间或未收敛的合约为 NaN
+    """
+    arrays = np.broadcast_arrays(*(np.asarray(values, dtype=np.float64) for values in
+                                   (prices, spot, strikes, years, is_call)))
+    prices, spot, strikes, years, is_call = (np.ravel(values) for values in arrays)
+    is_call = is_call.astype(bool)
+    shape = arrays[0].shape
+    count = len(prices)
+
+    vols = np.full(count, np.nan)
+    iterations = np.zeros(count, dtype=np.int64)
+    lower, upper = price_bounds(spot, strikes, years, rate, is_call, dividend)
+    valid = (years > 0) & (prices > lower) & (prices < upper) & (strikes > 0) & (spot > 0)
+
+    # 只保留有解的合约，之后每次迭代再去掉已收敛的合约
+    active = np.flatnonzero(valid)
+    lo, hi = np.full(len(active), MIN_VOL), np.full(len(active), MAX_VOL)
+    # 初始值：Brenner-Subrahmanyam 近似，限制在搜索区间内
+    guess = np.sqrt(2 * math.pi / years[active]) * prices[active] / spot[active]
+    sigma = np.clip(guess, 0.05, 2.0)
+
+    for iteration in range(1, max_iterations + 1):
+        if not len(active):
+            break
+        price, vega = _price_and_vega(spot[active], strikes[active], years[active], sigma, rate,
+                                      is_call[active], dividend)
+        diff = price - prices[active]
+        # 价格随波动率单调递增：价格偏高时波动率的上界收紧，偏低时下界收紧
+        high = diff > 0
+        hi = np.where(high, sigma, hi)
+        lo = np.where(high, lo, sigma)
+
+        # 牛顿步，落在区间外或 Vega 过小时改用区间中点
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            step = diff / vega
+        newton = sigma - step
+        bisect = (vega < MIN_VEGA) | ~(newton > lo) | ~(newton < hi)
+
+        done = (~bisect & (np.abs(step) < VOL_TOLERANCE)) | (hi - lo < VOL_TOLERANCE)
+        vols[active[done]] = np.where(bisect, sigma, newton)[done]
+        iterations[active[done]] = iteration
+        sigma = np.where(bisect, 0.5 * (lo + hi), newton)
+
+        keep = ~done
+        active, lo, hi, sigma = active[keep], lo[keep], hi[keep], sigma[keep]
+    iterations[active] = max_iterations
+    return vols.reshape(shape), iterations.reshape(shape)
+
+def parse_contract(symbol):
+    """
+    解析 OCC 格式的期权合约代码
+    Returns:
+        tuple: (类型, 到期日, 行权价)，无法解析时返回 None
+    """
+    match = CONTRACT_PATTERN.match(str(symbol).strip().upper())
+    if not match:
+        return None
+    expiration = datetime.strptime(match.group('date'), '%y%m%d')
+    return match.group('type'), expiration, int(match.group('strike')) / 1000
+
+def read_chain(file_path, today=None):
+    """
+    读取期权链 CSV
+    需要的信息及可用的列名（不区分大小写）：
+    - 类型：type / option_type（C/P、call/put），或 contractSymbol（OCC 合约代码）
+    - 行权价：strike，或 contractSymbol
+    - 到期：days（日历日）、expiration / expiry（日期），或 contractSymbol
+    - 价格：price / mid，否则为 bid 和 ask 的中间价，再否则为 lastPrice / last
+    Args:
+        file_path (str): CSV 文件路径
+        today (datetime): 计算到期天数的基准日期，None 表示今天
+    Returns:
+        pd.DataFrame: 原始各列，加上 type、strike、days、price 四列
+    Raises:
+        ValueError: 缺少所需的信息
+    """
+    df = pd.read_csv(file_path)
+    columns = {name.lower(): name for name in df.columns}
+
+    def column(*names):
+        return next((df[columns[name]] for name in names if name in columns), None)
+
+    today = pd.Timestamp(today or datetime.now()).normalize()
+    contracts = column('contractsymbol')
+    parsed = contracts.map(parse_contract) if contracts is not None else None
+
+    option_type = column('type', 'option_type')
+    if option_type is not None:
+        option_type = option_type.astype(str).str.strip().str[0].str.upper()
+    elif parsed is not None:
+        option_type = parsed.map(lambda item: item[0] if item else None)
+
+    strike = column('strike')
+    if strike is None and parsed is not None:
+        strike = parsed.map(lambda item: item[2] if item else np.nan)
+
+    days = column('days', 'dte')
+    if days is None:
+        expiration = column('expiration', 'expiry', 'expiration_date')
+        if expiration is not None:
+            expiration = pd.to_datetime(expiration, errors='coerce')
+        elif parsed is not None:
+            expiration = pd.to_datetime(parsed.map(lambda item: item[1] if item else None))
+        if expiration is not None:
+            days = (expiration - today).dt.days
+
+    price = column('price', 'mid')
+    if price is None:
+        bid, ask = column('bid'), column('ask')
+        if bid is not None and ask is not None:
+            price = (pd.to_numeric(bid, errors='coerce') + pd.to_numeric(ask, errors='coerce')) / 2
+            last = column('lastprice', 'last')
+            # 没有报价时使用最新成交价
+            if last is not None:
+                price = price.where(price > 0, pd.to_numeric(last, errors='coerce'))
+        else:
+            price = column('lastprice', 'last')
+
+    for name, values in (('类型', option_type), ('行权价', strike), ('到期', days), ('价格', price)):
+        if values is None:
+            raise ValueError(f"期权链文件 '{file_path}' 中缺少{name}信息，请参考 read_chain 支持的列名。")
+    result = df.copy()
+    result['type'] = option_type.to_numpy()
+    result['strike'] = pd.to_numeric(strike, errors='coerce').to_numpy()
+    result['days'] = pd.to_numeric(days, errors='coerce').to_numpy()
+    result['price'] = pd.to_numeric(price, errors='coerce').to_numpy()
+    return result
+
+def chain_implied_vol(chain, spot, rate, dividend=0.0):
+    """
+    计算期权链中所有合约的隐含波动率
+    Args:
+        chain (pd.DataFrame): read_chain 的结果
+        spot (float): 标的价格
+        rate (float): 无风险利率（小数）
+        dividend (float): 连续股息率（小数）
+    Returns:
+        pd.DataFrame: 加上 iv 列（无解的合约为 NaN）和 iterations 列
+    """
+    vols, iterations = implied_vol(chain['price'].to_numpy(dtype=np.float64), spot,
+                                   chain['strike'].to_numpy(dtype=np.float64),
+                                   chain['days'].to_numpy(dtype=np.float64) / YEAR_DAYS, rate,
+                                   (chain['type'] == 'C').to_numpy(), dividend)
+    result = chain.copy()
+    result['iv'] = vols
+    result['iterations'] = iterations
+    return result
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='批量隐含波动率求解')
+    parser.add_argument('chain', help='期权链 CSV 文件')
+    parser.add_argument('--price', type=float, required=True, help='标的价格')
+    parser.add_argument('--rate', type=float, required=True, help='无风险利率（小数，如 0.05）')
+    parser.add_argument('--dividend', type=float, default=0.0, help='连续股息率（小数）')
+    parser.add_argument('--date', help='计算到期天数的基准日期（YYYY-MM-DD，默认今天）')
+    parser.add_argument('--output', help='导出带 iv 列的 CSV 文件路径')
+    args = parser.parse_args()
+
+    try:
+        chain = read_chain(args.chain, args.date)
+    except (OSError, ValueError) as e:
+        print(f"错误：{e}")
+        return
+    result = chain_implied_vol(chain, args.price, args.rate, args.dividend)
+
+    solved = result['iv'].notna()
+    print(f"{len(result)} 个合约，{solved.sum()} 个求得隐含波动率，{(~solved).sum()} 个价格超出无套利区间或无法求解")
+    if solved.any():
+        surface = result[solved].pivot_table(index='strike', columns='days', values='iv', aggfunc='mean')
+        print("\n隐含波动率（%，行为行权价，列为到期天数）:")
+        print((surface * 100).round(2).to_string())
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"\nResults exported to '{args.output}'")
+
+if __name__ == '__main__':
+    main()
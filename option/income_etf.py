@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+备兑看涨期权收益型 ETF 与标的的蒙特卡洛比较（如 NVDY 与 NVDA）
+
+模拟大量标的日价格路径；ETF 持有标的，每月按规则卖出一个月期的虚值看涨期权并把权利金作为分红派发。
+比较 ETF 与标的在整个期限内的收益，输出相对收益的分布。
+
+- 所有路径向量化计算：每月的权利金、到期时的行权损失都是整块数组运算
+- 路径分块模拟，内存占用只与块大小有关；各块可以在进程池中并行
+- 每块的随机数由 SeedSequence(seed).spawn() 派生，结果只取决于种子和块大小，与进程数无关
+
+用法：
+    python income_etf.py --paths 50000 --months 12
+    python income_etf.py --sigma 0.5 --otm 0.1 --iv-source realized --workers 4 --output nvdy_sim.csv
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from implied_vol import black_scholes
+
+# 每年交易日数、每月交易日数（卖出的看涨期权期限）
+TRADING_DAYS = 252
+MONTH_DAYS = 21
+
+# 默认的路径数和每块路径数
+DEFAULT_PATHS = 50000
+DEFAULT_CHUNK_SIZE = 5000
+
+# 输出的分位数
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+class MarketModel:
+    """
+    标的价格模型：日对数收益服从正态分布，或（dof 不为 None 时）标准化的 t 分布以体现肥尾
+
+    Attributes:
+        mu (float): 年化预期收益（对数收益的漂移加上 sigma^2 / 2）
+        sigma (float): 年化波动率
+        rate (float): 无风险利率（小数）
+        dof (float): t 分布自由度，None 表示正态分布
+    """
+
+    def __init__(self, mu=0.15, sigma=0.5, rate=0.045, dof=None):
+        self.mu = mu
+        self.sigma = sigma
+        self.rate = rate
+        self.dof = dof
+
+    def sample(self, rng, paths, days):
+        """
+        生成日对数收益
+        Returns:
+            np.ndarray: 形状为 (路径数, 天数)
+        """
+        dt = 1 / TRADING_DAYS
+        if self.dof is None:
+            shocks = rng.standard_normal((paths, days))
+        else:
+            # 标准化为单位方差
+            shocks = rng.standard_t(self.dof, (paths, days)) * np.sqrt((self.dof - 2) / self.dof)
+        return (self.mu - 0.5 * self.sigma ** 2) * dt + self.sigma * np.sqrt(dt) * shocks
+
+class CallWritingRule:
+    """
+    每月卖出看涨期权的规则
+
+    Attributes:
+        otm (float): 行权价相对月初价格的虚值幅度（0.05 即行权价为月初价格的 105%）
+        coverage (float): 卖出期权覆盖的持仓比例
+        iv_source (str): 权利金定价使用的隐含波动率：'fixed' 为固定值 iv，
+                         'realized' 为上个月的已实现波动率 × iv_ratio（第一个月使用模型波动率）
+        iv (float): 固定隐含波动率
+        iv_ratio (float): 隐含波动率相对已实现波动率的倍数
+        fee (float): ETF 年费率
+    """
+
+    def __init__(self, otm=0.05, coverage=1.0, iv_source='fixed', iv=0.5, iv_ratio=1.1, fee=0.0127):
+        self.otm = otm
+        self.coverage = coverage
+        self.iv_source = iv_source
+        self.iv = iv
+        self.iv_ratio = iv_ratio
+        self.fee = fee
+
+def apply_rule(log_returns, model, rule):
+    """
+    对一批路径应用每月卖出看涨期权的规则
+    Args:
+        log_returns (np.ndarray): 日对数收益，形状为 (路径数, 月数 × MONTH_DAYS)
+        model (MarketModel): 价格模型
+        rule (CallWritingRule): 卖出期权的规则
+    Returns:
+        dict: 每条路径的 标的收益、ETF总收益（分红再投资）、ETF价格收益（分红派发）和年化分红率
+    """
+    paths = log_returns.shape[0]
+    daily = log_returns.reshape(paths, -1, MONTH_DAYS)
+    months = daily.shape[1]
+    growth = np.exp(daily.sum(axis=2))                                           # 每月 月末价格 / 月初价格
+
+    if rule.iv_source == 'realized':
+        realized = daily.std(axis=2, ddof=1) * np.sqrt(TRADING_DAYS)
+        iv = np.empty((paths, months))
+        iv[:, 0] = model.sigma
+        iv[:, 1:] = realized[:, :-1]
+        iv *= rule.iv_ratio
+    else:
+        iv = np.full((paths, months), rule.iv)
+
+    # 以月初价格为 1 计算：行权价、权利金和到期时的行权损失都是相对值
+    tenor = MONTH_DAYS / TRADING_DAYS
+    strike = 1 + rule.otm
+    premium = rule.coverage * black_scholes(1.0, strike, tenor, model.rate, iv, True)
+    assigned = rule.coverage * np.maximum(growth - strike, 0.0)
+    fee = rule.fee * tenor
+    price_growth = growth - assigned - fee
+    # 权利金在月内按无风险利率计息，月末派发；总收益假设分红再投资
+    total_growth = price_growth + premium * np.exp(model.rate * tenor)
+
+    return {
+        '标的收益': growth.prod(axis=1) - 1,
+        'ETF总收益': total_growth.prod(axis=1) - 1,
+        'ETF价格收益': price_growth.prod(axis=1) - 1,
+        '年化分红率': premium.mean(axis=1) * 12,
+    }
+
+def _simulate_chunk(task):
+    """模拟一块路径（在进程池中运行）"""
+    seed, paths, months, model, rule = task
+    rng = np.random.default_rng(seed)
+    return apply_rule(model.sample(rng, paths, months * MONTH_DAYS), model, rule)
+
+def simulate(model, rule, paths=DEFAULT_PATHS, months=12, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, workers=1):
+    """
+    分块模拟所有路径
+    Args:
+        model (MarketModel): 价格模型
+        rule (CallWritingRule): 卖出期权的规则
+        paths (int): 路径数
+        months (int): 模拟的月数
+        seed (int): 随机种子
+        chunk_size (int): 每块路径数（决定内存占用）
+        workers (int): 进程数，1 表示在当前进程中依次计算
+    Returns:
+        pd.DataFrame: 每条路径一行，列为 标的收益、ETF总收益、ETF价格收益、年化分红率 和 相对收益
+    """
+    sizes = [min(chunk_size, paths - start) for start in range(0, paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(child, size, months, model, rule) for child, size in zip(seeds, sizes)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_simulate_chunk, tasks))
+    else:
+        chunks = [_simulate_chunk(task) for task in tasks]
+
+    result = pd.DataFrame({key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]})
+    result['相对收益'] = (1 + result['ETF总收益']) / (1 + result['标的收益']) - 1
+    return result
+
+def summarize(result):
+    """
+    收益分布的汇总表
+    Returns:
+        pd.DataFrame: 行为各项收益，列为均值、各分位数和为正的比例
+    """
+    table = result.quantile(list(QUANTILES)).T
+    table.columns = [f'P{int(q * 100)}' for q in QUANTILES]
+    table.insert(0, '均值', result.mean())
+    table['>0 比例'] = (result > 0).mean()
+    return table
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='备兑看涨期权收益型 ETF 与标的的蒙特卡洛比较')
+    parser.add_argument('--paths', type=int, default=DEFAULT_PATHS, help='路径数')
+    parser.add_argument('--months', type=int, default=12, help='模拟的月数')
+    parser.add_argument('--mu', type=float, default=0.15, help='标的年化预期收益')
+    parser.add_argument('--sigma', type=float, default=0.5, help='标的年化波动率')
+    parser.add_argument('--rate', type=float, default=0.045, help='无风险利率')
+    parser.add_argument('--dof', type=float, help='日收益 t 分布的自由度（不指定为正态分布）')
+    parser.add_argument('--otm', type=float, default=0.05, help='看涨期权行权价的虚值幅度')
+    parser.add_argument('--coverage', type=float, default=1.0, help='卖出期权覆盖的持仓比例')
+    parser.add_argument('--iv-source', choices=['fixed', 'realized'], default='fixed',
+                        help='权利金使用的隐含波动率：固定值或上月已实现波动率 × --iv-ratio')
+    parser.add_argument('--iv', type=float, help='固定隐含波动率（默认等于 --sigma）')
+    parser.add_argument('--iv-ratio', type=float, default=1.1, help='隐含波动率相对已实现波动率的倍数')
+    parser.add_argument('--fee', type=float, default=0.0127, help='ETF 年费率')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块路径数')
+    parser.add_argument('--workers', type=int, default=1, help='进程数')
+    parser.add_argument('--output', help='导出每条路径结果的 CSV 文件路径')
+    args = parser.parse_args()
+    if args.dof is not None and args.dof <= 2:
+        parser.error('--dof 应大于 2')
+
+    model = MarketModel(args.mu, args.sigma, args.rate, args.dof)
+    rule = CallWritingRule(args.otm, args.coverage, args.iv_source, args.sigma if args.iv is None else args.iv,
+                           args.iv_ratio, args.fee)
+    start = time.perf_counter()
+    result = simulate(model, rule, args.paths, args.months, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.paths} 条路径 × {args.months} 个月，每月卖出行权价为 {1 + args.otm:.0%} 的看涨期权"
+          f"（覆盖 {args.coverage:.0%}），耗时 {elapsed:.2f} 秒")
+    table = summarize(result)
+    print((table * 100).round(2).astype(str).add('%').to_string())
+    if args.output:
+        result.to_csv(args.output, index=False)
+        print(f"\nResults exported to '{args.output}'")
+
+if __name__ == '__main__':
+    main()
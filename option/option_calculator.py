@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+美式期权策略定价（Cox-Ross-Rubinstein 二叉树）
+
+二叉树以 NumPy 数组表示：每条腿是数组中的一行，倒推时每次处理一整个时间步（所有腿、所有节点），
+而不是逐个节点循环。策略中所有腿（不同类型、行权价、到期日和波动率）在一次调用中一起定价。
+Delta、Gamma、Theta 直接取自同一棵树前两步的节点；Vega、Rho 所需的波动率和利率偏移作为额外的行
+与原始各腿一起倒推，不需要为每个希腊字母单独重新定价。
+
+用法：
+    python option_calculator.py --price 100 --rate 0.05 --vol 0.3 --legs "C,105,30,1" "P,95,30,-1"
+    python option_calculator.py --price 100 --rate 0.05 --vol 0.3 --legs "C,95,30,1" "C,105,30,-1" --steps 5000
+    python option_calculator.py --price 100 --rate 0.05 --vol 0.3      # 交互式输入期权腿
+"""
+
+import argparse
+
+import numpy as np
+
+# 默认二叉树步数
+DEFAULT_STEPS = 1000
+
+# 允许的最大步数
+MAX_STEPS = 5000
+
+# 每年天数（到期天数按日历日计算）
+YEAR_DAYS = 365
+
+# 每张合约对应的股数
+CONTRACT_SIZE = 100
+
+# 计算 Vega（中心差分）和 Rho（前向差分，利率不改变树的节点，价格随利率变化平滑）时的偏移量
+VOL_BUMP = 0.01
+RATE_BUMP = 0.0001
+
+# 到期时间的下限（年），已到期的腿按内在价值计算
+MIN_YEARS = 1e-8
+
+GREEKS = ('delta', 'gamma', 'theta', 'vega', 'rho')
+
+class OptionLeg:
+    """
+    期权策略中的一条腿
+
+    Attributes:
+        option_type (str): 'C' 看涨或 'P' 看跌
+        strike (float): 行权价
+        days (float): 到期天数（日历日）
+        quantity (float): 数量，正数为买入、负数为卖出
+        vol (float): 该腿的波动率，None 表示使用统一的波动率
+    """
+
+    def __init__(self, option_type, strike, days, quantity=1, vol=None):
+        self.option_type = option_type
+        self.strike = strike
+        self.days = days
+        self.quantity = quantity
+        self.vol = vol
+
+    @property
+    def name(self):
+        """腿的名称，如 'C 105 30d'"""
+        return f'{self.option_type} {self.strike:g} {self.days:g}d'
+
+def parse_leg(text):
+    """
+    解析期权腿，格式为 "类型(C/P),行权价,到期天数,数量[,波动率]"
+    Raises:
+        ValueError: 格式无法识别
+    """
+    parts = [part.strip() for part in text.split(',')]
+    if len(parts) not in (4, 5) or parts[0].upper() not in ('C', 'P'):
+        raise ValueError(f"无法解析期权腿：{text}，格式应为 类型(C/P),行权价,到期天数,数量[,波动率]")
+    vol = float(parts[4]) if len(parts) == 5 else None
+    return OptionLeg(parts[0].upper(), float(parts[1]), float(parts[2]), float(parts[3]), vol)
+
+def binomial_american(spot, strikes, years, rate, vols, is_call, steps=DEFAULT_STEPS, dividend=0.0):
+    """
+    CRR 二叉树批量计算美式期权价格，同时返回前两步的节点
+    所有参数按 NumPy 规则广播为一维数组，每个元素是一行（一个期权），每行使用各自的时间步长、
+    上涨/下跌幅度和风险中性概率；倒推时每次用整块数组运算处理一个时间步
+    Args:
+        spot (float): 标的价格
+        strikes (array-like): 行权价
+        years (array-like): 到期时间（年）
+        rate (array-like): 无风险利率（小数）
+        vols (array-like): 波动率（小数）
+        is_call (array-like): True 为看涨、False 为看跌
+        steps (int): 二叉树步数
+        dividend (float): 连续股息率（小数）
+    Returns:
+        tuple: (价格, 第 1 步的 (股价, 期权价值), 第 2 步的 (股价, 期权价值), 时间步长)；
+               第 1、2 步的数组形状为 (期权数, 2) 和 (期权数, 3)
+    """
+    if not 2 <= steps <= MAX_STEPS:
+        raise ValueError(f"二叉树步数应在 2 到 {MAX_STEPS} 之间：{steps}")
+    strikes, years, rate, vols, is_call = (np.ravel(values) for values in
+                                           np.broadcast_arrays(strikes, years, rate, vols, is_call))
+    years = np.maximum(years.astype(np.float64), MIN_YEARS)
+    dt = years / steps
+    up = np.exp(vols * np.sqrt(dt))
+    growth = np.exp((rate - dividend) * dt)
+    probability = (growth - 1 / up) / (up - 1 / up)
+    discount = np.exp(-rate * dt)
+    # 列向量，与 (期权数, 节点数) 的数组广播
+    p_up, p_down = (discount * probability)[:, None], (discount * (1 - probability))[:, None]
+    up, strike, sign = up[:, None], strikes[:, None].astype(np.float64), np.where(is_call, 1.0, -1.0)[:, None]
+
+    # 第 i 步第 j 个节点的股价为 S * u^(2j - i)，即 S * u^k（k = -N..N）中从 N - i 开始、间隔为 2 的切片；
+    # 提前行权价值只与股价有关，预先对所有 k 计算一次，倒推时直接取切片
+    powers = np.arange(-steps, steps + 1)
+    prices = spot * np.exp(np.log(up) * powers)
+    exercise = sign * (prices - strike)
+    values = np.maximum(exercise[:, ::2], 0.0)
+    buffer, weighted = np.empty_like(values), np.empty_like(values)
+
+    step1 = step2 = None
+    for i in range(steps - 1, -1, -1):
+        # 两个缓冲区交替使用，避免输入输出重叠时 NumPy 额外复制
+        value, down = buffer[:, :i + 1], weighted[:, :i + 1]
+        np.multiply(values[:, :i + 1], p_down, out=value)
+        np.multiply(values[:, 1:i + 2], p_up, out=down)
+        value += down
+        np.maximum(value, exercise[:, steps - i:steps + i + 1:2], out=value)
+        values, buffer = buffer, values
+        if i == 2:
+            step2 = (prices[:, steps - 2:steps + 3:2].copy(), value.copy())
+        elif i == 1:
+            step1 = (prices[:, steps - 1:steps + 2:2].copy(), value.copy())
+    return values[:, 0].copy(), step1, step2, dt
+
+def tree_greeks(price, step1, step2, dt):
+    """
+    由二叉树前两步的节点计算 Delta、Gamma 和 Theta（不重新定价）
+    Returns:
+        dict: delta、gamma 和 theta（每个日历日）
+    """
+    (s1, v1), (s2, v2) = step1, step2
+    delta = (v1[:, 1] - v1[:, 0]) / (s1[:, 1] - s1[:, 0])
+    delta_up = (v2[:, 2] - v2[:, 1]) / (s2[:, 2] - s2[:, 1])
+    delta_down = (v2[:, 1] - v2[:, 0]) / (s2[:, 1] - s2[:, 0])
+    gamma = (delta_up - delta_down) / ((s2[:, 2] - s2[:, 0]) / 2)
+    # 第 2 步的中间节点股价与当前股价相同，两者之差为 2 个时间步的时间价值变化
+    theta = (v2[:, 1] - price) / (2 * dt) / YEAR_DAYS
+    return {'delta': delta, 'gamma': gamma, 'theta': theta}
+
+def price_options(spot, strikes, years, rate, vols, is_call, steps=DEFAULT_STEPS, dividend=0.0, greeks=True):
+    """
+    批量计算美式期权价格和希腊字母（一次倒推）
+    Vega、Rho 的波动率/利率偏移作为额外的行与原始期权一起倒推，Delta、Gamma、Theta 取自原始期权的树
+    Args:
+        spot (float): 标的价格
+        strikes (array-like): 行权价
+        years (array-like): 到期时间（年）
+        rate (float): 无风险利率（小数）
+        vols (array-like): 波动率（小数）
+        is_call (array-like): True 为看涨、False 为看跌
+        steps (int): 二叉树步数
+        dividend (float): 连续股息率（小数）
+        greeks (bool): 是否计算希腊字母
+    Returns:
+        dict: price 以及（greeks 为 True 时）delta、gamma、theta（每日）、vega（每 1% 波动率）、
+              rho（每 1% 利率），每项都是与广播后的输入等长的一维数组
+    """
+    strikes, years, vols, is_call = (np.ravel(values) for values in np.broadcast_arrays(strikes, years, vols, is_call))
+    count = len(strikes)
+    if not greeks:
+        return {'price': binomial_american(spot, strikes, years, rate, vols, is_call, steps, dividend)[0]}
+
+    # 行的排列：原始、波动率 +/-、利率 +
+    down_vols = np.maximum(vols - VOL_BUMP, VOL_BUMP / 2)
+    rows_vol = np.concatenate([vols, vols + VOL_BUMP, down_vols, vols])
+    rows_rate = np.concatenate([np.full(3 * count, rate), np.full(count, rate + RATE_BUMP)])
+    values, step1, step2, dt = binomial_american(spot, np.tile(strikes, 4), np.tile(years, 4), rows_rate, rows_vol,
+                                                 np.tile(is_call, 4), steps, dividend)
+    base, vol_up, vol_down, rate_up = values.reshape(4, count)
+    own = slice(0, count)
+    result = {'price': base}
+    result.update(tree_greeks(base, (step1[0][own], step1[1][own]), (step2[0][own], step2[1][own]), dt[own]))
+    result['vega'] = (vol_up - vol_down) / ((vols + VOL_BUMP) - down_vols) / 100
+    result['rho'] = (rate_up - base) / RATE_BUMP / 100
+    return result
+
+def price_strategy(spot, rate, vol, legs, steps=DEFAULT_STEPS, dividend=0.0):
+    """
+    计算期权策略中每条腿的价格和希腊字母（所有腿一次批量定价）
+    Args:
+        spot (float): 标的价格
+        rate (float): 无风险利率（小数）
+        vol (float): 波动率（小数），腿上指定了波动率时使用腿的波动率
+        legs (list): OptionLeg 列表
+        steps (int): 二叉树步数
+        dividend (float): 连续股息率（小数）
+    Returns:
+        tuple: (每条腿的结果字典, 数量加权后的策略合计)；合计为每股数值
+    """
+    result = price_options(
+        spot,
+        np.array([leg.strike for leg in legs], dtype=np.float64),
+        np.array([leg.days / YEAR_DAYS for leg in legs], dtype=np.float64),
+        rate,
+        np.array([vol if leg.vol is None else leg.vol for leg in legs], dtype=np.float64),
+        np.array([leg.option_type == 'C' for leg in legs]),
+        steps, dividend)
+    quantities = np.array([leg.quantity for leg in legs], dtype=np.float64)
+    rows = [{key: float(values[index]) for key, values in result.items()} for index in range(len(legs))]
+    total = {key: float(np.dot(quantities, values)) for key, values in result.items()}
+    return rows, total
+
+def plot_payoff(spot, legs, rows, total, output_file):
+    """
+    绘制策略到期时的盈亏图
+    Args:
+        spot (float): 标的价格
+        legs (list): OptionLeg 列表
+        rows (list): price_strategy 返回的每条腿的结果
+        total (dict): price_strategy 返回的策略合计
+        output_file (str): 图片文件路径
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("未安装 matplotlib，无法绘制盈亏图")
+        return
+
+    prices = np.linspace(spot * 0.5, spot * 1.5, 201)
+    payoff = np.zeros_like(prices)
+    for leg in legs:
+        intrinsic = prices - leg.strike if leg.option_type == 'C' else leg.strike - prices
+        payoff += leg.quantity * np.maximum(intrinsic, 0.0)
+    profit = payoff - total['price']
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(prices, profit, color='tab:blue')
+    ax.axhline(0, color='gray', linewidth=0.8)
+    ax.axvline(spot, color='gray', linestyle='--', linewidth=0.8)
+    ax.set_xlabel('Underlying Price at Expiration')
+    ax.set_ylabel('Profit / Loss per Share')
+    ax.set_title(' + '.join(f'{leg.quantity:+g} {leg.name}' for leg in legs))
+    ax.grid(True, alpha=0.3)
+    fig.savefig(output_file, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    print(f"盈亏图已保存到 '{output_file}'")
+
+def input_legs():
+    """交互式输入期权腿，空行结束"""
+    print("请输入期权腿，格式为 类型(C/P),行权价,到期天数,数量[,波动率]，空行结束：")
+    legs = []
+    while True:
+        text = input(f"腿 {len(legs) + 1}: ").strip()
+        if not text:
+            return legs
+        try:
+            legs.append(parse_leg(text))
+        except ValueError as e:
+            print(f"错误：{e}")
+
+def print_strategy(legs, rows, total):
+    """打印每条腿和策略合计的价格与希腊字母"""
+    header = f"{'腿':<16}{'数量':>8}{'价格':>12}" + ''.join(f'{greek:>12}' for greek in GREEKS)
+    print(header)
+    for leg, row in zip(legs, rows):
+        print(f"{leg.name:<16}{leg.quantity:>8g}{row['price']:>12.4f}" +
+              ''.join(f"{row[greek]:>12.4f}" for greek in GREEKS))
+    print(f"{'策略合计':<16}{'':>8}{total['price']:>12.4f}" + ''.join(f"{total[greek]:>12.4f}" for greek in GREEKS))
+    print(f"\n策略价格（每股）：{total['price']:.4f}，每张合约 {CONTRACT_SIZE} 股：{total['price'] * CONTRACT_SIZE:.2f}")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='美式期权策略定价（CRR 二叉树）')
+    parser.add_argument('--price', type=float, required=True, help='标的价格')
+    parser.add_argument('--rate', type=float, required=True, help='无风险利率（小数，如 0.05）')
+    parser.add_argument('--vol', type=float, required=True, help='波动率（小数，如 0.3）')
+    parser.add_argument('--legs', nargs='+', help='期权腿，格式为 "类型(C/P),行权价,到期天数,数量[,波动率]"')
+    parser.add_argument('--dividend', type=float, default=0.0, help='连续股息率（小数）')
+    parser.add_argument('--steps', type=int, default=DEFAULT_STEPS, help=f'二叉树步数（不超过 {MAX_STEPS}）')
+    parser.add_argument('--plot', metavar='FILE', help='保存到期盈亏图的文件路径')
+    args = parser.parse_args()
+    if not 2 <= args.steps <= MAX_STEPS:
+        parser.error(f'--steps 应在 2 到 {MAX_STEPS} 之间')
+
+    if args.legs:
+        try:
+            legs = [parse_leg(text) for text in args.legs]
+        except ValueError as e:
+            parser.error(str(e))
+    else:
+        legs = input_legs()
+    if not legs:
+        print("没有输入期权腿")
+        return
+
+    rows, total = price_strategy(args.price, args.rate, args.vol, legs, args.steps, args.dividend)
+    print_strategy(legs, rows, total)
+    if args.plot:
+        plot_payoff(args.price, legs, rows, total, args.plot)
+
+if __name__ == '__main__':
+    main()
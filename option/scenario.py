@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+期权策略情景分析
+
+在 标的价格 × 经过天数（× 波动率偏移）的网格上计算策略价值和盈亏。每条腿的整张网格由一次
+广播的 Black-Scholes 计算得到（与 index.html 相同的定价模型），并按合约缓存：增加或删除一条腿时
+只计算新腿的网格，策略合计按数量增量加减，不重新计算其他腿。
+
+剩余到期时间沿用 index.html 的 getBusinessDays：从估值日到到期日（含两端）的工作日数 / 252。
+
+用法：
+    python scenario.py --price 100 --rate 0.05 --vol 0.3 --legs "C,95,30,1" "C,105,30,-1"
+    python scenario.py --price 100 --rate 0.05 --vol 0.3 --legs "C,105,60,1" "P,95,30,-1" \\
+        --days 0,10,20,30 --vol-shifts=-0.05,0,0.05 --output scenario.csv --plot scenario.png
+"""
+
+import argparse
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from implied_vol import black_scholes
+from option_calculator import CONTRACT_SIZE, parse_leg
+
+# 每年交易日数（与 index.html 相同）
+TRADING_DAYS = 252
+
+# 默认价格范围（相对当前标的价格）和价格点数
+DEFAULT_PRICE_RANGE = (0.7, 1.3)
+DEFAULT_PRICE_POINTS = 121
+
+# 默认的经过天数点数（从今天到最早到期日均匀分布）
+DEFAULT_DAY_POINTS = 5
+
+def business_days(start, end):
+    """
+    从 start 到 end（含两端）的工作日数，与 index.html 的 getBusinessDays 相同；end 早于 start 时为 0
+    Args:
+        start (array-like): 开始日期（datetime64[D] 或可转换的值）
+        end (array-like): 结束日期
+    Returns:
+        np.ndarray: 工作日数
+    """
+    start = np.asarray(start, dtype='datetime64[D]')
+    end = np.asarray(end, dtype='datetime64[D]')
+    return np.maximum(np.busday_count(start, end + np.timedelta64(1, 'D')), 0)
+
+def leg_key(leg, vol):
+    """缓存网格的键：定价只与类型、行权价、到期日和波动率有关，与数量无关"""
+    return leg.option_type, float(leg.strike), float(leg.days), float(vol)
+
+class ScenarioGrid:
+    """
+    策略的情景网格
+
+    网格形状为 (波动率偏移, 经过天数, 标的价格)。每条腿按单位数量计算的网格缓存在 grids 中，
+    策略合计 total 在增加/删除腿时增量更新。
+
+    Attributes:
+        spot (float): 当前标的价格
+        rate (float): 无风险利率（小数）
+        prices (np.ndarray): 标的价格轴
+        days (np.ndarray): 经过天数轴（从今天起的日历日）
+        vol_shifts (np.ndarray): 波动率偏移轴（小数，加到每条腿的波动率上）
+        today (np.datetime64): 今天
+        dividend (float): 连续股息率（小数）
+        positions (list): (键, 数量, 腿) 列表
+        grids (dict): 键到单位数量网格的缓存
+        total (np.ndarray): 策略价值网格（每股）
+        cost (float): 策略当前价格（每股），用于计算盈亏
+    """
+
+    def __init__(self, spot, rate, prices, days, vol_shifts=(0.0,), today=None, dividend=0.0):
+        self.spot = spot
+        self.rate = rate
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.days = np.asarray(days, dtype=np.int64)
+        self.vol_shifts = np.asarray(vol_shifts, dtype=np.float64)
+        self.today = np.datetime64(today or date.today(), 'D')
+        self.dividend = dividend
+        self.positions = []
+        self.grids = {}
+        self.total = np.zeros(self.shape)
+        self.cost = 0.0
+
+    @property
+    def shape(self):
+        """网格形状 (波动率偏移, 经过天数, 标的价格)"""
+        return len(self.vol_shifts), len(self.days), len(self.prices)
+
+    @property
+    def dates(self):
+        """经过天数对应的估值日期"""
+        return self.today + self.days.astype('timedelta64[D]')
+
+    def years_to_expiry(self, leg, valuation_dates):
+        """腿在各估值日的剩余到期时间（年）：工作日数 / 252"""
+        expiration = self.today + np.timedelta64(int(leg.days), 'D')
+        return business_days(valuation_dates, expiration) / TRADING_DAYS
+
+    def _compute(self, legs, vols):
+        """
+        一次广播计算多条腿的单位数量网格和当前价格
+        Returns:
+            tuple: (形状为 (腿数, 波动率偏移, 经过天数, 标的价格) 的网格, 每条腿的当前价格)
+        """
+        years = np.array([self.years_to_expiry(leg, self.dates) for leg in legs])            # (L, D)
+        strikes = np.array([leg.strike for leg in legs], dtype=np.float64)
+        is_call = np.array([leg.option_type == 'C' for leg in legs])
+        leg_vols = np.maximum(np.asarray(vols, dtype=np.float64)[:, None] + self.vol_shifts, 1e-6)  # (L, V)
+
+        # 已到期（剩余工作日为 0）的腿按内在价值计算，定价时用 1 年占位避免除以 0
+        grids = black_scholes(self.prices[None, None, None, :], strikes[:, None, None, None],
+                              np.where(years > 0, years, 1.0)[:, None, :, None], self.rate, leg_vols[:, :, None, None],
+                              is_call[:, None, None, None], self.dividend)
+        intrinsic = np.maximum(np.where(is_call[:, None], 1.0, -1.0) * (self.prices - strikes[:, None]), 0.0)
+        grids = np.where(years[:, None, :, None] > 0, grids, intrinsic[:, None, None, :])
+
+        now = np.array([float(self.years_to_expiry(leg, self.today)) for leg in legs])
+        cost = black_scholes(self.spot, strikes, np.where(now > 0, now, 1.0), self.rate, np.asarray(vols, dtype=np.float64), is_call,
+                             self.dividend)
+        cost = np.where(now > 0, cost, np.maximum(np.where(is_call, 1.0, -1.0) * (self.spot - strikes), 0.0))
+        return grids, cost
+
+    def add_legs(self, legs, vol):
+        """
+        增加多条腿；缓存中没有的合约在一次广播计算中得到网格，策略合计增量更新
+        Args:
+            legs (list): OptionLeg 列表
+            vol (float): 默认波动率（腿上指定了波动率时使用腿的波动率）
+        Returns:
+            list: 每条腿的键，用于 remove_leg
+        """
+        vols = [vol if leg.vol is None else leg.vol for leg in legs]
+        keys = [leg_key(leg, leg_vol) for leg, leg_vol in zip(legs, vols)]
+        missing = {}
+        for key, leg, leg_vol in zip(keys, legs, vols):
+            if key not in self.grids and key not in missing:
+                missing[key] = (leg, leg_vol)
+        if missing:
+            grids, costs = self._compute([leg for leg, _ in missing.values()], [leg_vol for _, leg_vol in missing.values()])
+            for key, grid, cost in zip(missing, grids, costs):
+                self.grids[key] = (grid, float(cost))
+        for key, leg in zip(keys, legs):
+            grid, cost = self.grids[key]
+            self.total += leg.quantity * grid
+            self.cost += leg.quantity * cost
+            self.positions.append((key, leg.quantity, leg))
+        return keys
+
+    def add_leg(self, leg, vol):
+        """增加一条腿，返回其键"""
+        return self.add_legs([leg], vol)[0]
+
+    def remove_leg(self, key):
+        """
+        删除一条腿（键相同时删除最后加入的一条），策略合计增量更新；网格保留在缓存中
+        Raises:
+            KeyError: 策略中没有该腿
+        """
+        for index in range(len(self.positions) - 1, -1, -1):
+            position_key, quantity, _ = self.positions[index]
+            if position_key == key:
+                grid, cost = self.grids[key]
+                self.total -= quantity * grid
+                self.cost -= quantity * cost
+                del self.positions[index]
+                return
+        raise KeyError(key)
+
+    def profit(self):
+        """盈亏网格（每股）：策略价值 - 当前价格"""
+        return self.total - self.cost
+
+    def series(self):
+        """
+        导出绘图用的数据序列
+        Returns:
+            pd.DataFrame: 长表，列为 波动率偏移、经过天数、日期、标的价格、策略价值、盈亏（每股）
+                          和每张合约的盈亏
+        """
+        shifts, days, prices = np.meshgrid(self.vol_shifts, self.days, self.prices, indexing='ij')
+        dates = np.broadcast_to(self.dates[None, :, None], self.shape)
+        profit = self.profit()
+        return pd.DataFrame({
+            '波动率偏移': shifts.ravel(),
+            '经过天数': days.ravel(),
+            '日期': pd.to_datetime(dates.ravel()),
+            '标的价格': prices.ravel(),
+            '策略价值': self.total.ravel(),
+            '盈亏': profit.ravel(),
+            '每张合约盈亏': profit.ravel() * CONTRACT_SIZE,
+        })
+
+def default_days(legs, points=DEFAULT_DAY_POINTS):
+    """默认的经过天数轴：从今天到最早到期日均匀取点"""
+    first_expiry = int(min(leg.days for leg in legs))
+    return np.unique(np.linspace(0, first_expiry, points).round().astype(int))
+
+def plot_scenario(grid, output_file, shift_index=None):
+    """
+    绘制各估值日的盈亏曲线
+    Args:
+        grid (ScenarioGrid): 情景网格
+        output_file (str): 图片文件路径
+        shift_index (int): 使用的波动率偏移，None 表示偏移为 0 的一组（没有时取第一组）
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("未安装 matplotlib，无法绘制盈亏图")
+        return
+
+    if shift_index is None:
+        zero = np.flatnonzero(np.isclose(grid.vol_shifts, 0))
+        shift_index = int(zero[0]) if len(zero) else 0
+    profit = grid.profit()[shift_index]
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for day, valuation_date, values in zip(grid.days, grid.dates, profit):
+        ax.plot(grid.prices, values, label=f'+{day}d ({valuation_date})')
+    ax.axhline(0, color='gray', linewidth=0.8)
+    ax.axvline(grid.spot, color='gray', linestyle='--', linewidth=0.8)
+    ax.set_xlabel('Underlying Price')
+    ax.set_ylabel('Profit / Loss per Share')
+    ax.set_title(f'Strategy P/L (vol shift {grid.vol_shifts[shift_index]:+.0%})')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+    fig.savefig(output_file, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    print(f"盈亏图已保存到 '{output_file}'")
+
+def parse_floats(text):
+    """解析逗号分隔的数字"""
+    return [float(part) for part in text.split(',')]
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='期权策略情景分析')
+    parser.add_argument('--price', type=float, required=True, help='标的价格')
+    parser.add_argument('--rate', type=float, required=True, help='无风险利率（小数，如 0.05）')
+    parser.add_argument('--vol', type=float, required=True, help='波动率（小数，如 0.3）')
+    parser.add_argument('--legs', nargs='+', required=True, help='期权腿，格式为 "类型(C/P),行权价,到期天数,数量[,波动率]"')
+    parser.add_argument('--dividend', type=float, default=0.0, help='连续股息率（小数）')
+    parser.add_argument('--price-range', type=parse_floats, default=list(DEFAULT_PRICE_RANGE),
+                        help='标的价格范围（相对当前价格），如 0.7,1.3')
+    parser.add_argument('--points', type=int, default=DEFAULT_PRICE_POINTS, help='标的价格点数')
+    parser.add_argument('--days', type=lambda text: [int(value) for value in parse_floats(text)],
+                        help='经过天数（日历日），逗号分隔，默认从今天到最早到期日均匀取点')
+    parser.add_argument('--vol-shifts', type=parse_floats, default=[0.0], help='波动率偏移（小数），逗号分隔')
+    parser.add_argument('--date', help='今天的日期（YYYY-MM-DD，默认今天）')
+    parser.add_argument('--output', help='导出数据序列的 CSV 文件路径')
+    parser.add_argument('--plot', metavar='FILE', help='保存盈亏图的文件路径')
+    args = parser.parse_args()
+
+    try:
+        legs = [parse_leg(text) for text in args.legs]
+    except ValueError as e:
+        parser.error(str(e))
+    today = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+    low, high = args.price_range
+    grid = ScenarioGrid(args.price, args.rate, np.linspace(args.price * low, args.price * high, args.points),
+                        args.days if args.days else default_days(legs), args.vol_shifts, today, args.dividend)
+    grid.add_legs(legs, args.vol)
+
+    print(f"策略当前价格（每股）：{grid.cost:.4f}，网格 {' × '.join(str(size) for size in grid.shape)}"
+          f"（波动率偏移 × 经过天数 × 标的价格）")
+    # 每个估值日在几个代表性价格上的盈亏
+    columns = np.unique(np.linspace(0, len(grid.prices) - 1, 7).round().astype(int))
+    for shift, profit in zip(grid.vol_shifts, grid.profit()):
+        table = pd.DataFrame(profit[:, columns], columns=[f'{price:.2f}' for price in grid.prices[columns]],
+                             index=[f'+{day}d {valuation_date}' for day, valuation_date in zip(grid.days, grid.dates)])
+        print(f"\n波动率偏移 {shift:+.2%} 的盈亏（每股，列为标的价格）:")
+        print(table.round(4).to_string())
+
+    if args.output:
+        grid.series().to_csv(args.output, index=False)
+        print(f"\nResults exported to '{args.output}'")
+    if args.plot:
+        plot_scenario(grid, args.plot)
+
+if __name__ == '__main__':
+    main()
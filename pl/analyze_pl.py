@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+通用的每日涨跌幅（P/L）阈值统计工具
+统计每只股票每一年中 P/L 大于 +t、小于 -t 的天数，一次处理任意多个 CSV 或缓存中的股票
+
+用法：
+    python analyze_pl.py ../spx/"SPX 20240308-20250308.csv"
+    python analyze_pl.py a.csv b.csv --thresholds 1,1.5,2,3 --output-dir output
+    python analyze_pl.py --symbols NVDA GOOGL --years 10      # 由行情缓存的收盘价计算 P/L
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+from pl_analyzer import DEFAULT_THRESHOLDS, count_frame_thresholds, report_directional, threshold_label
+from pl_data import PRICE_COLUMNS, create_fetcher, load_cached_pl, read_pl_csv, symbol_from_path
+
+def parse_thresholds(text):
+    """解析逗号分隔的百分比阈值，如 '1,1.5,2' -> (0.01, 0.015, 0.02)"""
+    return tuple(float(part) / 100 for part in text.split(','))
+
+def load_symbols(path):
+    """从文本文件读取股票列表（每行一个代码，# 开头为注释）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='每日涨跌幅阈值统计')
+    parser.add_argument('files', nargs='*', help='包含 Date 和 P/L 列的 CSV 文件')
+    parser.add_argument('--symbols', nargs='+', default=[], help='由行情缓存计算 P/L 的股票代码')
+    parser.add_argument('--symbols-file', help='股票列表文件（每行一个代码）')
+    parser.add_argument('--years', type=int, default=5, help='由行情计算 P/L 时的年数')
+    parser.add_argument('--price', choices=list(PRICE_COLUMNS), default='auto',
+                        help='由行情计算 P/L 使用的价格：auto（优先复权收盘价）、adj 或 close')
+    parser.add_argument('--cache-dir', help='行情缓存目录（默认与 ema 工具共用 ema/data_cache）')
+    parser.add_argument('--cache-backend', default='feather', help='行情缓存格式，与 ema 工具的 cache.backend 一致')
+    parser.add_argument('--thresholds', type=parse_thresholds,
+                        default=DEFAULT_THRESHOLDS,
+                        help='百分比阈值，逗号分隔（默认 ' +
+                             ','.join(threshold_label(t) for t in DEFAULT_THRESHOLDS) + '）')
+    parser.add_argument('--column', default='P/L', help='P/L 列名')
+    parser.add_argument('--output-dir', help='导出 {代码}_pl_analysis_directional.csv 的目录')
+    parser.add_argument('--quiet', action='store_true', help='不打印每只股票的表格')
+    args = parser.parse_args()
+    symbols = args.symbols + (load_symbols(args.symbols_file) if args.symbols_file else [])
+    if not args.files and not symbols:
+        parser.error('需要指定 CSV 文件或 --symbols / --symbols-file')
+
+    start = time.perf_counter()
+    frames = {}
+    if symbols:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=365 * args.years)
+        frames.update(load_cached_pl(symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                                     args.price, create_fetcher(args.cache_dir, args.cache_backend)))
+    for file_path in args.files:
+        try:
+            frames[symbol_from_path(file_path)] = read_pl_csv(file_path, args.column)
+        except ValueError as e:
+            print(f"错误：{e}")
+    if not frames:
+        return
+    loaded = time.perf_counter()
+
+    counts = count_frame_thresholds(frames, args.thresholds)
+    counted = time.perf_counter()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for symbol in counts.symbols:
+        output_csv = (os.path.join(args.output_dir, f'{symbol.lower()}_pl_analysis_directional.csv')
+                      if args.output_dir else None)
+        if args.quiet:
+            if output_csv:
+                counts.table(symbol).to_csv(output_csv)
+            continue
+        report_directional(counts, symbol, output_csv, title=f"{symbol} P/L Analysis:")
+        print()
+
+    print(f"{len(frames)} 只股票：读取 {loaded - start:.3f} 秒，统计 {counted - loaded:.3f} 秒")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+P/L 分析性能基准测试
+使用合成的多股票日涨跌幅数据对比原脚本的逐年份、逐阈值循环与向量化统计，并校验结果一致
+
+用法：
+    python benchmark.py thresholds                          # 阈值统计
+    python benchmark.py thresholds --symbols 500 --years 30 # 指定股票数量和年数
+    python benchmark.py ingest                              # CSV 读取（逐行解析日期 vs 抽样检测格式）
+    python benchmark.py cache                               # 由行情缓存批量计算 P/L 并统计
+    python benchmark.py pairs                               # 杠杆 ETF 配对分析（逐窗口循环 vs 累计对数收益）
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from pl_analyzer import DEFAULT_THRESHOLDS, count_frame_thresholds, threshold_label
+from pairs import DEFAULT_WINDOWS, align_pair, analyze_pair
+from pl_data import SPREADSHEET_ERRORS, create_fetcher, load_cached_pl, parse_date, read_pl_csv
+
+def make_sample_frames(symbols=100, years=10, seed=0):
+    """
+    生成合成的每日 P/L 数据（少量缺失值）
+    Returns:
+        dict: 股票代码到包含 Date 和 P/L 列的 DataFrame 的字典
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-05-30', periods=252 * years)
+    frames = {}
+    for index in range(symbols):
+        pl = rng.standard_t(4, len(dates)) * rng.uniform(0.005, 0.03)
+        pl[rng.uniform(size=len(dates)) < 0.001] = np.nan
+        frames[f'S{index:04d}'] = pd.DataFrame({'Date': dates, 'P/L': pl})
+    return frames
+
+def legacy_table(df, thresholds):
+    """原 analyze_pl.py 的统计流程：逐年份、逐阈值计数，逐单元格填表和格式化，再解析字符串求合计"""
+    df = df.copy()
+    df['Year'] = df['Date'].dt.year
+    results_positive, results_negative = {}, {}
+    for year, group in df.groupby('Year'):
+        results_positive[year], results_negative[year] = {}, {}
+        for threshold in thresholds:
+            results_positive[year][threshold] = (group['P/L'] > threshold).sum()
+            results_negative[year][threshold] = (group['P/L'] < -threshold).sum()
+
+    pos_columns = [f'>{threshold_label(t)}%' for t in thresholds]
+    neg_columns = [f'<-{threshold_label(t)}%' for t in thresholds]
+    years = sorted(results_positive)
+    positive_df = pd.DataFrame(index=years, columns=pos_columns)
+    negative_df = pd.DataFrame(index=years, columns=neg_columns)
+    for year in years:
+        for i, threshold in enumerate(thresholds):
+            positive_df.loc[year, pos_columns[i]] = results_positive[year][threshold]
+            negative_df.loc[year, neg_columns[i]] = results_negative[year][threshold]
+
+    total_days_per_year = df.groupby('Year').size()
+    for i in range(len(thresholds)):
+        for year in years:
+            days_in_year = total_days_per_year[year]
+            pos_count = positive_df.loc[year, pos_columns[i]]
+            neg_count = negative_df.loc[year, neg_columns[i]]
+            positive_df.loc[year, pos_columns[i]] = f"{int(pos_count)} ({pos_count / days_in_year * 100:.1f}%)"
+            negative_df.loc[year, neg_columns[i]] = f"{int(neg_count)} ({neg_count / days_in_year * 100:.1f}%)"
+
+    result_df = pd.DataFrame(index=years + ['Total'])
+    for i in range(len(thresholds)):
+        result_df[pos_columns[i]] = positive_df[pos_columns[i]]
+        result_df[neg_columns[i]] = negative_df[neg_columns[i]]
+    for i in range(len(thresholds)):
+        for columns, source in ((pos_columns, positive_df), (neg_columns, negative_df)):
+            total = sum(int(source.loc[year, columns[i]].split(' ')[0]) for year in years)
+            result_df.loc['Total', columns[i]] = str(total)
+    return result_df
+
+def bench_thresholds(args):
+    """阈值统计：原脚本的循环 vs 向量化（抽样校验格式化后的表格完全一致）"""
+    frames = make_sample_frames(args.symbols, args.years)
+    rows = sum(len(frame) for frame in frames.values())
+
+    start = time.perf_counter()
+    counts = count_frame_thresholds(frames, DEFAULT_THRESHOLDS)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tables = {symbol: counts.table(symbol) for symbol in counts.symbols}
+    formatting = time.perf_counter() - start
+
+    # 原脚本逐只股票运行，只对抽样的股票计时并按比例估算
+    sample = list(frames)[:args.sample]
+    start = time.perf_counter()
+    for symbol in sample:
+        expected = legacy_table(frames[symbol], DEFAULT_THRESHOLDS)
+        assert expected.astype(str).equals(tables[symbol].astype(str)), f"{symbol} 的结果不一致"
+    legacy = (time.perf_counter() - start) / len(sample) * len(frames)
+
+    print(f"阈值统计，{args.symbols} 只股票 × {args.years} 年（{rows} 行），{len(DEFAULT_THRESHOLDS)} 个阈值，"
+          f"抽样 {len(sample)} 只股票结果一致")
+    print(f"原脚本（估算） {legacy:9.2f} s   向量化统计 {vectorized * 1000:9.2f} ms   "
+          f"格式化 {formatting * 1000:9.2f} ms   加速 {legacy / vectorized:8.1f}x")
+
+def write_sample_csv(path, rows, seed=0):
+    """生成与从雅虎财经导出、在 Excel 中计算 P/L 后相同格式的 CSV（日期为 7-Mar-25 形式，含少量错误值）"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-05-30', periods=rows)[::-1]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    pl = pd.Series(rng.normal(0, 2, rows)).map(lambda value: f'{value:.3f}%')
+    pl[rng.uniform(size=rows) < 0.001] = '#DIV/0!'
+    pd.DataFrame({
+        'Date': [f'{date.day}-{date:%b-%y}' for date in dates],
+        'Close': [f'{value:,.2f}' for value in close],
+        'P/L': pl,
+    }).to_csv(path, index=False)
+
+def legacy_read(file_path):
+    """原 analyze_pl.py 的读取流程：逐行尝试多种日期格式，P/L 分多步清洗"""
+    df = pd.read_csv(file_path)
+    pl_as_str = df['P/L'].astype(str).replace(SPREADSHEET_ERRORS, '', regex=False)
+    pl_cleaned = pl_as_str.str.replace('%', '', regex=False).str.strip()
+    df['P/L'] = pd.to_numeric(pl_cleaned, errors='coerce') / 100
+    df['Date'] = df['Date'].apply(parse_date)
+    return df[['Date', 'P/L']]
+
+def bench_ingest(args):
+    """CSV 读取：逐行解析日期 vs 抽样检测格式后整列解析"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sample.csv')
+        write_sample_csv(path, args.rows)
+
+        start = time.perf_counter()
+        expected = legacy_read(path)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = read_pl_csv(path)
+        vectorized = time.perf_counter() - start
+
+    assert (expected['Date'] == result['Date']).all(), "日期解析结果不一致"
+    assert np.array_equal(expected['P/L'].to_numpy(), result['P/L'].to_numpy(), equal_nan=True), "P/L 结果不一致"
+    print(f"CSV 读取，{args.rows} 行，结果一致")
+    print(f"原流程 {legacy * 1000:9.2f} ms   抽样检测格式 {vectorized * 1000:9.2f} ms   加速 {legacy / vectorized:6.1f}x")
+
+class SimulatedDownload:
+    """代替 yf.download 的模拟网络请求：返回合成行情（两级列名）并记录请求次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        self.calls += 1
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1), name='Date')
+        rng = np.random.default_rng(self.calls)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), len(symbols))), axis=0))
+        fields = {'Close': close, 'Adj Close': close * 0.98}
+        return pd.concat({field: pd.DataFrame(values, index=dates, columns=symbols) for field, values in fields.items()},
+                         axis=1, names=['Price', 'Ticker'])
+
+def bench_cache(args):
+    """由行情缓存计算 P/L：模拟下载填充缓存后，从缓存批量计算并统计"""
+    symbols = [f'S{i:04d}' for i in range(args.symbols)]
+    end_date = pd.Timestamp('2025-05-30')
+    start_date = (end_date - pd.DateOffset(years=args.years)).strftime('%Y-%m-%d')
+    end_date = end_date.strftime('%Y-%m-%d')
+
+    with tempfile.TemporaryDirectory() as cache_dir, mock.patch.object(yf, 'download', SimulatedDownload()) as download:
+        load_cached_pl(symbols, start_date, end_date, fetcher=create_fetcher(cache_dir))
+        downloads = download.calls
+
+        start = time.perf_counter()
+        frames = load_cached_pl(symbols, start_date, end_date, fetcher=create_fetcher(cache_dir))
+        loaded = time.perf_counter() - start
+        assert download.calls == downloads, "缓存已覆盖时不应发起网络请求"
+
+        # 与数据准备指南中的公式（当日收盘价 / 前一日收盘价 - 1）逐行比较
+        cached = create_fetcher(cache_dir).fetch_data(symbols[0], '1900-01-01', end_date, columns=['Adj Close'])
+        close = cached.iloc[:, 0]
+        expected = (close / close.shift(1) - 1)[close.index >= pd.Timestamp(start_date)]
+        assert np.allclose(expected.to_numpy(), frames[symbols[0]]['P/L'].to_numpy()), "P/L 与收盘价计算结果不一致"
+
+    start = time.perf_counter()
+    counts = count_frame_thresholds(frames, DEFAULT_THRESHOLDS)
+    counted = time.perf_counter() - start
+
+    rows = sum(len(frame) for frame in frames.values())
+    print(f"由行情缓存计算 P/L，{args.symbols} 只股票 × {args.years} 年（{rows} 行），首次填充缓存 {downloads} 次请求，"
+          f"再次读取 0 次请求，{len(counts.keys)} 组（股票, 年份）")
+    print(f"读取缓存并计算 P/L {loaded * 1000:9.2f} ms   阈值统计 {counted * 1000:9.2f} ms")
+
+def make_sample_pair(days, leverage=2.0, seed=0):
+    """生成合成的标的与杠杆 ETF 收盘价：ETF 每日按杠杆倍数跟踪标的，另加少量费用和噪声，并随机缺失几天"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-05-30', periods=days)
+    r_u = rng.normal(0.0005, 0.02, days)
+    r_e = leverage * r_u - 0.0004 + rng.normal(0, 0.002, days)
+    underlying = pd.Series(100 * np.cumprod(1 + r_u), index=dates)
+    etf = pd.Series(20 * np.cumprod(1 + r_e), index=dates)
+    return align_pair(underlying.drop(dates[rng.uniform(size=days) < 0.002]),
+                      etf.drop(dates[rng.uniform(size=days) < 0.002]))
+
+def legacy_rolling(prices, leverage, window):
+    """逐窗口循环计算区间收益和波动损耗（用于校验）"""
+    returns = prices.pct_change().to_numpy()[1:]
+    rows = []
+    for end in range(window, len(returns) + 1):
+        period = returns[end - window:end]
+        underlying = np.prod(1 + period[:, 0]) - 1
+        etf = np.prod(1 + period[:, 1]) - 1
+        rebalanced = np.prod(1 + leverage * period[:, 0]) - 1
+        rows.append((underlying, etf, rebalanced, rebalanced - leverage * underlying, etf - rebalanced))
+    return np.array(rows)
+
+def bench_pairs(args):
+    """杠杆 ETF 配对分析：逐窗口循环 vs 累计对数收益（校验滚动收益、波动损耗和年度回归杠杆一致）"""
+    pairs = [make_sample_pair(252 * args.years, seed=seed) for seed in range(args.pairs)]
+    rows = sum(len(prices) for prices in pairs)
+
+    start = time.perf_counter()
+    analyses = [analyze_pair(prices, 2.0, DEFAULT_WINDOWS) for prices in pairs]
+    tables = [(analysis.summary(), analysis.yearly()) for analysis in analyses]
+    vectorized = time.perf_counter() - start
+
+    sample = pairs[:args.sample]
+    start = time.perf_counter()
+    expected = [{window: legacy_rolling(prices, 2.0, window) for window in DEFAULT_WINDOWS} for prices in sample]
+    legacy = (time.perf_counter() - start) / len(sample) * len(pairs)
+
+    columns = ['标的收益', 'ETF收益', '每日再平衡收益', '波动损耗', '跟踪偏差']
+    for analysis, windows in zip(analyses, expected):
+        for window, values in windows.items():
+            assert np.allclose(analysis.rolling[window][columns].to_numpy(), values, rtol=1e-9, atol=1e-12), \
+                f"{window} 日滚动结果不一致"
+        daily = analysis.daily.dropna(subset=['标的涨跌幅'])
+        for year, group in daily.groupby(daily.index.year):
+            beta = np.cov(group['ETF涨跌幅'], group['标的涨跌幅'])[0, 1] / np.var(group['标的涨跌幅'], ddof=1)
+            assert np.isclose(analysis.yearly().loc[year, '回归杠杆'], beta), f"{year} 年回归杠杆不一致"
+
+    print(f"杠杆 ETF 配对分析，{args.pairs} 个配对 × {args.years} 年（{rows} 行），窗口 {DEFAULT_WINDOWS}，"
+          f"抽样 {len(sample)} 个配对结果一致，{len(tables)} 张汇总表")
+    print(f"逐窗口循环（估算） {legacy:9.2f} s   向量化 {vectorized * 1000:9.2f} ms   加速 {legacy / vectorized:8.1f}x")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='P/L 分析性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    thresholds = subparsers.add_parser('thresholds', help='阈值统计')
+    thresholds.add_argument('--symbols', type=int, default=500, help='股票数量')
+    thresholds.add_argument('--years', type=int, default=30, help='年数')
+    thresholds.add_argument('--sample', type=int, default=5, help='用原脚本校验的股票数量')
+    thresholds.set_defaults(func=bench_thresholds)
+
+    ingest = subparsers.add_parser('ingest', help='CSV 读取')
+    ingest.add_argument('--rows', type=int, default=20000, help='CSV 行数')
+    ingest.set_defaults(func=bench_ingest)
+
+    cache = subparsers.add_parser('cache', help='由行情缓存计算 P/L')
+    cache.add_argument('--symbols', type=int, default=300, help='股票数量')
+    cache.add_argument('--years', type=int, default=20, help='年数')
+    cache.set_defaults(func=bench_cache)
+
+    pairs = subparsers.add_parser('pairs', help='杠杆 ETF 配对分析')
+    pairs.add_argument('--pairs', type=int, default=50, help='配对数量')
+    pairs.add_argument('--years', type=int, default=20, help='年数')
+    pairs.add_argument('--sample', type=int, default=2, help='用逐窗口循环校验的配对数量')
+    pairs.set_defaults(func=bench_pairs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
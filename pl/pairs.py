@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+杠杆 ETF 配对分析
+
+按日期对齐标的与其杠杆 ETF（如 NVDA/NVDL、GOOGL/GGLL），计算：
+- 每日实际杠杆倍数（ETF 涨跌幅 / 标的涨跌幅）和整体回归杠杆
+- 跟踪误差：ETF 每日涨跌幅与目标（杠杆倍数 × 标的涨跌幅）之差
+- 滚动窗口的波动损耗：每日再平衡的 L 倍收益与 L × 标的区间收益之差；
+  ETF 实际区间收益与每日再平衡收益之差为跟踪偏差（费用、融资成本等）
+
+窗口收益由累计对数收益的差一次得到，所有窗口、所有指标都是整列向量化计算。
+
+用法：
+    python pairs.py                                      # 默认配对，由行情缓存计算
+    python pairs.py --pairs SPY:SSO:2 QQQ:TQQQ:3 --years 10
+    python pairs.py --csv ../googl/googl.csv             # 并排存放两组行情的 CSV
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pl_data import (PRICE_COLUMNS, create_fetcher, load_cached_prices, parse_dates,
+                     symbol_from_path)
+
+# 默认配对：(标的, 杠杆 ETF, 目标杠杆倍数)
+DEFAULT_PAIRS = (
+    ('NVDA', 'NVDL', 2.0),
+    ('GOOGL', 'GGLL', 2.0),
+)
+
+# 默认滚动窗口（交易日）：约一个月、一个季度、一年
+DEFAULT_WINDOWS = (21, 63, 252)
+
+# 每年交易日数，用于年化
+TRADING_DAYS = 252
+
+# 标的涨跌幅绝对值小于此值的交易日不计算每日杠杆倍数（分母过小，比值没有意义）
+MIN_MOVE = 0.001
+
+# 以倍数（而不是百分比）显示的指标
+LEVERAGE_METRICS = ('目标杠杆', '回归杠杆', '每日杠杆中位数')
+
+def parse_pair(text, leverage=2.0):
+    """解析配对，如 'GOOGL:GGLL:2' 或 'GOOGL:GGLL'（使用默认杠杆倍数）"""
+    parts = text.split(':')
+    if len(parts) not in (2, 3):
+        raise argparse.ArgumentTypeError(f"无法解析配对：{text}，格式应为 标的:ETF[:杠杆倍数]")
+    return parts[0].upper(), parts[1].upper(), float(parts[2]) if len(parts) == 3 else leverage
+
+def align_pair(underlying, etf):
+    """
+    按日期对齐标的与 ETF 的收盘价，只保留两者都有收盘价的交易日
+    Args:
+        underlying (pd.Series): 标的收盘价，以日期为索引
+        etf (pd.Series): ETF 收盘价，以日期为索引
+    Returns:
+        pd.DataFrame: 以日期为索引（升序），包含 underlying 和 etf 两列
+    """
+    prices = pd.concat({'underlying': underlying, 'etf': etf}, axis=1, join='inner').dropna()
+    prices = prices[~prices.index.duplicated(keep='last')]
+    return prices.sort_index()
+
+def window_returns(returns, window):
+    """
+    每个滚动窗口的区间收益 prod(1 + r) - 1
+    由累计对数收益的差一次得到所有窗口
+    Args:
+        returns (np.ndarray): 每日收益，最后一维为时间
+        window (int): 窗口长度（交易日）
+    Returns:
+        np.ndarray: 以每个交易日结束的窗口收益，前 window - 1 个为 NaN
+    """
+    log_growth = np.cumsum(np.log1p(returns), axis=-1)
+    log_growth = np.concatenate([np.zeros(log_growth.shape[:-1] + (1,)), log_growth], axis=-1)
+    result = np.full(np.shape(returns), np.nan)
+    result[..., window - 1:] = np.expm1(log_growth[..., window:] - log_growth[..., :-window])
+    return result
+
+class PairAnalysis:
+    """
+    单个配对的分析结果
+
+    Attributes:
+        underlying (str): 标的代码
+        etf (str): ETF 代码
+        leverage (float): 目标杠杆倍数
+        prices (pd.DataFrame): 对齐后的收盘价
+        daily (pd.DataFrame): 每日指标（标的/ETF/目标涨跌幅、偏离、每日杠杆倍数）
+        rolling (dict): 窗口长度到滚动指标 DataFrame 的字典
+    """
+
+    def __init__(self, underlying, etf, leverage, prices, daily, rolling):
+        self.underlying = underlying
+        self.etf = etf
+        self.leverage = leverage
+        self.prices = prices
+        self.daily = daily
+        self.rolling = rolling
+
+    @property
+    def name(self):
+        """配对名称，如 'GOOGL/GGLL'"""
+        return f'{self.underlying}/{self.etf}'
+
+    def summary(self):
+        """
+        整个区间的汇总指标
+        Returns:
+            pd.Series: 指标名称到数值的序列
+        """
+        daily = self.daily.dropna(subset=['标的涨跌幅', 'ETF涨跌幅'])
+        r_u, r_e = daily['标的涨跌幅'].to_numpy(), daily['ETF涨跌幅'].to_numpy()
+        total = {column: np.expm1(np.log1p(daily[column].to_numpy()).sum())
+                 for column in ('标的涨跌幅', 'ETF涨跌幅', '目标涨跌幅')}
+        values = {
+            '起始日期': self.prices.index[0].strftime('%Y-%m-%d') if len(self.prices) else '',
+            '结束日期': self.prices.index[-1].strftime('%Y-%m-%d') if len(self.prices) else '',
+            '交易日数': len(daily),
+            '目标杠杆': self.leverage,
+            '回归杠杆': np.cov(r_e, r_u)[0, 1] / np.var(r_u, ddof=1) if len(daily) > 1 else np.nan,
+            '每日杠杆中位数': daily['每日杠杆'].median(),
+            '日均偏离': daily['偏离'].mean(),
+            '年化跟踪误差': daily['偏离'].std() * np.sqrt(TRADING_DAYS),
+            '标的年化波动率': daily['标的涨跌幅'].std() * np.sqrt(TRADING_DAYS),
+            '标的累计收益': total['标的涨跌幅'],
+            'ETF累计收益': total['ETF涨跌幅'],
+            '目标累计收益': total['目标涨跌幅'],
+            '杠杆倍数×标的累计收益': self.leverage * total['标的涨跌幅'],
+        }
+        for window, rolling in self.rolling.items():
+            values[f'{window}日平均波动损耗'] = rolling['波动损耗'].mean()
+            values[f'{window}日最大波动损耗'] = rolling['波动损耗'].min()
+            values[f'{window}日平均跟踪偏差'] = rolling['跟踪偏差'].mean()
+        return pd.Series(values, name=self.name)
+
+    def yearly(self):
+        """
+        按年份汇总
+        Returns:
+            pd.DataFrame: 以年份为索引，列为交易日数、各区间收益、回归杠杆、年化跟踪误差和波动损耗
+        """
+        daily = self.daily.dropna(subset=['标的涨跌幅', 'ETF涨跌幅'])
+        r_u, r_e = daily['标的涨跌幅'], daily['ETF涨跌幅']
+        groups = pd.DataFrame({
+            'n': 1, 'u': r_u, 'e': r_e, 'uu': r_u * r_u, 'ue': r_u * r_e,
+            'log_u': np.log1p(r_u), 'log_e': np.log1p(r_e), 'log_t': np.log1p(daily['目标涨跌幅']),
+            'd': daily['偏离'], 'dd': daily['偏离'] ** 2,
+        }).groupby(daily.index.year).sum()
+        groups.index.name = '年份'
+
+        n = groups['n']
+        var_u = (groups['uu'] - groups['u'] ** 2 / n) / (n - 1)
+        cov = (groups['ue'] - groups['u'] * groups['e'] / n) / (n - 1)
+        var_d = (groups['dd'] - groups['d'] ** 2 / n) / (n - 1)
+        underlying, target = np.expm1(groups['log_u']), np.expm1(groups['log_t'])
+        return pd.DataFrame({
+            '交易日数': n,
+            '标的收益': underlying,
+            'ETF收益': np.expm1(groups['log_e']),
+            '目标收益': target,
+            '回归杠杆': cov / var_u,
+            '年化跟踪误差': np.sqrt(var_d * TRADING_DAYS),
+            '波动损耗': target - self.leverage * underlying,
+        })
+
+def analyze_pair(prices, leverage=2.0, windows=DEFAULT_WINDOWS, underlying='标的', etf='ETF', min_move=MIN_MOVE):
+    """
+    分析一个已对齐的配对
+    Args:
+        prices (pd.DataFrame): align_pair 的结果
+        leverage (float): 目标杠杆倍数
+        windows (iterable): 滚动窗口长度（交易日）
+        underlying (str): 标的代码
+        etf (str): ETF 代码
+        min_move (float): 计算每日杠杆倍数所需的最小标的涨跌幅
+    Returns:
+        PairAnalysis: 分析结果
+    """
+    closes = prices[['underlying', 'etf']].to_numpy(dtype=np.float64)
+    returns = np.full(closes.shape, np.nan)
+    returns[1:] = closes[1:] / closes[:-1] - 1
+    r_u, r_e = returns[:, 0], returns[:, 1]
+    target = leverage * r_u
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(np.abs(r_u) >= min_move, r_e / r_u, np.nan)
+    daily = pd.DataFrame({
+        '标的涨跌幅': r_u, 'ETF涨跌幅': r_e, '目标涨跌幅': target,
+        '偏离': r_e - target, '每日杠杆': ratio,
+    }, index=prices.index)
+
+    # 三组收益一起计算滚动窗口收益；第一天没有收益，从第二天开始
+    stacked = np.vstack([r_u[1:], r_e[1:], target[1:]])
+    rolling = {}
+    for window in windows:
+        period = np.full((3, len(prices)), np.nan)
+        if len(prices) > window:
+            period[:, 1:] = window_returns(stacked, window)
+        rolling[window] = pd.DataFrame({
+            '标的收益': period[0], 'ETF收益': period[1], '每日再平衡收益': period[2],
+            '波动损耗': period[2] - leverage * period[0],
+            '跟踪偏差': period[1] - period[2],
+            '标的年化波动率': daily['标的涨跌幅'].rolling(window).std().to_numpy() * np.sqrt(TRADING_DAYS),
+        }, index=prices.index).dropna(subset=['标的收益'])
+    return PairAnalysis(underlying, etf, leverage, prices, daily, rolling)
+
+def load_cached_pairs(pairs, start_date, end_date, price='auto', fetcher=None):
+    """
+    从行情缓存读取多个配对的收盘价并对齐（所有股票一次批量获取）
+    Args:
+        pairs (list): (标的, ETF, 杠杆倍数) 列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        price (str): 价格列，见 PRICE_COLUMNS
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认设置
+    Returns:
+        dict: (标的, ETF, 杠杆倍数) 到对齐后收盘价的字典（缺少任一方行情的配对不包含在内）
+    """
+    symbols = list(dict.fromkeys(symbol for pair in pairs for symbol in pair[:2]))
+    closes = load_cached_prices(symbols, start_date, end_date, price, fetcher)
+    return {pair: align_pair(closes[pair[0]], closes[pair[1]])
+            for pair in pairs if pair[0] in closes and pair[1] in closes}
+
+def read_pair_csv(file_path, price='Close', suffix='.1'):
+    """
+    读取并排存放标的与 ETF 行情的 CSV（如 googl/googl.csv）
+    第二组列名与第一组相同，pandas 读取时加上后缀（Date.1、Close.1 等）
+    Args:
+        file_path (str): CSV 文件路径
+        price (str): 价格列名
+        suffix (str): 第二组（ETF）列名的后缀
+    Returns:
+        tuple: (对齐后的收盘价, ETF 代码)；ETF 代码取自第二组日期列前面的标签列，没有时为 None
+    Raises:
+        ValueError: 文件不存在或缺少列
+    """
+    if not os.path.exists(file_path):
+        raise ValueError(f"无法找到数据文件 '{file_path}'。")
+    df = pd.read_csv(file_path, dtype=str)
+    columns = list(df.columns)
+    for name in ('Date', price, 'Date' + suffix, price + suffix):
+        if name not in columns:
+            raise ValueError(f"CSV文件中未找到 '{name}' 列。请确保文件 '{file_path}' 并排包含标的和 ETF 的行情。")
+
+    label = columns[columns.index('Date' + suffix) - 1]
+    etf = label.upper() if not label.startswith('Unnamed') and label not in ('P/L', price) else None
+
+    def series(date_column, price_column):
+        values = df[[date_column, price_column]].dropna()
+        close = pd.to_numeric(values[price_column].str.replace(r'[,\s]', '', regex=True), errors='coerce')
+        return pd.Series(close.to_numpy(), index=pd.DatetimeIndex(parse_dates(values[date_column]))).dropna()
+
+    return align_pair(series('Date', price), series('Date' + suffix, price + suffix)), etf
+
+def summary_table(analyses):
+    """
+    多个配对的汇总表
+    Args:
+        analyses (list): PairAnalysis 列表
+    Returns:
+        pd.DataFrame: 以指标为行、配对为列
+    """
+    return pd.concat([analysis.summary() for analysis in analyses], axis=1)
+
+def format_summary(table):
+    """格式化汇总表：收益、偏离、误差类指标显示为百分比，杠杆显示两位小数"""
+    def cell(metric, value):
+        if isinstance(value, str):
+            return value
+        if pd.isna(value):
+            return ''
+        if metric == '交易日数':
+            return str(int(value))
+        if metric in LEVERAGE_METRICS:
+            return f'{value:.2f}'
+        return f'{value * 100:.2f}%'
+    return pd.DataFrame([[cell(metric, value) for value in row] for metric, row in zip(table.index, table.to_numpy())],
+                        index=table.index, columns=table.columns)
+
+def format_yearly(yearly):
+    """格式化年度表"""
+    formatted = yearly.copy().astype(object)
+    for column in yearly.columns:
+        if column == '交易日数':
+            formatted[column] = yearly[column].map(lambda value: str(int(value)))
+        elif column in LEVERAGE_METRICS:
+            formatted[column] = yearly[column].map(lambda value: f'{value:.2f}')
+        else:
+            formatted[column] = yearly[column].map(lambda value: f'{value * 100:.2f}%')
+    return formatted
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='杠杆 ETF 配对分析')
+    parser.add_argument('--pairs', nargs='+', type=parse_pair, help='配对，格式为 标的:ETF[:杠杆倍数]（默认 ' +
+                        ' '.join(f'{u}:{e}:{l:g}' for u, e, l in DEFAULT_PAIRS) + '）')
+    parser.add_argument('--csv', action='append', default=[], help='并排存放标的与 ETF 行情的 CSV（可重复）')
+    parser.add_argument('--csv-price', default='Close', help='CSV 中使用的价格列')
+    parser.add_argument('--leverage', type=float, default=2.0, help='CSV 配对的目标杠杆倍数')
+    parser.add_argument('--windows', default=','.join(str(w) for w in DEFAULT_WINDOWS),
+                        help='滚动窗口长度（交易日），逗号分隔')
+    parser.add_argument('--years', type=int, default=5, help='由行情缓存分析时的年数')
+    parser.add_argument('--price', choices=list(PRICE_COLUMNS), default='auto',
+                        help='行情缓存中使用的价格：auto（优先复权收盘价）、adj 或 close')
+    parser.add_argument('--cache-dir', help='行情缓存目录（默认与 ema 工具共用 ema/data_cache）')
+    parser.add_argument('--cache-backend', default='feather', help='行情缓存格式，与 ema 工具的 cache.backend 一致')
+    parser.add_argument('--output-dir', help='导出汇总表和每个配对的年度表、滚动指标的目录')
+    args = parser.parse_args()
+    windows = tuple(int(part) for part in args.windows.split(','))
+
+    aligned = {}
+    for file_path in args.csv:
+        try:
+            prices, etf = read_pair_csv(file_path, args.csv_price)
+        except ValueError as e:
+            print(f"错误：{e}")
+            continue
+        aligned[(symbol_from_path(file_path), etf or 'ETF', args.leverage)] = prices
+    pairs = args.pairs or ([] if args.csv else list(DEFAULT_PAIRS))
+    if pairs:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=365 * args.years)
+        aligned.update(load_cached_pairs(pairs, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                                         args.price, create_fetcher(args.cache_dir, args.cache_backend)))
+
+    analyses = []
+    for (underlying, etf, leverage), prices in aligned.items():
+        if len(prices) < 2:
+            print(f"{underlying}/{etf} 没有足够的重叠交易日")
+            continue
+        analyses.append(analyze_pair(prices, leverage, windows, underlying, etf))
+    if not analyses:
+        print("没有可分析的配对")
+        return
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    for analysis in analyses:
+        print(f"{analysis.name} 年度汇总（目标杠杆 {analysis.leverage:g}x）:")
+        yearly = analysis.yearly()
+        print(format_yearly(yearly).to_string())
+        print()
+        if args.output_dir:
+            prefix = os.path.join(args.output_dir, f'{analysis.underlying.lower()}_{analysis.etf.lower()}')
+            yearly.to_csv(f'{prefix}_yearly.csv')
+            analysis.daily.to_csv(f'{prefix}_daily.csv')
+            pd.concat(analysis.rolling, axis=1).to_csv(f'{prefix}_rolling.csv')
+
+    table = summary_table(analyses)
+    print("配对汇总:")
+    print(format_summary(table).to_string())
+    if args.output_dir:
+        output_csv = os.path.join(args.output_dir, 'pairs_summary.csv')
+        table.to_csv(output_csv)
+        print(f"\nResults exported to '{output_csv}'")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日涨跌幅（P/L）阈值统计。
+
+统计每只股票每一年中 P/L 大于 +t、小于 -t 的天数。所有股票、所有年份、所有阈值的计数
+在一次向量化计算中完成：用 searchsorted 求出每个 P/L 超过了几个阈值，按 (股票, 年份, 超过的阈值数)
+做一次 bincount 得到直方图，再沿阈值方向反向累加即得到每个阈值的计数。
+计数结果保持为数值，格式化为 "天数 (占比%)" 的表格是单独的最后一步。
+"""
+
+import numpy as np
+import pandas as pd
+
+# 默认阈值（小数形式，0.01 即 1%）
+DEFAULT_THRESHOLDS = (0.01, 0.0125, 0.015, 0.0175, 0.02, 0.0225, 0.025, 0.03, 0.04, 0.05)
+
+def threshold_label(threshold):
+    """阈值的列名数字部分，如 0.01 -> '1'，0.015 -> '1.50'"""
+    return f'{threshold * 100:.2f}'.replace('.00', '')
+
+class ThresholdCounts:
+    """
+    阈值统计结果（数值形式）
+
+    Attributes:
+        keys (pd.MultiIndex): 每组的 (股票, 年份)，已排序
+        thresholds (np.ndarray): 从小到大排列的阈值
+        days (np.ndarray): 每组的天数（包含 P/L 缺失的行）
+        above (np.ndarray): (组 × 阈值)，P/L > t 的天数
+        below (np.ndarray): (组 × 阈值)，P/L < -t 的天数
+    """
+
+    def __init__(self, keys, thresholds, days, above, below):
+        self.keys = keys
+        self.thresholds = thresholds
+        self.days = days
+        self.above = above
+        self.below = below
+
+    @property
+    def symbols(self):
+        """结果中包含的股票"""
+        return list(self.keys.get_level_values(0).unique())
+
+    def to_frame(self):
+        """
+        转换为长表
+        Returns:
+            pd.DataFrame: 以 (股票, 年份) 为索引，列为天数和每个阈值的上涨/下跌天数
+        """
+        columns = {'天数': self.days}
+        for index, threshold in enumerate(self.thresholds):
+            columns[f'>{threshold_label(threshold)}%'] = self.above[:, index]
+            columns[f'<-{threshold_label(threshold)}%'] = self.below[:, index]
+        return pd.DataFrame(columns, index=self.keys)
+
+    def table(self, symbol=None, label=threshold_label):
+        """
+        格式化为按年份排列的方向统计表（最后一步，只做字符串格式化）
+        每个单元格为 "天数 (占当年天数%)"，Total 行为各年份天数之和
+        Args:
+            symbol: 股票代码，None 表示第一只股票
+            label (callable): 阈值到列名数字部分的函数
+        Returns:
+            pd.DataFrame: 以年份和 Total 为索引，上涨/下跌列交替排列
+        """
+        symbol = self.symbols[0] if symbol is None else symbol
+        rows = self.keys.get_level_values(0) == symbol
+        years = self.keys.get_level_values(1)[rows]
+        # 上涨/下跌列交替排列
+        counts = np.empty((rows.sum(), 2 * len(self.thresholds)), dtype=np.int64)
+        counts[:, 0::2], counts[:, 1::2] = self.above[rows], self.below[rows]
+        percents = counts / self.days[rows][:, None] * 100
+        cells = [[f"{count} ({percent:.1f}%)" for count, percent in zip(count_row, percent_row)]
+                 for count_row, percent_row in zip(counts.tolist(), percents.tolist())]
+        cells.append([str(total) for total in counts.sum(axis=0).tolist()])
+        columns = [f'{prefix}{label(threshold)}%' for threshold in self.thresholds for prefix in ('>', '<-')]
+        return pd.DataFrame(np.array(cells, dtype=object), index=list(years) + ['Total'], columns=columns)
+
+def count_thresholds(pl, years, thresholds=DEFAULT_THRESHOLDS, symbols=None):
+    """
+    统计每组 (股票, 年份) 中 P/L 大于 +t、小于 -t 的天数
+    Args:
+        pl (array-like): 每日涨跌幅（小数形式），缺失为 NaN
+        years (array-like): 每行所属的年份，缺失为 NaN（不计入任何一组）
+        thresholds (iterable): 阈值（正数，小数形式）
+        symbols (array-like): 每行所属的股票，None 表示只有一只股票
+    Returns:
+        ThresholdCounts: 统计结果
+    """
+    if symbols is None:
+        codes, names = np.zeros(len(pl), dtype=np.int64), np.array([0])
+    else:
+        codes, names = pd.factorize(np.asarray(symbols), sort=True)
+    return _count_thresholds(np.asarray(pl, dtype=np.float64), np.asarray(years, dtype=np.float64),
+                             codes, names, thresholds)
+
+def _count_thresholds(pl, years, symbol_codes, symbol_names, thresholds):
+    """count_thresholds 的实现，股票以整数编号表示"""
+    thresholds = np.unique(np.asarray(thresholds, dtype=np.float64))
+    valid_year = ~np.isnan(years)
+    first_year = int(np.nanmin(years)) if valid_year.any() else 0
+    span = int(np.nanmax(years)) - first_year + 1 if valid_year.any() else 1
+
+    # (股票, 年份) 的稠密编号，按股票、年份排序；只保留有数据的组
+    dense = symbol_codes[valid_year] * span + (years[valid_year].astype(np.int64) - first_year)
+    dense_days = np.bincount(dense, minlength=len(symbol_names) * span)
+    present = np.flatnonzero(dense_days)
+    group_of = np.cumsum(dense_days > 0) - 1
+    keys = pd.MultiIndex.from_arrays([np.asarray(symbol_names)[present // span], present % span + first_year],
+                                     names=['股票代码', '年份'])
+    groups, bins = len(keys), len(thresholds) + 1
+
+    valid = ~np.isnan(pl[valid_year])
+    codes, values = group_of[dense[valid]], pl[valid_year][valid]
+
+    def exceed(values):
+        # 每个值超过的阈值个数 j（t[j-1] < x <= t[j]），按组做直方图后反向累加：
+        # P/L > t[k] 的天数 = 超过阈值个数不少于 k+1 的天数
+        histogram = np.bincount(codes * bins + np.searchsorted(thresholds, values, side='left'),
+                                minlength=groups * bins).reshape(groups, bins)
+        return np.cumsum(histogram[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+    return ThresholdCounts(keys, thresholds, dense_days[present], exceed(values), exceed(-values))
+
+def count_frame_thresholds(frames, thresholds=DEFAULT_THRESHOLDS, column='P/L'):
+    """
+    统计多只股票的阈值计数
+    Args:
+        frames (dict): 股票代码到包含 Date 和 P/L 列的 DataFrame 的字典
+        thresholds (iterable): 阈值（小数形式）
+        column (str): P/L 列名
+    Returns:
+        ThresholdCounts: 统计结果
+    """
+    names = list(frames)
+    lengths = [len(frame) for frame in frames.values()]
+    dates = pd.DatetimeIndex(np.concatenate([frame['Date'].to_numpy(dtype='datetime64[ns]') for frame in frames.values()]))
+    pl = np.concatenate([frame[column].to_numpy(dtype=np.float64) for frame in frames.values()])
+    years = np.asarray(dates.year, dtype=np.float64)
+    return _count_thresholds(pl, years, np.repeat(np.arange(len(names)), lengths), np.array(names, dtype=object),
+                             thresholds)
+
+def report_directional(counts, symbol=None, output_csv=None, title=None, label=threshold_label):
+    """
+    打印方向统计表并导出 CSV
+    Args:
+        counts (ThresholdCounts): 统计结果
+        symbol: 股票代码，None 表示第一只股票
+        output_csv (str): 导出的 CSV 文件路径
+        title (str): 表格标题
+        label (callable): 阈值到列名数字部分的函数
+    Returns:
+        pd.DataFrame: 格式化后的表格
+    """
+    if not len(counts.keys):
+        print("没有足够的数据生成分析报告。")
+        return None
+    result_df = counts.table(symbol, label)
+    if title:
+        print(title)
+    print(result_df.to_string())
+    if output_csv:
+        result_df.to_csv(output_csv)
+        print(f"\nResults exported to '{output_csv}'")
+    return result_df
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+P/L 数据读取。
+
+支持两种来源，都返回 Date 为日期类型、P/L 为小数形式的 DataFrame：
+- 按 data_preparation_guide.md 准备的 CSV（包含 Date 和百分比形式的 P/L 列）
+- ema 工具的行情缓存：直接由收盘价（或复权收盘价）计算每日涨跌幅，无需手工准备 CSV
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+EMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ema')
+
+# ema/utils 包加载后使用的模块名（与 setup/data.py 相同，两者在同一进程中共用一份）
+EMA_PACKAGE = 'ema_utils'
+
+# 由行情计算 P/L 时使用的价格列，auto 表示有复权收盘价时优先使用
+PRICE_COLUMNS = {
+    'auto': ('Adj Close', 'Close'),
+    'adj': ('Adj Close',),
+    'close': ('Close',),
+}
+
+# 向前多取的天数，使请求区间第一天也有前一日收盘价
+PRICE_LOOKBACK_DAYS = 10
+
+# 电子表格导出的错误值，按缺失处理
+SPREADSHEET_ERRORS = ['#DIV/0!', '#N/A', '#VALUE!']
+
+# 支持的日期格式（多种格式都能解析同一个值时，排在前面的优先）
+DATE_FORMATS = ('%d-%b-%y', '%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y', '%b %d, %Y')
+
+# 检测日期格式时抽样的行数
+DATE_SAMPLE_SIZE = 64
+
+# P/L 列中需要去掉的字符：百分号、千位分隔符和空白
+PL_STRIP_PATTERN = r'[%,\s]'
+
+def parse_date(date_str):
+    """依次尝试各种日期格式解析单个日期"""
+    for fmt in DATE_FORMATS:
+        try:
+            return pd.to_datetime(date_str, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"无法解析日期：{date_str}。请确保日期格式为 'dd-Mon-yy', 'YYYY-MM-DD', 'MM/DD/YYYY', "
+                     f"'DD/MM/YYYY' 或 'Mon DD, YYYY' 中的一种。")
+
+def detect_date_format(values, sample_size=DATE_SAMPLE_SIZE):
+    """
+    抽样检测日期列的格式
+    在均匀抽取的非空样本上逐个尝试 DATE_FORMATS，选择能解析最多样本的格式（相同时取排在前面的）
+    Args:
+        values (pd.Series): 日期字符串列
+        sample_size (int): 抽样行数
+    Returns:
+        str: 日期格式，样本都无法解析时返回 None
+    """
+    values = values.dropna()
+    if values.empty:
+        return None
+    sample = values.iloc[np.linspace(0, len(values) - 1, min(sample_size, len(values))).astype(int)]
+    parsed = [pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum() for fmt in DATE_FORMATS]
+    best = int(np.argmax(parsed))
+    return DATE_FORMATS[best] if parsed[best] else None
+
+def parse_dates(values):
+    """
+    解析日期列：抽样确定格式后整列一次向量化解析，只有解析失败的行才逐行尝试其他格式
+    Args:
+        values (pd.Series): 日期字符串列
+    Returns:
+        pd.Series: 日期，空值为 NaT
+    Raises:
+        ValueError: 存在任何格式都无法解析的日期
+    """
+    fmt = detect_date_format(values)
+    if fmt is None:
+        dates = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    else:
+        dates = pd.to_datetime(values, format=fmt, errors='coerce')
+    failed = dates.isna() & values.notna()
+    if failed.any():
+        dates[failed] = values[failed].map(parse_date)
+    return dates
+
+def clean_pl(values):
+    """
+    将百分比字符串形式的 P/L 转换为小数
+    电子表格错误值按缺失处理；百分号、千位分隔符和空白用一次正则替换去掉
+    Args:
+        values (pd.Series): 原始 P/L 列（如 '1.23%'、'1,234.5%'）
+    Returns:
+        pd.Series: 小数形式的 P/L，错误值和空值为 NaN
+    Raises:
+        ValueError: 存在无法转换的值
+    """
+    values = values.mask(values.isin(SPREADSHEET_ERRORS))
+    pl_cleaned = values.str.replace(PL_STRIP_PATTERN, '', regex=True)
+    numeric = pd.to_numeric(pl_cleaned.replace('', np.nan), errors='coerce')
+
+    # 原本非空的值转换后变为 NaN，说明格式无法识别
+    failed = pl_cleaned.notna() & (pl_cleaned != '') & numeric.isna()
+    if failed.any():
+        index = failed.idxmax()
+        raise ValueError(f"无法将 'P/L' 列中的值 '{values[index]}' (位于行索引 {index}) 转换为数值。"
+                         f"请确保所有 'P/L' 值均为纯数字或有效的百分比字符串 (例如 '1.23%')。")
+    return numeric / 100
+
+def read_pl_csv(file_path, column='P/L'):
+    """
+    读取包含 Date 和 P/L 列的 CSV
+    只读取这两列并保持为字符串，在同一遍处理中识别错误值、清洗 P/L 并解析日期
+    Args:
+        file_path (str): CSV 文件路径
+        column (str): P/L 列名
+    Returns:
+        pd.DataFrame: 包含 Date（日期类型）和 P/L（小数形式）两列
+    Raises:
+        ValueError: 文件不存在、缺少列或数据格式无法识别
+    """
+    if not os.path.exists(file_path):
+        raise ValueError(f"无法找到数据文件 '{file_path}'。")
+    header = pd.read_csv(file_path, nrows=0).columns
+    for name, description in ((column, "百分比形式的盈亏数据 (例如 '1.23%')"), ('Date', '日期数据')):
+        if name not in header:
+            raise ValueError(f"CSV文件中未找到 '{name}' 列。请确保文件 '{file_path}' 包含一个名为 '{name}' 的列，"
+                             f"其中包含{description}。")
+    df = pd.read_csv(file_path, usecols=['Date', column], dtype=str, na_values=SPREADSHEET_ERRORS)
+    return pd.DataFrame({'Date': parse_dates(df['Date']), 'P/L': clean_pl(df[column])})
+
+def load_ema_module(name):
+    """
+    按文件路径加载 ema 工具 utils 包中的模块
+    ema/utils 以 ema_utils 的名字注册，不把 ema 目录加入 sys.path，避免与其他名为 utils 的包冲突
+    Args:
+        name (str): 模块名，如 'data_fetcher'
+    Returns:
+        module: 加载的模块
+    """
+    if EMA_PACKAGE not in sys.modules:
+        package_dir = os.path.join(EMA_DIR, 'utils')
+        spec = importlib.util.spec_from_file_location(EMA_PACKAGE, os.path.join(package_dir, '__init__.py'),
+                                                      submodule_search_locations=[package_dir])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[EMA_PACKAGE] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f'{EMA_PACKAGE}.{name}')
+
+def create_fetcher(cache_dir=None, backend='feather'):
+    """
+    创建 ema 工具的数据获取器（缓存、重试和批量下载），见 ema/utils/data_fetcher.py 中的 create_fetcher
+    只在用到行情缓存时才导入 ema 工具（及 yfinance），读取 CSV 不需要
+    Args:
+        cache_dir (str): 缓存目录，None 表示与 ema 工具共用的默认目录
+        backend (str): 缓存存储格式
+    Returns:
+        DataFetcher: 数据获取器
+    """
+    return load_ema_module('data_fetcher').create_fetcher(cache_dir, backend)
+
+def price_series(data, price='auto'):
+    """
+    从行情中取出收盘价序列
+    Args:
+        data (pd.DataFrame): yfinance 格式的行情（单级或 (Price, Ticker) 两级列名）
+        price (str): 价格列，见 PRICE_COLUMNS
+    Returns:
+        pd.Series: 以日期为索引的收盘价，已去掉缺失值
+    Raises:
+        ValueError: 行情中没有所需的价格列
+    """
+    fields = data.columns.get_level_values(0)
+    name = next((name for name in PRICE_COLUMNS[price] if name in fields), None)
+    if name is None:
+        raise ValueError(f"行情数据中没有 {' 或 '.join(PRICE_COLUMNS[price])} 列")
+    return data.loc[:, fields == name].iloc[:, 0].dropna()
+
+def pl_from_prices(data, price='auto'):
+    """
+    由行情计算每日涨跌幅 P/L = 当日收盘价 / 前一日收盘价 - 1
+    Args:
+        data (pd.DataFrame): yfinance 格式的行情（单级或 (Price, Ticker) 两级列名）
+        price (str): 价格列，见 PRICE_COLUMNS
+    Returns:
+        pd.DataFrame: 包含 Date 和 P/L 两列，第一根K线的 P/L 为 NaN
+    Raises:
+        ValueError: 行情中没有所需的价格列
+    """
+    close = price_series(data, price)
+    return pd.DataFrame({'Date': close.index.to_numpy(), 'P/L': close.pct_change().to_numpy()})
+
+def _load_cached(symbols, start_date, end_date, price, fetcher, convert):
+    """
+    批量获取多只股票的行情，逐只用 convert(data, price) 转换
+    缓存已覆盖的区间直接读取（列式缓存只读取所需的价格列），缺失的区间合并为一次批量下载
+    Returns:
+        dict: 股票代码到转换结果的字典（获取失败或缺少价格列的股票不包含在内）
+    """
+    fetcher = fetcher or create_fetcher()
+    data_map = fetcher.fetch_many(symbols, start_date, end_date, columns=list(PRICE_COLUMNS[price]))
+
+    results = {}
+    for symbol, data in data_map.items():
+        if data is None:
+            print(f"无法获取 {symbol} 的行情数据")
+            continue
+        try:
+            results[symbol] = convert(data, price)
+        except ValueError as e:
+            print(f"{symbol}：{e}")
+    return results
+
+def load_cached_prices(symbols, start_date, end_date, price='auto', fetcher=None):
+    """
+    从行情缓存读取多只股票的收盘价
+    缓存已覆盖的区间直接读取（列式缓存只读取所需的价格列），缺失的区间合并为一次批量下载
+    Args:
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        price (str): 价格列，见 PRICE_COLUMNS
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认设置
+    Returns:
+        dict: 股票代码到收盘价序列的字典（获取失败的股票不包含在内）
+    """
+    return _load_cached(symbols, start_date, end_date, price, fetcher, price_series)
+
+def load_cached_pl(symbols, start_date, end_date, price='auto', fetcher=None):
+    """
+    由行情缓存计算多只股票的每日涨跌幅
+    请求区间向前多取几天，使第一天也有前一日收盘价
+    Args:
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        price (str): 价格列，见 PRICE_COLUMNS
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认设置
+    Returns:
+        dict: 股票代码到包含 Date 和 P/L 列的 DataFrame 的字典（获取失败的股票不包含在内）
+    """
+    start = pd.Timestamp(start_date)
+    lookback_start = (start - pd.Timedelta(days=PRICE_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    frames = _load_cached(symbols, lookback_start, end_date, price, fetcher, pl_from_prices)
+    return {symbol: pl[pl['Date'] >= start].reset_index(drop=True) for symbol, pl in frames.items()}
+
+def symbol_from_path(file_path):
+    """从文件名推断股票代码，如 'SPX 20240308-20250308.csv' -> 'SPX'"""
+    return os.path.splitext(os.path.basename(file_path))[0].split()[0].upper()
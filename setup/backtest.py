@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Setup 规则的历史回测。
+
+check_setup 只判断最后一根K线；回测需要知道每只股票在历史上的哪些交易日会触发信号。
+本模块用滚动最大/最小值、滚动求和和滚动回归斜率，一次性计算所有股票、所有交易日的
+五条规则，输出信号日历以及信号触发后的未来收益统计。
+每个交易日的判断结果与用截至当天的数据调用 check_setup 一致。
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from data import create_fetcher
+from panel import load_price_panel
+from screener import load_config, load_symbols
+
+# 统计未来收益的持有天数（交易日）
+FORWARD_HORIZONS = (1, 5, 10, 20)
+
+# 规则编号与名称
+RULE_NAMES = {
+    1: '趋势',
+    2: '盘整',
+    3: '回调',
+    4: '均线接近度',
+    5: '突破',
+}
+
+# 每条规则用到的阈值（窗口长度在 compute_features 中使用）
+RULE_PARAMETERS = {
+    1: ('min_days_above_ma50_pct',),
+    2: ('consolidation_range', 'consolidation_top_range'),
+    3: ('min_pullback_days',),
+    4: ('max_distance_from_ma50',),
+    5: (),
+}
+
+# failed_rule 中的特殊取值
+INSUFFICIENT_DATA = -1
+PASSED = 0
+
+def _pad_top(values, rows):
+    """在数组顶部补充 NaN 行，使滚动结果与输入行数一致"""
+    padding = np.full((rows,) + values.shape[1:], np.nan)
+    return np.concatenate([padding, values.astype(np.float64)], axis=0)
+
+def rolling_mean(values, window):
+    """按列计算滚动均值（前 window-1 行为 NaN）"""
+    cumsum = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), np.nan_to_num(values)]), axis=0)
+    return _pad_top((cumsum[window:] - cumsum[:-window]) / window, window - 1)
+
+def rolling_sum(values, window):
+    """按列计算滚动求和（前 window-1 行为 NaN）"""
+    return rolling_mean(values, window) * window
+
+def rolling_max(values, window):
+    """按列计算滚动最大值"""
+    return _pad_top(sliding_window_view(values, window, axis=0).max(axis=-1), window - 1)
+
+def rolling_min(values, window):
+    """按列计算滚动最小值"""
+    return _pad_top(sliding_window_view(values, window, axis=0).min(axis=-1), window - 1)
+
+def rolling_argmax_age(values, window):
+    """按列计算窗口内最大值距窗口末尾的行数（最大值重复时取最早的一个，与 idxmax 一致）"""
+    windows = sliding_window_view(values, window, axis=0)
+    return _pad_top(window - 1 - windows.argmax(axis=-1), window - 1)
+
+def rolling_slope(values, window):
+    """按列计算滚动最小二乘斜率（每个窗口等价于 np.polyfit(x, y, 1)[0]）"""
+    x = np.arange(window, dtype=np.float64)
+    x -= x.mean()
+    return _pad_top(sliding_window_view(values, window, axis=0) @ (x / (x @ x)), window - 1)
+
+def compute_features(panel, lookback_period, consolidation_days, max_pullback_days):
+    """
+    计算规则用到的全部滚动指标（只依赖窗口长度，与阈值无关，可在多组阈值之间共享）
+
+    数组按 PricePanel.alignment 右对齐：每只股票的有效K线连续排列在底部，
+    第 i 行对应该股票的第 pos[i] 根K线。
+    Args:
+        panel (PricePanel): 多股票行情
+        lookback_period (int): 趋势回溯天数
+        consolidation_days (int): 盘整天数
+        max_pullback_days (int): 最大回调天数
+    Returns:
+        dict: 滚动指标，均为 (行 × 股票) 数组
+    """
+    order, counts = panel.alignment()
+    high, low, close = (np.take_along_axis(values, order, axis=0)
+                        for values in (panel.high, panel.low, panel.close))
+    rows = len(close)
+    pos = np.arange(rows)[:, None] - (rows - counts)[None, :]
+
+    ma50 = rolling_mean(close, 50)
+    with np.errstate(invalid='ignore'):
+        above_ma50 = (close > ma50).astype(np.float64)
+    high_in_consolidation = rolling_max(high, consolidation_days)
+    low_in_consolidation = rolling_min(low, consolidation_days)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consolidation_range = (high_in_consolidation - low_in_consolidation) / low_in_consolidation
+        consolidation_top_ratio = low_in_consolidation / rolling_max(high, lookback_period)
+        distance_from_ma50 = (close - ma50) / ma50
+
+    return {
+        'order': order,
+        'pos': pos,
+        'close': close,
+        'lookback_period': lookback_period,
+        'max_pullback_days': max_pullback_days,
+        # 截至每一天 dropna 之后的K线数不少于回溯天数
+        'sufficient': pos - 48 >= lookback_period,
+        'days_above_ma50': np.rint(rolling_sum(above_ma50, lookback_period)),
+        'slope': rolling_slope(close, lookback_period),
+        'high_in_consolidation': high_in_consolidation,
+        'low_in_consolidation': low_in_consolidation,
+        'consolidation_range': consolidation_range,
+        'consolidation_top_ratio': consolidation_top_ratio,
+        'days_since_high': rolling_argmax_age(high, max_pullback_days),
+        'distance_from_ma50': distance_from_ma50,
+    }
+
+def evaluate_rule(features, rule, rules):
+    """
+    判断单条规则（只做比较运算，结果只依赖 RULE_PARAMETERS[rule] 中的阈值）
+    Args:
+        features (dict): compute_features 的结果
+        rule (int): 规则编号
+        rules (dict): config.yaml 中的 rules
+    Returns:
+        np.ndarray: (行 × 股票) 的布尔数组
+    """
+    with np.errstate(invalid='ignore'):
+        if rule == 1:
+            return ((features['days_above_ma50'] >= features['lookback_period'] * rules['min_days_above_ma50_pct'])
+                    & (features['slope'] > 0))
+        if rule == 2:
+            return ((features['low_in_consolidation'] != 0)
+                    & ~(features['consolidation_range'] > rules['consolidation_range'])
+                    & ~(features['consolidation_top_ratio'] < rules['consolidation_top_range']))
+        if rule == 3:
+            return ((features['days_since_high'] >= rules['min_pullback_days'])
+                    & (features['days_since_high'] <= features['max_pullback_days']))
+        if rule == 4:
+            return ~(features['distance_from_ma50'] > rules['max_distance_from_ma50'])
+        return ~(features['close'] < features['high_in_consolidation'])
+
+def evaluate_rules(features, rules):
+    """
+    根据阈值判断每条规则
+    Args:
+        features (dict): compute_features 的结果
+        rules (dict): config.yaml 中的 rules
+    Returns:
+        tuple: ({规则编号: 是否通过}, failed_rule)，failed_rule 为第一条失败的规则编号，
+               全部通过为 PASSED，数据不足为 INSUFFICIENT_DATA
+    """
+    passes = {rule: evaluate_rule(features, rule, rules) for rule in RULE_NAMES}
+    failed_rule = np.full(features['close'].shape, PASSED, dtype=np.int8)
+    for rule in sorted(passes, reverse=True):
+        failed_rule[~passes[rule]] = rule
+    failed_rule[~features['sufficient']] = INSUFFICIENT_DATA
+    return passes, failed_rule
+
+def forward_returns(close, horizons=FORWARD_HORIZONS):
+    """按列计算未来 h 根K线的收益率（数据不足为 NaN）"""
+    returns = {}
+    for horizon in horizons:
+        future = np.full_like(close, np.nan)
+        future[:-horizon] = close[horizon:]
+        returns[horizon] = future / close - 1
+    return returns
+
+class BacktestResult:
+    """回测结果，所有表格均以日期为索引、股票代码为列"""
+
+    def __init__(self, dates, symbols, order, failed_rule, passes, returns):
+        def to_frame(values, fill):
+            # 从右对齐的行还原到原始日期
+            restored = np.full(values.shape, fill, dtype=values.dtype)
+            np.put_along_axis(restored, order, values, axis=0)
+            return pd.DataFrame(restored, index=dates, columns=symbols)
+
+        self.failed_rule = to_frame(failed_rule, INSUFFICIENT_DATA)
+        self.signals = self.failed_rule == PASSED
+        self.rule_passes = {rule: to_frame(mask, False) & (self.failed_rule != INSUFFICIENT_DATA)
+                            for rule, mask in passes.items()}
+        self.forward_returns = {horizon: to_frame(values, np.nan) for horizon, values in returns.items()}
+
+    def signal_calendar(self, mask=None):
+        """
+        信号日历：每个触发信号的 (日期, 股票代码) 及之后的收益
+        Args:
+            mask (pd.DataFrame): 自定义的信号表，默认为全部五条规则都通过
+        Returns:
+            pd.DataFrame: 信号明细
+        """
+        mask = self.signals if mask is None else mask
+        rows, cols = np.nonzero(mask.to_numpy())
+        calendar = pd.DataFrame({'日期': mask.index[rows], '股票代码': mask.columns[cols]})
+        for horizon, returns in self.forward_returns.items():
+            calendar[f'{horizon}日收益'] = returns.to_numpy()[rows, cols]
+        return calendar.sort_values(['日期', '股票代码'], ignore_index=True)
+
+    def forward_return_stats(self, mask=None):
+        """
+        信号触发后的未来收益统计
+        Args:
+            mask (pd.DataFrame): 自定义的信号表，默认为全部五条规则都通过
+        Returns:
+            pd.DataFrame: 以持有天数为索引，包含信号次数、平均收益、收益中位数和胜率
+        """
+        mask = (self.signals if mask is None else mask).to_numpy()
+        rows = []
+        for horizon, returns in self.forward_returns.items():
+            values = returns.to_numpy()[mask]
+            values = values[~np.isnan(values)]
+            rows.append({
+                '持有天数': horizon,
+                '信号次数': len(values),
+                '平均收益': values.mean() if len(values) else np.nan,
+                '收益中位数': np.median(values) if len(values) else np.nan,
+                '胜率': (values > 0).mean() if len(values) else np.nan,
+            })
+        return pd.DataFrame(rows).set_index('持有天数')
+
+def run_backtest(panel, rules, horizons=FORWARD_HORIZONS):
+    """
+    对所有股票、所有交易日回测 Setup 规则
+    Args:
+        panel (PricePanel): 多股票行情
+        rules (dict): config.yaml 中的 rules
+        horizons (tuple): 统计未来收益的持有天数
+    Returns:
+        BacktestResult: 回测结果
+    """
+    lookback_period = rules.get('trend_lookback_days', rules['min_days_above_ma50'])
+    features = compute_features(panel, lookback_period, rules['consolidation_days'], rules['max_pullback_days'])
+    passes, failed_rule = evaluate_rules(features, rules)
+    return BacktestResult(panel.dates, panel.symbols, features['order'], failed_rule, passes,
+                          forward_returns(features['close'], horizons))
+
+def print_summary(result):
+    """打印各规则的通过率和信号收益统计"""
+    evaluated = int((result.failed_rule != INSUFFICIENT_DATA).to_numpy().sum())
+    print(f"共评估 {evaluated} 个（股票, 交易日）")
+    for rule, mask in result.rule_passes.items():
+        hits = int(mask.to_numpy().sum())
+        print(f"  规则 {rule}（{RULE_NAMES[rule]}）单独通过：{hits} 次 ({hits / max(evaluated, 1):.2%})")
+    print(f"全部规则通过：{int(result.signals.to_numpy().sum())} 次")
+    print(result.forward_return_stats().to_string(float_format=lambda value: f'{value:.4f}'))
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Setup 规则历史回测')
+    parser.add_argument('--symbols-file', help='股票列表文件（每行一个代码），默认使用配置文件中的 stocks')
+    parser.add_argument('--years', type=int, default=3, help='回测年数')
+    parser.add_argument('--horizons', default=','.join(map(str, FORWARD_HORIZONS)),
+                        help='统计未来收益的持有天数，逗号分隔')
+    parser.add_argument('--output', help='保存信号日历和收益统计的目录')
+    args = parser.parse_args()
+
+    config = load_config()
+    if not config:
+        return
+    symbols = load_symbols(args.symbols_file) if args.symbols_file else config['stocks']
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365 * args.years)
+
+    panel = load_price_panel(symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'),
+                             create_fetcher(config))
+    if panel is None:
+        print("无法获取股票数据")
+        return
+    result = run_backtest(panel, config['rules'], tuple(int(h) for h in args.horizons.split(',')))
+    print_summary(result)
+
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+        result.signal_calendar().to_csv(os.path.join(args.output, 'signal_calendar.csv'),
+                                        index=False, encoding='utf-8-sig')
+        result.forward_return_stats().to_csv(os.path.join(args.output, 'forward_returns.csv'), encoding='utf-8-sig')
+        print(f"结果已保存到 {args.output}")
+
+if __name__ == '__main__':
+    main()
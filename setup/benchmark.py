@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Setup 筛选性能基准测试
+使用合成的多股票日线数据对比逐只股票检查与截面向量化检查，并校验结果一致
+
+用法：
+    python benchmark.py panel                  # 截面筛选
+    python benchmark.py panel --symbols 3000   # 指定股票数量
+    python benchmark.py backtest               # 历史回测（逐日调用 check_setup vs 滚动窗口）
+    python benchmark.py sweep                  # 参数扫描（逐组合回测 vs 共享滚动指标）
+    python benchmark.py pipeline               # 规则流水线（固定顺序 vs 按淘汰率自动排序）
+    python benchmark.py cache                  # 与 ema 工具共用数据缓存（统计模拟的网络请求次数）
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import yfinance as yf
+
+from backtest import INSUFFICIENT_DATA, PASSED, run_backtest
+from data import create_fetcher
+from panel import PricePanel, load_price_panel, screen_panel
+from screener import SetupPipeline, calculate_moving_averages, check_setup, get_stock_data_batch, load_config
+from sweep import build_grid, run_sweep
+
+# 参数扫描基准使用的网格（3 × 2 × 5 × 5 × 4 × 4 × 5 = 12000 个组合）
+SWEEP_RANGES = {
+    'trend_lookback_days': [20, 30, 40],
+    'consolidation_days': [5, 10],
+    'min_days_above_ma50_pct': [0.6, 0.7, 0.8, 0.85, 0.9],
+    'consolidation_range': [0.05, 0.08, 0.10, 0.12, 0.15],
+    'consolidation_top_range': [0.7, 0.8, 0.85, 0.9],
+    'min_pullback_days': [0, 1, 2, 3],
+    'max_distance_from_ma50': [0.05, 0.1, 0.15, 0.2, 0.3],
+}
+
+def make_sample_panel(symbols=500, days=252, seed=0, breakout_rate=0.0):
+    """生成与 yfinance 多股票下载结果结构相同的合成日线数据
+    每只股票的漂移率和波动率不同，部分股票上市较晚（前段为缺失值）。
+    随机游走的最高价总是高于收盘价，不会出现突破（规则 5）；breakout_rate 大于 0 时，
+    按该概率在（交易日, 股票）上构造突破形态：两天前创出近 5 日最高价，当天以该价格收盘并收在最高点。
+    Args:
+        symbols (int): 股票数量
+        days (int): 交易日数量
+        seed (int): 随机种子
+        breakout_rate (float): 每个（交易日, 股票）出现突破形态的概率
+    Returns:
+        pd.DataFrame: 两级列名 (Price, Ticker) 的数据
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-05-30', periods=days, name='Date')
+    tickers = [f'S{i:04d}' for i in range(symbols)]
+    drift = rng.uniform(-0.002, 0.006, symbols)
+    volatility = rng.uniform(0.005, 0.04, symbols)
+    returns = drift + volatility * rng.standard_normal((days, symbols))
+    close = 50 * np.exp(np.cumsum(returns, axis=0))
+    spread = np.abs(rng.standard_normal((days, symbols))) * volatility * close
+    high = close + spread * rng.uniform(0, 1, (days, symbols))
+    low = close - spread * rng.uniform(0, 1, (days, symbols))
+    if breakout_rate > 0 and days >= 5:
+        day, column = np.nonzero(rng.uniform(size=(days, symbols)) < breakout_rate)
+        keep = day >= 4
+        day, column = day[keep], column[keep]
+        peak = np.lib.stride_tricks.sliding_window_view(high, 5, axis=0)[day - 4, column].max(axis=1)
+        high[day - 2, column] = peak
+        high[day, column] = peak
+        close[day, column] = peak
+    # 约 5% 的股票上市较晚
+    listed = rng.integers(0, days, symbols) * (rng.uniform(size=symbols) < 0.05)
+    mask = np.arange(days)[:, None] < listed[None, :]
+    for values in (close, high, low):
+        values[mask] = np.nan
+    fields = {'Close': close, 'High': high, 'Low': low, 'Open': close}
+    return pd.concat({field: pd.DataFrame(values, index=dates, columns=tickers)
+                      for field, values in fields.items()}, axis=1, names=['Price', 'Ticker'])
+
+def prepare_frames(data):
+    """逐只股票计算均线并去掉缺失值（与 screener.main 相同）"""
+    frames = {}
+    for symbol in data['Close'].columns:
+        frame = data.xs(symbol, axis=1, level='Ticker', drop_level=False).dropna().reset_index()
+        frame = calculate_moving_averages(frame)
+        frame.dropna(inplace=True)
+        frame.reset_index(drop=True, inplace=True)
+        frames[symbol] = frame
+    return frames
+
+def screen_serial(data, rules):
+    """逐只股票检查（与 screener.main 相同的处理流程）"""
+    results = {}
+    for symbol in data['Close'].columns:
+        frame = data.xs(symbol, axis=1, level='Ticker', drop_level=False).dropna().reset_index()
+        frame = calculate_moving_averages(frame)
+        frame.dropna(inplace=True)
+        frame.reset_index(drop=True, inplace=True)
+        if frame.empty:
+            results[symbol] = (False, f"数据不足 (少于 {rules.get('trend_lookback_days', rules['min_days_above_ma50'])} 天)")
+            continue
+        results[symbol] = check_setup(frame, rules)
+    return results
+
+def bench_panel(args):
+    """截面筛选：逐只股票检查 vs 向量化检查"""
+    rules = load_config()['rules']
+    data = make_sample_panel(args.symbols, args.days, breakout_rate=args.breakout_rate)
+
+    start = time.perf_counter()
+    expected = screen_serial(data, rules)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = screen_panel(PricePanel.from_frame(data), rules)
+    vectorized = time.perf_counter() - start
+
+    mismatches = [symbol for symbol, (passed, reason) in expected.items()
+                  if result.at[symbol, '通过'] != passed or result.at[symbol, '原因'] != reason]
+    assert not mismatches, f"结果不一致：{mismatches[:5]}"
+    assert result['通过'].any(), "没有股票通过筛选，通过路径未被校验"
+    print(f"截面筛选，{args.symbols} 只股票 × {args.days} 个交易日，{int(result['通过'].sum())} 只通过")
+    print(f"逐只股票 {serial * 1000:9.2f} ms   向量化 {vectorized * 1000:9.2f} ms   加速 {serial / vectorized:6.1f}x")
+
+def failure_code(passed, reason):
+    """将 check_setup 的结果转换为回测的 failed_rule 编号"""
+    if passed:
+        return PASSED
+    if reason.startswith('数据不足'):
+        return INSUFFICIENT_DATA
+    return int(reason.split()[1])
+
+def backtest_serial(data, rules):
+    """对每只股票的每个交易日，用截至当天的数据调用 check_setup（O(N²)）"""
+    codes = pd.DataFrame(INSUFFICIENT_DATA, index=data.index, columns=data['Close'].columns, dtype=np.int8)
+    for symbol in codes.columns:
+        frame = data.xs(symbol, axis=1, level='Ticker', drop_level=False).dropna()
+        dates = frame.index
+        frame = calculate_moving_averages(frame.reset_index())
+        for end in range(1, len(frame) + 1):
+            prefix = frame.iloc[:end].dropna().reset_index(drop=True)
+            if prefix.empty:
+                continue
+            codes.at[dates[end - 1], symbol] = failure_code(*check_setup(prefix, rules))
+    return codes
+
+def bench_backtest(args):
+    """历史回测：逐日调用 check_setup vs 滚动窗口一次计算"""
+    rules = load_config()['rules']
+    data = make_sample_panel(args.symbols, args.days, breakout_rate=args.breakout_rate)
+
+    start = time.perf_counter()
+    expected = backtest_serial(data, rules)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = run_backtest(PricePanel.from_frame(data), rules)
+    vectorized = time.perf_counter() - start
+
+    mismatches = (expected.to_numpy() != result.failed_rule.to_numpy()).sum()
+    assert mismatches == 0, f"{mismatches} 个（股票, 交易日）的结果不一致"
+    signals = int((expected.to_numpy() == PASSED).sum())
+    assert signals, "没有出现信号，通过路径未被校验"
+    print(f"历史回测，{args.symbols} 只股票 × {args.days} 个交易日，{signals} 个信号，逐日结果一致")
+    print(f"逐日 check_setup {serial * 1000:9.2f} ms   滚动窗口 {vectorized * 1000:9.2f} ms   "
+          f"加速 {serial / vectorized:6.1f}x")
+
+def bench_sweep(args):
+    """参数扫描：逐组合调用 run_backtest vs 共享滚动指标和规则结果"""
+    rules = load_config()['rules']
+    panel = PricePanel.from_frame(make_sample_panel(args.symbols, args.days, breakout_rate=args.breakout_rate))
+    grid = build_grid(rules, SWEEP_RANGES)
+
+    start = time.perf_counter()
+    result = run_sweep(panel, rules, SWEEP_RANGES, workers=args.workers)
+    shared = time.perf_counter() - start
+
+    # 逐组合回测太慢，只抽样校验并按抽样耗时估算全部组合
+    sample = np.random.default_rng(0).choice(len(grid), args.sample, replace=False)
+    compared = 0
+    start = time.perf_counter()
+    for index in sample:
+        backtest = run_backtest(panel, grid[index])
+        expected = backtest.forward_return_stats()
+        row = result.iloc[index]
+        assert row['信号次数'] == int(backtest.signals.to_numpy().sum()), f"组合 {index} 的信号次数不一致"
+        for horizon in expected.index:
+            for column, name in (('平均收益', f'{horizon}日平均收益'), ('胜率', f'{horizon}日胜率')):
+                assert np.isclose(expected.at[horizon, column], row[name], equal_nan=True), \
+                    f"组合 {index} 的 {name} 不一致"
+                compared += int(not np.isnan(expected.at[horizon, column]))
+    serial = (time.perf_counter() - start) / args.sample * len(grid)
+    assert compared, "抽样组合都没有信号，远期收益未被校验"
+
+    print(f"参数扫描，{len(grid)} 个组合，{args.symbols} 只股票 × {args.days} 个交易日，"
+          f"{int((result['信号次数'] > 0).sum())} 个组合有信号，抽样 {args.sample} 个组合结果一致"
+          f"（{compared} 个非空的远期收益统计）")
+    print(f"逐组合回测（估算） {serial:9.2f} s   共享计算 {shared:9.2f} s   加速 {serial / shared:6.1f}x")
+
+def bench_pipeline(args):
+    """规则流水线：原始固定顺序 vs 按 耗时 / 淘汰率 自动排序"""
+    rules = load_config()['rules']
+    data = make_sample_panel(args.symbols, args.days, breakout_rate=args.breakout_rate)
+    frames = {symbol: frame for symbol, frame in prepare_frames(data).items() if not frame.empty}
+
+    timings = {}
+    outcomes = {}
+    pipelines = {}
+    for name, adaptive in (('fixed', False), ('adaptive', True)):
+        pipelines[name] = SetupPipeline(rules, adaptive=adaptive)
+        start = time.perf_counter()
+        outcomes[name] = {symbol: check_setup(frame, rules, pipelines[name]) for symbol, frame in frames.items()}
+        timings[name] = time.perf_counter() - start
+
+    # 是否通过与顺序无关；自动排序时报告的失败原因必须是该股票确实失败的某条规则
+    stages = pipelines['fixed'].stages
+    for symbol, frame in frames.items():
+        passed, reason = outcomes['adaptive'][symbol]
+        assert passed == outcomes['fixed'][symbol][0], f"{symbol} 的结果不一致"
+        if not passed and not reason.startswith('数据不足'):
+            failures = {f"规则 {stage.rule} 失败：{stage_reason}"
+                        for stage in stages
+                        for stage_passed, stage_reason in [stage.check(frame, rules)] if not stage_passed}
+            assert reason in failures, f"{symbol} 的失败原因 {reason} 不是实际失败的规则"
+
+    passed = {name: {symbol for symbol, (ok, _) in outcome.items() if ok} for name, outcome in outcomes.items()}
+    assert passed['adaptive'] == passed['fixed'], "通过的股票不一致"
+    assert passed['fixed'], "没有股票通过筛选，通过路径未被校验"
+    print(f"规则流水线，{len(frames)} 只股票，{len(passed['fixed'])} 只通过，是否通过一致，失败原因均对应实际失败的规则")
+    print(f"固定顺序 {timings['fixed'] * 1000:9.2f} ms   自动排序 {timings['adaptive'] * 1000:9.2f} ms   "
+          f"加速 {timings['fixed'] / timings['adaptive']:6.1f}x")
+    pipelines['adaptive'].print_profile()
+
+class SimulatedDownload:
+    """代替 yf.download 的模拟网络请求：返回合成行情并记录请求次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tickers, start=None, end=None, **kwargs):
+        self.calls += 1
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        days = len(pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1)))
+        data = make_sample_panel(len(symbols), days, seed=self.calls)
+        data = data.set_axis(pd.bdate_range(start, periods=days, name='Date'), axis=0)
+        return data.set_axis(pd.MultiIndex.from_tuples(
+            [(field, symbols[int(ticker[1:])]) for field, ticker in data.columns], names=['Price', 'Ticker']), axis=1)
+
+def bench_cache(args):
+    """先由 ema 工具的数据获取器下载，再运行筛选，统计各步骤的网络请求次数"""
+    symbols = [f'S{i:04d}' for i in range(args.symbols)]
+    end_date = datetime.now()
+    start_date = (end_date - timedelta(days=365)).strftime('%Y-%m-%d')
+    end_date = end_date.strftime('%Y-%m-%d')
+
+    with tempfile.TemporaryDirectory() as cache_dir, mock.patch.object(yf, 'download', SimulatedDownload()) as download:
+        config = {'data': {'cache_dir': cache_dir}}
+        steps = [
+            ('ema 工具批量获取', lambda: create_fetcher(config).fetch_many(symbols, start_date, end_date)),
+            ('筛选（逐只模式）', lambda: get_stock_data_batch(symbols, start_date, end_date, create_fetcher(config))),
+            ('筛选（截面模式）', lambda: load_price_panel(symbols, start_date, end_date, create_fetcher(config))),
+            ('当天再次筛选', lambda: get_stock_data_batch(symbols, start_date, end_date, create_fetcher(config))),
+        ]
+        for name, step in steps:
+            calls = download.calls
+            start = time.perf_counter()
+            step()
+            elapsed = time.perf_counter() - start
+            print(f"{name:<12} 网络请求 {download.calls - calls:3d} 次   耗时 {elapsed * 1000:9.2f} ms")
+            if name != steps[0][0]:
+                assert download.calls == calls, f"{name} 不应发起网络请求"
+    print(f"{args.symbols} 只股票，筛选阶段全部从共享缓存读取")
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Setup 筛选性能基准测试')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    panel = subparsers.add_parser('panel', help='截面筛选')
+    panel.add_argument('--symbols', type=int, default=500, help='股票数量')
+    panel.add_argument('--days', type=int, default=252, help='交易日数量')
+    panel.add_argument('--breakout-rate', type=float, default=0.05, help='构造突破形态的概率（每个交易日、每只股票）')
+    panel.set_defaults(func=bench_panel)
+
+    backtest = subparsers.add_parser('backtest', help='历史回测')
+    backtest.add_argument('--symbols', type=int, default=10, help='股票数量')
+    backtest.add_argument('--days', type=int, default=252, help='交易日数量')
+    backtest.add_argument('--breakout-rate', type=float, default=0.05, help='构造突破形态的概率（每个交易日、每只股票）')
+    backtest.set_defaults(func=bench_backtest)
+
+    sweep = subparsers.add_parser('sweep', help='参数扫描')
+    sweep.add_argument('--symbols', type=int, default=200, help='股票数量')
+    sweep.add_argument('--days', type=int, default=504, help='交易日数量')
+    sweep.add_argument('--sample', type=int, default=50, help='逐组合回测校验的抽样组合数')
+    sweep.add_argument('--workers', type=int, help='进程数，默认使用 CPU 核心数')
+    sweep.add_argument('--breakout-rate', type=float, default=0.05, help='构造突破形态的概率（每个交易日、每只股票）')
+    sweep.set_defaults(func=bench_sweep)
+
+    pipeline = subparsers.add_parser('pipeline', help='规则流水线')
+    pipeline.add_argument('--symbols', type=int, default=1000, help='股票数量')
+    pipeline.add_argument('--days', type=int, default=252, help='交易日数量')
+    pipeline.add_argument('--breakout-rate', type=float, default=0.05, help='构造突破形态的概率（每个交易日、每只股票）')
+    pipeline.set_defaults(func=bench_pipeline)
+
+    cache = subparsers.add_parser('cache', help='共享数据缓存')
+    cache.add_argument('--symbols', type=int, default=50, help='股票数量')
+    cache.set_defaults(func=bench_cache)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Setup 工具的数据获取层。
+
+复用 ema 工具的 DataFetcher（按股票保存的增量缓存、指数退避重试、批量下载），
+默认与 ema 工具共用同一个缓存目录：任一工具下载过的K线，另一个工具直接从缓存读取；
+同一天内重复运行时，已覆盖到当天的股票不会再发起网络请求。
+"""
+
+import importlib
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+
+SETUP_DIR = os.path.dirname(os.path.abspath(__file__))
+EMA_DIR = os.path.join(os.path.dirname(SETUP_DIR), 'ema')
+
+# ema/utils 包加载后使用的模块名
+EMA_PACKAGE = 'ema_utils'
+
+def load_ema_module(name):
+    """
+    按文件路径加载 ema 工具 utils 包中的模块
+    ema/utils 以 ema_utils 的名字注册，不把 ema 目录加入 sys.path，避免与其他名为 utils 的包冲突
+    Args:
+        name (str): 模块名，如 'data_fetcher'
+    Returns:
+        module: 加载的模块
+    """
+    if EMA_PACKAGE not in sys.modules:
+        package_dir = os.path.join(EMA_DIR, 'utils')
+        spec = importlib.util.spec_from_file_location(EMA_PACKAGE, os.path.join(package_dir, '__init__.py'),
+                                                      submodule_search_locations=[package_dir])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[EMA_PACKAGE] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f'{EMA_PACKAGE}.{name}')
+
+create_ema_fetcher = load_ema_module('data_fetcher').create_fetcher
+
+def create_fetcher(config=None):
+    """
+    按配置文件中的 data 设置创建数据获取器
+    Args:
+        config (dict): config.yaml 的内容，None 表示使用默认设置
+    Returns:
+        DataFetcher: 数据获取器
+    """
+    settings = (config or {}).get('data') or {}
+    # 相对路径以本目录为基准，与从哪个目录运行脚本无关
+    return create_ema_fetcher(settings.get('cache_dir'), settings.get('backend', 'feather'), base_dir=SETUP_DIR)
+
+def fetch_price_frame(fetcher, symbols, start_date, end_date):
+    """
+    批量获取多只股票的行情，合并为与 yfinance 多股票下载结果相同结构的 DataFrame
+    Args:
+        fetcher (DataFetcher): 数据获取器
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+    Returns:
+        pd.DataFrame: 两级列名 (Price, Ticker) 的数据，全部失败时返回 None
+    """
+    frames = [frame for frame in fetcher.fetch_many(symbols, start_date, end_date).values() if frame is not None]
+    if not frames:
+        return None
+    data = pd.concat(frames, axis=1).sort_index()
+    data.columns.names = ['Price', 'Ticker']
+    return data
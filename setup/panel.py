@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+截面（多股票）Setup 筛选。
+
+将 N 只股票的行情对齐成 (日期 × 股票) 的二维数组，用数组运算一次性计算所有股票的
+均线、高于 MA50 的天数、最小二乘斜率（闭式解）、盘整幅度、回调天数和突破标志，
+输出每只股票是否通过及原因的汇总表。规则与 screener.check_setup 逐条对应。
+"""
+
+import numpy as np
+import pandas as pd
+
+from data import create_fetcher, fetch_price_frame
+
+# 计算规则所需的均线周期
+MA_PERIODS = (10, 20, 50)
+
+# 结果表的列
+RESULT_COLUMNS = ['日期', '收盘价', 'MA10', 'MA20', 'MA50', '高于MA50天数', '趋势斜率',
+                  '盘整幅度', '盘整位置', '回调天数', '距MA50', '通过', '原因']
+
+class PricePanel:
+    """按日期对齐的多股票行情，每个价格字段是 (日期 × 股票) 的二维数组，缺失值为 NaN"""
+
+    def __init__(self, dates, symbols, high, low, close):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+
+    @classmethod
+    def from_frame(cls, data, symbols=None):
+        """从 yfinance 多股票下载结果（两级列名 (Price, Ticker)）构建"""
+        symbols = symbols or list(data['Close'].columns)
+        fields = {field: data[field].reindex(columns=symbols).to_numpy(dtype=np.float64)
+                  for field in ('High', 'Low', 'Close')}
+        return cls(data.index, symbols, fields['High'], fields['Low'], fields['Close'])
+
+    def alignment(self):
+        """
+        右对齐使用的行顺序
+        Returns:
+            tuple: (order, counts)，order[i, j] 是对齐后第 i 行在原数组中的行号，counts 是每只股票的有效K线数
+        """
+        valid = ~np.isnan(self.close)
+        # 稳定排序：缺失值排在前面，有效值保持原有顺序排在后面
+        return np.argsort(valid, axis=0, kind='stable'), valid.sum(axis=0)
+
+    def align_right(self):
+        """
+        将每只股票的有效K线移动到数组底部（去掉停牌、未上市等缺失日期）
+        对齐后每一列的最后一行都是该股票最新的一根K线，与逐只股票 dropna 后按位置取最后 N 行的语义一致
+        Returns:
+            tuple: (high, low, close, 每只股票的有效K线数, 每只股票最新K线的日期)
+        """
+        valid = ~np.isnan(self.close)
+        order, counts = self.alignment()
+        last_rows = np.where(valid.any(axis=0), len(valid) - 1 - np.argmax(valid[::-1], axis=0), -1)
+        last_dates = [self.dates[row] if row >= 0 else pd.NaT for row in last_rows]
+        aligned = [np.take_along_axis(values, order, axis=0) for values in (self.high, self.low, self.close)]
+        return (*aligned, counts, last_dates)
+
+    def save(self, path):
+        """保存为 npz 文件，供回测和参数扫描重复使用"""
+        np.savez(path, dates=self.dates.values.astype('datetime64[ns]'), symbols=np.array(self.symbols),
+                 high=self.high, low=self.low, close=self.close)
+
+    @classmethod
+    def load(cls, path):
+        """从 save 生成的 npz 文件读取"""
+        with np.load(path) as data:
+            return cls(data['dates'], data['symbols'].tolist(), data['high'], data['low'], data['close'])
+
+def load_price_panel(symbols, start_date, end_date, fetcher=None):
+    """
+    获取多只股票的行情并构建 PricePanel（优先读取缓存，缓存未命中的股票通过一次批量下载获取）
+    Args:
+        symbols (list): 股票代码列表
+        start_date (str): 开始日期
+        end_date (str): 结束日期
+        fetcher (DataFetcher): 数据获取器，None 表示使用默认设置
+    Returns:
+        PricePanel: 多股票行情，全部获取失败时返回 None
+    """
+    data = fetch_price_frame(fetcher or create_fetcher(), symbols, start_date, end_date)
+    if data is None:
+        return None
+    return PricePanel.from_frame(data, symbols)
+
+def trailing_rolling_mean(values, window, count):
+    """
+    计算每一列最后 count 行的 window 日滚动均值（基于累计和）
+    Args:
+        values (np.ndarray): (行 × 列) 数组
+        window (int): 窗口长度
+        count (int): 需要的行数
+    Returns:
+        np.ndarray: (count × 列) 数组，数据不足处为 NaN
+    """
+    rows = values.shape[0]
+    tail = values[max(rows - (count + window - 1), 0):]
+    cumsum = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), tail]), axis=0)
+    means = (cumsum[window:] - cumsum[:-window]) / window
+    if len(means) < count:
+        means = np.vstack([np.full((count - len(means), values.shape[1]), np.nan), means])
+    return means[-count:]
+
+def trailing_slope(values):
+    """
+    最小二乘直线拟合斜率的闭式解（等价于对每一列 np.polyfit(x, y, 1)[0]）
+    slope = Σ(x - x̄)·y / Σ(x - x̄)²
+    Args:
+        values (np.ndarray): (窗口 × 列) 数组
+    Returns:
+        np.ndarray: 每一列的斜率
+    """
+    x = np.arange(len(values), dtype=np.float64)
+    x -= x.mean()
+    return (x / (x @ x)) @ values
+
+def screen_panel(panel, rules):
+    """
+    对面板中的全部股票检查 Setup 条件
+
+    Args:
+        panel (PricePanel): 多股票行情
+        rules (dict): config.yaml 中的 rules
+    Returns:
+        pd.DataFrame: 以股票代码为索引的结果表，包含各规则的指标、是否通过和原因
+    """
+    high, low, close, counts, last_dates = panel.align_right()
+    lookback_period = rules.get('trend_lookback_days', rules['min_days_above_ma50'])
+    consolidation_days = rules['consolidation_days']
+    max_pullback_days = rules['max_pullback_days']
+
+    # 均线（MA50 需要最近 lookback_period 天的值用于统计高于 MA50 的天数）
+    ma = {period: trailing_rolling_mean(close, period, 1)[0] for period in MA_PERIODS[:-1]}
+    ma50 = trailing_rolling_mean(close, 50, lookback_period)
+    ma[50] = ma50[-1]
+    last_close = close[-1]
+
+    # 规则 1：高于 MA50 的天数和线性趋势斜率
+    days_above_ma50 = (close[-lookback_period:] > ma50).sum(axis=0)
+    required_days_above = lookback_period * rules['min_days_above_ma50_pct']
+    slope = trailing_slope(close[-lookback_period:])
+
+    # 规则 2：盘整幅度和盘整位置
+    high_in_consolidation = high[-consolidation_days:].max(axis=0)
+    low_in_consolidation = low[-consolidation_days:].min(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consolidation_range = (high_in_consolidation - low_in_consolidation) / low_in_consolidation
+        consolidation_top_ratio = low_in_consolidation / high[-lookback_period:].max(axis=0)
+        distance_from_ma50 = (last_close - ma[50]) / ma[50]
+
+    # 规则 3：最近高点距今的天数
+    days_since_high = max_pullback_days - 1 - np.argmax(high[-max_pullback_days:], axis=0)
+
+    # 依次判断每条规则，记录第一条失败的规则
+    failures = [
+        (counts - 49 < lookback_period, lambda i: f"数据不足 (少于 {lookback_period} 天)"),
+        (days_above_ma50 < required_days_above,
+         lambda i: f"规则 1 失败：过去 {lookback_period} 天内仅 {days_above_ma50[i]} 天高于 MA50 "
+                   f"(要求：>{required_days_above:.0f}天)"),
+        (slope <= 0, lambda i: f"规则 1 失败：趋势为非线性上涨 (斜率：{slope[i]:.2f})"),
+        ((low_in_consolidation == 0) | (consolidation_range > rules['consolidation_range']),
+         lambda i: f"规则 2 失败：盘整范围过大 ({consolidation_range[i]:.2%}, 要求：<{rules['consolidation_range']:.2%})"),
+        (consolidation_top_ratio < rules['consolidation_top_range'],
+         lambda i: f"规则 2 失败：盘整位置过低 ({consolidation_top_ratio[i]:.2%}, "
+                   f"要求：>{rules['consolidation_top_range']:.2%})"),
+        ((days_since_high < rules['min_pullback_days']) | (days_since_high > max_pullback_days),
+         lambda i: f"规则 3 失败：回调天数为 {days_since_high[i]} 天 "
+                   f"(要求：{rules['min_pullback_days']}-{max_pullback_days} 天)"),
+        (distance_from_ma50 > rules['max_distance_from_ma50'],
+         lambda i: f"规则 4 失败：收盘价距离MA50过远 ({distance_from_ma50[i]:.2%}, "
+                   f"要求: <{rules['max_distance_from_ma50']:.2%})"),
+        (last_close < high_in_consolidation,
+         lambda i: f"规则 5 失败：收盘价 {last_close[i]:.2f} 未突破盘整高点 {high_in_consolidation[i]:.2f}"),
+    ]
+    failed = np.column_stack([mask for mask, _ in failures])
+    first_failure = np.where(failed.any(axis=1), np.argmax(failed, axis=1), -1)
+    reasons = [failures[rule][1](i) if rule >= 0 else "符合所有条件" for i, rule in enumerate(first_failure)]
+
+    result = pd.DataFrame({
+        '日期': last_dates,
+        '收盘价': last_close,
+        'MA10': ma[10],
+        'MA20': ma[20],
+        'MA50': ma[50],
+        '高于MA50天数': days_above_ma50,
+        '趋势斜率': slope,
+        '盘整幅度': consolidation_range,
+        '盘整位置': consolidation_top_ratio,
+        '回调天数': days_since_high,
+        '距MA50': distance_from_ma50,
+        '通过': first_failure < 0,
+        '原因': reasons,
+    }, index=pd.Index(panel.symbols, name='股票代码'), columns=RESULT_COLUMNS)
+    return result
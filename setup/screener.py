@@ -4,12 +4,15 @@
 根据预设规则筛选符合特定技术形态（Setup）的股票。
 """
 
+import argparse
+import time
 import yaml
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+from data import create_fetcher
+
 def load_config():
     """加载配置文件"""
     try:
@@ -23,11 +26,11 @@ def load_config():
         print(f"加载配置文件时出错：{str(e)}")
         return None
 
-def get_stock_data(symbol, start_date, end_date):
-    """获取股票数据并重置索引"""
+def get_stock_data(symbol, start_date, end_date, fetcher=None):
+    """获取股票数据（优先读取与 ema 工具共用的缓存）并重置索引"""
     try:
-        data = yf.download(symbol, start=start_date, end=end_date, progress=False)
-        if data.empty:
+        data = (fetcher or create_fetcher()).fetch_data(symbol, start_date, end_date)
+        if data is None or data.empty:
             print(f"无法获取 {symbol} 的股票数据")
             return None
         # 重置索引以使用基于整数的索引
@@ -37,23 +40,55 @@ def get_stock_data(symbol, start_date, end_date):
         print(f"获取 {symbol} 的股票数据时出错：{str(e)}")
         return None
 
-def check_trend_rule(data, rules):
-    """Rule 1: Price is above MA50 and shows a linear upward trend."""
+def get_stock_data_batch(symbols, start_date, end_date, fetcher=None):
+    """
+    批量获取多只股票的数据：先读取缓存，缓存未命中的股票合并为一次批量下载（失败的股票单独重试）
+    Returns:
+        dict: 股票代码到重置索引后的数据（获取失败为 None）的字典
+    """
+    try:
+        data_map = (fetcher or create_fetcher()).fetch_many(symbols, start_date, end_date)
+    except Exception as e:
+        print(f"批量获取股票数据时出错：{str(e)}")
+        data_map = {}
+    results = {}
+    for symbol in symbols:
+        data = data_map.get(symbol)
+        if data is None or data.empty:
+            print(f"无法获取 {symbol} 的股票数据")
+            results[symbol] = None
+        else:
+            results[symbol] = data.reset_index()
+    return results
+
+def check_trend_days_rule(data, rules):
+    """Rule 1a: Price stays above MA50 for most of the lookback period."""
     lookback_period = rules.get('trend_lookback_days', rules['min_days_above_ma50'])
     last_days_data = data.iloc[-lookback_period:]
-    days_above_ma50 = (last_days_data['Close'].values > last_days_data['MA50'].values).sum()
+    days_above_ma50 = (last_days_data['Close'].values.ravel() > last_days_data['MA50'].values.ravel()).sum()
     required_days_above = lookback_period * rules['min_days_above_ma50_pct']
 
     if days_above_ma50 < required_days_above:
         return False, f"过去 {lookback_period} 天内仅 {days_above_ma50} 天高于 MA50 (要求：>{required_days_above:.0f}天)"
+    return True, ""
 
-    last_days_close = last_days_data['Close'].values
+def check_trend_slope_rule(data, rules):
+    """Rule 1b: Linear upward trend over the lookback period."""
+    lookback_period = rules.get('trend_lookback_days', rules['min_days_above_ma50'])
+    last_days_close = data['Close'].values[-lookback_period:].ravel()
     x = np.arange(len(last_days_close))
     slope, _ = np.polyfit(x, last_days_close, 1)
     if slope <= 0:
         return False, f"趋势为非线性上涨 (斜率：{slope:.2f})"
     return True, ""
 
+def check_trend_rule(data, rules):
+    """Rule 1: Price is above MA50 and shows a linear upward trend."""
+    passed, reason = check_trend_days_rule(data, rules)
+    if not passed:
+        return False, reason
+    return check_trend_slope_rule(data, rules)
+
 def check_consolidation_rule(data, rules):
     """Rule 2: Recent consolidation period and at the top of a recent high."""
     last_consolidation_days = data.iloc[-rules['consolidation_days']:]
@@ -69,7 +104,7 @@ def check_consolidation_rule(data, rules):
     consolidation_top_ratio = low_in_consolidation.item() / recent_high.item()
     if consolidation_top_ratio < rules['consolidation_top_range']:
         return False, 0, f"盘整位置过低 ({consolidation_top_ratio:.2%}, 要求：>{rules['consolidation_top_range']:.2%})"
-    return True, high_in_consolidation, ""
+    return True, high_in_consolidation.item(), ""
 
 def check_pullback_rule(data, rules):
     """Rule 3: Pullback from a recent high."""
@@ -91,41 +126,137 @@ def check_ma_proximity_rule(data, rules):
 
 def check_breakout_rule(data, high_in_consolidation):
     """Rule 5: Breakout from consolidation trendline."""
-    last_close = data['Close'].iloc[-1]
+    last_close = data['Close'].values[-1].item()
     if last_close < high_in_consolidation:
         return False, f"收盘价 {last_close:.2f} 未突破盘整高点 {high_in_consolidation:.2f}"
     return True, ""
 
-def check_setup(data, rules):
+def check_consolidation_stage(data, rules):
+    """Rule 2 as a pipeline stage (returns only pass/fail and reason)."""
+    passed, _, reason = check_consolidation_rule(data, rules)
+    return passed, reason
+
+def check_breakout_stage(data, rules):
+    """Rule 5 as a pipeline stage, computing the consolidation high itself so it can run before rule 2."""
+    high_in_consolidation = data['High'].values[-rules['consolidation_days']:].max().item()
+    return check_breakout_rule(data, high_in_consolidation)
+
+class RuleStage:
     """
-    Checks if a stock meets the setup criteria and returns the reason for failure.
-    Returns: (bool, str) - (True, "Success") or (False, "Reason for failure")
+    Setup 筛选流水线中的一个规则阶段
+
+    记录检查次数、淘汰次数和累计耗时；在有足够观测之前用 cost 作为单次耗时的估计值。
     """
-    lookback_period = rules.get('trend_lookback_days', rules['min_days_above_ma50'])
-    if len(data) < lookback_period:
-        return False, f"数据不足 (少于 {lookback_period} 天)"
 
-    trend_passed, reason = check_trend_rule(data, rules)
-    if not trend_passed:
-        return False, f"规则 1 失败：{reason}"
+    def __init__(self, name, rule, check, cost):
+        self.name = name
+        self.rule = rule
+        self.check = check
+        self.cost = cost
+        self.evaluated = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+
+    def run(self, data, rules):
+        """执行检查并记录统计，返回 (是否通过, 原因)"""
+        start = time.perf_counter()
+        passed, reason = self.check(data, rules)
+        self.elapsed += time.perf_counter() - start
+        self.evaluated += 1
+        if not passed:
+            self.rejected += 1
+        return passed, reason
 
-    consolidation_passed, high_in_consolidation, reason = check_consolidation_rule(data, rules)
-    if not consolidation_passed:
-        return False, f"规则 2 失败：{reason}"
+    def mean_cost(self, min_samples):
+        """单次检查的平均耗时（秒），观测不足时使用估计值"""
+        if self.evaluated < min_samples:
+            return self.cost
+        return self.elapsed / self.evaluated
 
-    pullback_passed, reason = check_pullback_rule(data, rules)
-    if not pullback_passed:
-        return False, f"规则 3 失败：{reason}"
+    def rejection_rate(self):
+        """观测到的淘汰率（加一平滑，避免尚未淘汰过的阶段永远排在最后）"""
+        return (self.rejected + 1) / (self.evaluated + 2)
 
-    ma_proximity_passed, reason = check_ma_proximity_rule(data, rules)
-    if not ma_proximity_passed:
-        return False, f"规则 4 失败：{reason}"
+# 各规则阶段：(名称, 原规则编号, 检查函数, 单次耗时估计（秒）)，列表顺序即原始检查顺序
+RULE_STAGES = [
+    ('趋势：高于MA50天数', 1, check_trend_days_rule, 1.7e-3),
+    ('趋势：斜率', 1, check_trend_slope_rule, 2.0e-3),
+    ('盘整', 2, check_consolidation_stage, 2.7e-3),
+    ('回调', 3, check_pullback_rule, 0.9e-3),
+    ('均线接近度', 4, check_ma_proximity_rule, 1.6e-3),
+    ('突破', 5, check_breakout_stage, 0.5e-3),
+]
 
-    breakout_passed, reason = check_breakout_rule(data, high_in_consolidation)
-    if not breakout_passed:
-        return False, f"规则 5 失败：{reason}"
+class SetupPipeline:
+    """
+    由规则阶段组成的 Setup 筛选流水线
+
+    股票只要有一个阶段失败就被淘汰，阶段的顺序不影响是否通过，只影响耗时和报告的是哪条失败规则。
+    adaptive 为 True 时每检查 reorder_interval 只股票，按 单次耗时 / 淘汰率 从小到大重新排序，
+    让便宜且淘汰率高的阶段先执行，在大股票池上尽早淘汰。失败原因中保留原规则编号。
+    """
+
+    def __init__(self, rules, adaptive=True, reorder_interval=32, min_samples=8):
+        self.rules = rules
+        self.adaptive = adaptive
+        self.reorder_interval = reorder_interval
+        self.min_samples = min_samples
+        self.stages = [RuleStage(*stage) for stage in RULE_STAGES]
+        self.checked = 0
+        if adaptive:
+            # 尚无观测时按耗时估计排序
+            self.reorder()
+
+    def reorder(self):
+        """按 单次耗时 / 淘汰率 重新排序（sort 是稳定的，相同得分保持原顺序）"""
+        self.stages.sort(key=lambda stage: stage.mean_cost(self.min_samples) / stage.rejection_rate())
+
+    def check(self, data):
+        """
+        检查一只股票是否符合 Setup 条件
+        Args:
+            data (pd.DataFrame): 计算过均线并去掉缺失值的行情
+        Returns:
+            tuple: (是否通过, 原因)
+        """
+        lookback_period = self.rules.get('trend_lookback_days', self.rules['min_days_above_ma50'])
+        if len(data) < lookback_period:
+            return False, f"数据不足 (少于 {lookback_period} 天)"
 
-    return True, "符合所有条件"
+        self.checked += 1
+        if self.adaptive and self.checked % self.reorder_interval == 0:
+            self.reorder()
+        for stage in self.stages:
+            passed, reason = stage.run(data, self.rules)
+            if not passed:
+                return False, f"规则 {stage.rule} 失败：{reason}"
+        return True, "符合所有条件"
+
+    def profile(self):
+        """各阶段的检查次数、淘汰次数和耗时，按当前执行顺序排列"""
+        return pd.DataFrame([{
+            '阶段': stage.name,
+            '规则': stage.rule,
+            '检查次数': stage.evaluated,
+            '淘汰次数': stage.rejected,
+            '淘汰率': stage.rejected / stage.evaluated if stage.evaluated else np.nan,
+            '总耗时(ms)': stage.elapsed * 1000,
+            '平均耗时(ms)': stage.elapsed * 1000 / stage.evaluated if stage.evaluated else np.nan,
+        } for stage in self.stages])
+
+    def print_profile(self):
+        """打印各阶段的统计"""
+        print(f"\n规则阶段统计（共检查 {self.checked} 只股票，按执行顺序）：")
+        print(self.profile().to_string(index=False, float_format=lambda value: f'{value:.3f}'))
+
+def check_setup(data, rules, pipeline=None):
+    """
+    Checks if a stock meets the setup criteria and returns the reason for failure.
+    Without a pipeline the rules run in their original fixed order.
+    Returns: (bool, str) - (True, "Success") or (False, "Reason for failure")
+    """
+    pipeline = pipeline or SetupPipeline(rules, adaptive=False)
+    return pipeline.check(data)
 
 def calculate_moving_averages(data):
     """计算移动平均线"""
@@ -134,18 +265,65 @@ def calculate_moving_averages(data):
     data['MA50'] = data['Close'].rolling(window=50).mean()
     return data
 
+def load_symbols(path):
+    """从文本文件读取股票列表（每行一个代码，# 开头为注释）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split('#')[0].strip() for line in f if line.split('#')[0].strip()]
+
+def run_panel_screen(symbols, rules, start_date, end_date, output=None, fetcher=None):
+    """截面模式：一次获取全部股票，用数组运算同时检查所有股票"""
+    from panel import load_price_panel, screen_panel
+
+    panel = load_price_panel(symbols, start_date, end_date, fetcher)
+    if panel is None:
+        print("无法获取股票数据")
+        return None
+    result = screen_panel(panel, rules)
+    passed = result[result['通过']]
+    print(f"共筛选 {len(result)} 只股票，{len(passed)} 只符合 Setup 条件")
+    for symbol, row in result.iterrows():
+        if row['通过']:
+            print(f"  - {symbol} 符合 Setup 条件")
+        else:
+            print(f"  - {symbol} 不符合 Setup 条件。原因：{row['原因']}")
+    if output:
+        result.to_csv(output, encoding='utf-8-sig')
+        print(f"结果已保存到 {output}")
+    return result
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='筛选符合 Setup 条件的股票')
+    parser.add_argument('--panel', action='store_true', help='截面模式：所有股票一次性向量化筛选')
+    parser.add_argument('--symbols-file', help='股票列表文件（每行一个代码），默认使用配置文件中的 stocks')
+    parser.add_argument('--output', help='截面模式下将结果表保存为 CSV')
+    parser.add_argument('--fixed-order', action='store_true', help='按原始顺序检查规则，不根据淘汰率自动调整')
+    parser.add_argument('--profile', action='store_true', help='打印各规则阶段的淘汰次数和耗时')
+    return parser.parse_args()
+
 def main():
     """主函数"""
+    args = parse_args()
     config = load_config()
     if not config:
         return
 
     end_date = datetime.now()
     start_date = end_date - timedelta(days=365)
+    symbols = load_symbols(args.symbols_file) if args.symbols_file else config['stocks']
 
-    for symbol in config['stocks']:
+    # 与 ema 工具共用缓存、重试策略和批量下载
+    fetcher = create_fetcher(config)
+    if args.panel:
+        run_panel_screen(symbols, config['rules'], start_date.strftime('%Y-%m-%d'),
+                         end_date.strftime('%Y-%m-%d'), args.output, fetcher)
+        return
+
+    data_map = get_stock_data_batch(symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), fetcher)
+    pipeline = SetupPipeline(config['rules'], adaptive=not args.fixed_order)
+    for symbol in symbols:
         print(f"分析股票：{symbol}")
-        data = get_stock_data(symbol, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        data = data_map[symbol]
         if data is not None:
             data = calculate_moving_averages(data)
             data.dropna(inplace=True)
@@ -154,11 +332,14 @@ def main():
                 print(f"  - 数据不足，无法分析 {symbol}")
                 continue
 
-            is_setup, reason = check_setup(data, config['rules'])
+            is_setup, reason = check_setup(data, config['rules'], pipeline)
             if is_setup:
                 print(f"  - {symbol} 符合 Setup 条件")
             else:
                 print(f"  - {symbol} 不符合 Setup 条件。原因：{reason}")
 
+    if args.profile:
+        pipeline.print_profile()
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Setup 规则的参数扫描（网格搜索）。
+
+对 config.yaml 中 rules 的每个参数给定取值范围，在历史行情上回测所有参数组合，
+输出每个组合的信号次数和信号触发后的未来收益统计。
+
+计算按依赖关系分层共享：
+- 滚动指标（MA50、滚动高低点、趋势斜率等）只依赖窗口长度，同一组窗口只计算一次；
+- 每条规则的判断结果只依赖该规则自己的阈值，相同阈值的组合直接复用；
+- 每个组合只需把五条规则的结果做一次按位与，再统计信号处的未来收益。
+参数组合按窗口分组切块后交给进程池执行。
+"""
+
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from backtest import FORWARD_HORIZONS, RULE_NAMES, RULE_PARAMETERS, compute_features, evaluate_rule, forward_returns
+from data import create_fetcher
+from panel import PricePanel, load_price_panel
+from screener import load_config, load_symbols
+
+# 决定滚动窗口长度的参数（compute_features 的输入）
+WINDOW_PARAMETERS = ('trend_lookback_days', 'consolidation_days', 'max_pullback_days')
+
+# 只能取整数的参数
+INTEGER_PARAMETERS = ('trend_lookback_days', 'min_days_above_ma50', 'consolidation_days',
+                      'min_pullback_days', 'max_pullback_days')
+
+# 每个任务包含的参数组合数
+DEFAULT_CHUNK_SIZE = 500
+
+def parse_range(name, spec):
+    """
+    解析参数取值范围
+    Args:
+        name (str): 参数名
+        spec: 列表、{start, stop, step} 字典、"start:stop:step" 或逗号分隔的字符串，范围包含 stop
+    Returns:
+        list: 参数取值
+    """
+    if isinstance(spec, str):
+        if ':' in spec:
+            start, stop, step = (float(part) for part in spec.split(':'))
+            spec = {'start': start, 'stop': stop, 'step': step}
+        else:
+            spec = [float(part) for part in spec.split(',')]
+    if isinstance(spec, dict):
+        count = int(round((spec['stop'] - spec['start']) / spec['step'])) + 1
+        spec = [spec['start'] + i * spec['step'] for i in range(count)]
+    elif not isinstance(spec, (list, tuple)):
+        spec = [spec]
+    if name in INTEGER_PARAMETERS:
+        return sorted({int(round(value)) for value in spec})
+    return sorted({round(float(value), 10) for value in spec})
+
+def build_grid(rules, ranges):
+    """
+    生成全部参数组合，未指定范围的参数使用 rules 中的值
+    Args:
+        rules (dict): config.yaml 中的 rules
+        ranges (dict): 参数名到取值列表的字典
+    Returns:
+        list: 每个元素是一组完整的 rules
+    """
+    unknown = set(ranges) - set(rules) - set(WINDOW_PARAMETERS)
+    if unknown:
+        raise ValueError(f"未知的参数：{', '.join(sorted(unknown))}")
+    names = list(ranges)
+    return [{**rules, **dict(zip(names, values))} for values in itertools.product(*(ranges[name] for name in names))]
+
+def window_key(rules):
+    """参数组合对应的窗口长度"""
+    return (rules.get('trend_lookback_days', rules['min_days_above_ma50']),
+            rules['consolidation_days'], rules['max_pullback_days'])
+
+def make_tasks(grid, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按窗口长度分组并切块，同一任务内的组合共享滚动指标"""
+    groups = {}
+    for index, rules in enumerate(grid):
+        groups.setdefault(window_key(rules), []).append((index, rules))
+    return [(key, combos[start:start + chunk_size])
+            for key, combos in groups.items()
+            for start in range(0, len(combos), chunk_size)]
+
+class SweepEvaluator:
+    """
+    在一份行情上评估参数组合
+
+    只缓存最近一组窗口的滚动指标和规则判断结果，任务按窗口分组提交，缓存命中率高且内存有上限。
+    """
+
+    def __init__(self, panel, horizons=FORWARD_HORIZONS):
+        self.panel = panel
+        self.horizons = tuple(horizons)
+        self._key = None
+        self._features = None
+        self._masks = {}
+        self._returns = None
+
+    def _prepare(self, key):
+        if key == self._key:
+            return
+        self._features = compute_features(self.panel, *key)
+        self._masks = {}
+        self._key = key
+        if self._returns is None:
+            # 未来收益与窗口无关，展平后只计算一次
+            returns = forward_returns(self._features['close'], self.horizons)
+            self._returns = [returns[horizon].ravel() for horizon in self.horizons]
+
+    def _rule_mask(self, rule, rules):
+        cache_key = (rule,) + tuple(rules[name] for name in RULE_PARAMETERS[rule])
+        mask = self._masks.get(cache_key)
+        if mask is None:
+            mask = evaluate_rule(self._features, rule, rules)
+            self._masks[cache_key] = mask
+        return mask
+
+    def evaluate(self, key, combos):
+        """
+        评估同一组窗口下的多个参数组合
+        Args:
+            key (tuple): 窗口长度
+            combos (list): (组合序号, rules) 列表
+        Returns:
+            list: (组合序号, 统计结果字典) 列表
+        """
+        self._prepare(key)
+        results = []
+        for index, rules in combos:
+            signals = self._features['sufficient'].copy()
+            for rule in RULE_NAMES:
+                signals &= self._rule_mask(rule, rules)
+            rows = np.flatnonzero(signals)
+            stats = {'信号次数': len(rows)}
+            for horizon, returns in zip(self.horizons, self._returns):
+                values = returns[rows]
+                values = values[~np.isnan(values)]
+                stats[f'{horizon}日平均收益'] = values.mean() if len(values) else np.nan
+                stats[f'{horizon}日胜率'] = (values > 0).mean() if len(values) else np.nan
+            results.append((index, stats))
+        return results
+
+# 进程池中每个进程持有一个评估器
+_evaluator = None
+
+def _init_worker(panel, horizons):
+    global _evaluator
+    _evaluator = SweepEvaluator(panel, horizons)
+
+def _evaluate_task(task):
+    return _evaluator.evaluate(*task)
+
+def run_sweep(panel, rules, ranges, horizons=FORWARD_HORIZONS, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    对参数网格中的每个组合回测 Setup 规则
+    Args:
+        panel (PricePanel): 多股票行情
+        rules (dict): config.yaml 中的 rules（未扫描参数的取值）
+        ranges (dict): 参数名到取值列表的字典
+        horizons (tuple): 统计未来收益的持有天数
+        workers (int): 进程数，None 表示使用 CPU 核心数，1 表示在当前进程中执行
+        chunk_size (int): 每个任务包含的参数组合数
+    Returns:
+        pd.DataFrame: 每行一个参数组合，包含扫描的参数、信号次数和各持有天数的平均收益与胜率
+    """
+    grid = build_grid(rules, ranges)
+    tasks = make_tasks(grid, chunk_size)
+    stats = [None] * len(grid)
+
+    if workers == 1 or len(tasks) == 1:
+        evaluator = SweepEvaluator(panel, horizons)
+        batches = [evaluator.evaluate(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(panel, horizons)) as executor:
+            batches = list(executor.map(_evaluate_task, tasks))
+    for batch in batches:
+        for index, row in batch:
+            stats[index] = row
+
+    params = pd.DataFrame([{name: combo[name] for name in ranges} for combo in grid], columns=list(ranges))
+    return pd.concat([params, pd.DataFrame(stats)], axis=1)
+
+def load_history(symbols, years, history_file=None, refresh=False, fetcher=None):
+    """
+    读取回测用的历史行情
+    行情来自与 ema 工具共用的数据缓存；指定 history_file 时把对齐好的面板另存为 npz，之后直接读取
+    Args:
+        symbols (list): 股票代码列表
+        years (int): 回测年数
+        history_file (str): 面板文件路径（npz）
+        refresh (bool): 是否忽略面板文件重新获取
+        fetcher (DataFetcher): 数据获取器
+    Returns:
+        PricePanel: 多股票行情，获取失败时返回 None
+    """
+    if history_file and os.path.exists(history_file) and not refresh:
+        return PricePanel.load(history_file)
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=365 * years)
+    panel = load_price_panel(symbols, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'), fetcher)
+    if panel is not None and history_file:
+        panel.save(history_file)
+    return panel
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='Setup 规则参数扫描')
+    parser.add_argument('--param', action='append', default=[], metavar='NAME=RANGE',
+                        help='参数取值范围，如 consolidation_range=0.05:0.15:0.01 或 min_pullback_days=0,1,2；'
+                             '可重复指定，覆盖配置文件中的 sweep')
+    parser.add_argument('--symbols-file', help='股票列表文件（每行一个代码），默认使用配置文件中的 stocks')
+    parser.add_argument('--years', type=int, default=3, help='回测年数')
+    parser.add_argument('--history', help='对齐后的历史行情面板文件（npz），不存在时生成并保存')
+    parser.add_argument('--refresh', action='store_true', help='忽略面板文件重新获取')
+    parser.add_argument('--horizons', default=','.join(map(str, FORWARD_HORIZONS)),
+                        help='统计未来收益的持有天数，逗号分隔')
+    parser.add_argument('--workers', type=int, help='进程数，默认使用 CPU 核心数')
+    parser.add_argument('--min-signals', type=int, default=10, help='排行榜中组合的最少信号次数')
+    parser.add_argument('--top', type=int, default=20, help='打印收益最高的组合数')
+    parser.add_argument('--output', help='保存全部组合结果的 CSV 文件')
+    args = parser.parse_args()
+
+    config = load_config()
+    if not config:
+        return
+    ranges = {name: parse_range(name, spec) for name, spec in (config.get('sweep') or {}).items()}
+    for item in args.param:
+        name, _, spec = item.partition('=')
+        ranges[name.strip()] = parse_range(name.strip(), spec.strip())
+    if not ranges:
+        print("未指定扫描参数（使用 --param 或在配置文件中设置 sweep）")
+        return
+
+    symbols = load_symbols(args.symbols_file) if args.symbols_file else config['stocks']
+    panel = load_history(symbols, args.years, args.history, args.refresh, create_fetcher(config))
+    if panel is None:
+        print("无法获取股票数据")
+        return
+
+    horizons = tuple(int(h) for h in args.horizons.split(','))
+    combinations = int(np.prod([len(values) for values in ranges.values()]))
+    print(f"扫描 {combinations} 个参数组合，{len(panel.symbols)} 只股票 × {len(panel.dates)} 个交易日")
+    start = time.perf_counter()
+    try:
+        result = run_sweep(panel, config['rules'], ranges, horizons, args.workers)
+    except ValueError as e:
+        print(str(e))
+        return
+    print(f"耗时 {time.perf_counter() - start:.2f} 秒")
+
+    sort_column = f'{horizons[-1]}日平均收益'
+    top = result[result['信号次数'] >= args.min_signals].sort_values(sort_column, ascending=False).head(args.top)
+    if top.empty:
+        print(f"没有信号次数不少于 {args.min_signals} 的组合")
+    else:
+        print(top.to_string(index=False, float_format=lambda value: f'{value:.4f}'))
+
+    if args.output:
+        result.to_csv(args.output, index=False, encoding='utf-8-sig')
+        print(f"结果已保存到 {args.output}")
+
+if __name__ == '__main__':
+    main()